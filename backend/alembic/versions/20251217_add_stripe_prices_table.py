@@ -0,0 +1,31 @@
+"""add stripe prices table
+
+Revision ID: 20251217_add_stripe_prices_table
+Revises: 20251216_create_image_generation_tables
+Create Date: 2025-12-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20251217_add_stripe_prices_table'
+down_revision = '20251216_create_image_generation_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Local copy of Stripe prices so MRR can be aggregated in SQL
+    op.create_table(
+        'stripe_prices',
+        sa.Column('price_id', sa.String(255), primary_key=True),
+        sa.Column('unit_amount', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('interval', sa.String(32), nullable=True),
+        sa.Column('currency', sa.String(8), nullable=False, server_default='usd'),
+        sa.Column('active', sa.Boolean(), nullable=True, server_default=sa.true()),
+        sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP')),
+    )
+
+
+def downgrade():
+    op.drop_table('stripe_prices')
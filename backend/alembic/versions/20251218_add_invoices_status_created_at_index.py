@@ -0,0 +1,22 @@
+"""add invoices status/created_at index
+
+Revision ID: 20251218_add_invoices_status_created_at_index
+Revises: 20251217_add_stripe_prices_table
+Create Date: 2025-12-18 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '20251218_add_invoices_status_created_at_index'
+down_revision = '20251217_add_stripe_prices_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Revenue dashboard sums paid invoices over a created_at window
+    op.create_index('ix_invoices_status_created_at', 'invoices', ['status', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_invoices_status_created_at', table_name='invoices', if_exists=True)
@@ -0,0 +1,22 @@
+"""add subscriptions created_at/id index
+
+Revision ID: 20251219_add_subscriptions_created_at_id_index
+Revises: 20251218_add_invoices_status_created_at_index
+Create Date: 2025-12-19 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '20251219_add_subscriptions_created_at_id_index'
+down_revision = '20251218_add_invoices_status_created_at_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pagination seeks on (created_at, id) in descending order
+    op.create_index('ix_subscriptions_created_at_id', 'subscriptions', ['created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_subscriptions_created_at_id', table_name='subscriptions', if_exists=True)
@@ -0,0 +1,38 @@
+"""reorder prompt_cache lookup index
+
+Revision ID: 20251220_reorder_prompt_cache_lookup_index
+Revises: 20251219_add_subscriptions_created_at_id_index
+Create Date: 2025-12-20 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '20251220_reorder_prompt_cache_lookup_index'
+down_revision = '20251219_add_subscriptions_created_at_id_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # lookup_cache always filters on hash/model/size and only sometimes on seed, so
+    # seed goes last; artifact_id is carried in the index leaf pages
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_prompt_cache_lookup', table_name='prompt_cache', postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            'idx_prompt_cache_lookup',
+            'prompt_cache',
+            ['prompt_hash', 'model_version', 'width', 'height', 'seed'],
+            postgresql_include=['artifact_id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_prompt_cache_lookup', table_name='prompt_cache', postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            'idx_prompt_cache_lookup',
+            'prompt_cache',
+            ['prompt_hash', 'model_version', 'seed', 'width', 'height'],
+            postgresql_concurrently=True,
+        )
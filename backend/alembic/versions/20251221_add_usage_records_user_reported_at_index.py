@@ -0,0 +1,23 @@
+"""add usage_records user_id/reported_at index
+
+Revision ID: 20251221_add_usage_records_user_reported_at_index
+Revises: 20251220_reorder_prompt_cache_lookup_index
+Create Date: 2025-12-21 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '20251221_add_usage_records_user_reported_at_index'
+down_revision = '20251220_reorder_prompt_cache_lookup_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /usage_records reads a user's newest records (ORDER BY reported_at DESC LIMIT n);
+    # a backward scan of this index serves it without a sort
+    op.create_index('ix_usage_records_user_id_reported_at', 'usage_records', ['user_id', 'reported_at'])
+
+
+def downgrade():
+    op.drop_index('ix_usage_records_user_id_reported_at', table_name='usage_records', if_exists=True)
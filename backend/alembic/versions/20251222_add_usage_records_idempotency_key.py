@@ -0,0 +1,28 @@
+"""add usage_records idempotency_key
+
+Revision ID: 20251222_add_usage_records_idempotency_key
+Revises: 20251221_add_usage_records_user_reported_at_index
+Create Date: 2025-12-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20251222_add_usage_records_idempotency_key'
+down_revision = '20251221_add_usage_records_user_reported_at_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # report_usage inserts with ON CONFLICT DO NOTHING on (user_id, idempotency_key),
+    # so a retried call never records the same usage twice
+    op.add_column('usage_records', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    op.create_unique_constraint(
+        'uq_usage_records_user_id_idempotency_key', 'usage_records', ['user_id', 'idempotency_key']
+    )
+
+
+def downgrade():
+    op.drop_constraint('uq_usage_records_user_id_idempotency_key', 'usage_records', type_='unique')
+    op.drop_column('usage_records', 'idempotency_key')
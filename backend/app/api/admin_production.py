@@ -183,7 +183,7 @@ async def add_credits(
         admin_user_id=admin_user_id,
         action="credits_added",
         target_user_id=user_id,
-        metadata=f'{{"credits_added": {credits}, "new_balance": {user.credits}}}'
+        meta=f'{{"credits_added": {credits}, "new_balance": {user.credits}}}'
     )
     db.add(log)
     db.commit()
@@ -213,7 +213,7 @@ async def ban_user(
         admin_user_id=admin_user_id,
         action="user_banned",
         target_user_id=user_id,
-        metadata=f'{{"reason": "{reason}"}}'
+        meta=f'{{"reason": "{reason}"}}'
     )
     db.add(log)
     db.commit()
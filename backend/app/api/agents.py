@@ -189,7 +189,8 @@ async def delete_agent(agent_id: str):
 
 
 # Import runs module for workflow execution
-from app.api.runs import run_workflow, _runs_store as runs_store
+from app.api.runs import run_workflow
+from app.storage.run_store import put_run
 from app.orchestration.orchestrator import WorkflowContext, WorkflowState
 from app.orchestration.queue_manager import enqueue_run
 
@@ -207,7 +208,7 @@ async def run_agent(agent_id: str, background: BackgroundTasks, input_data: Opti
         metadata={"agent_id": agent_id, "priority": 1},
     )
     
-    runs_store[ctx.run_id] = ctx
+    await put_run(ctx)
     
     # Enqueue to Redis queue if available, otherwise run in background
     try:
@@ -10,12 +10,14 @@ from fastapi import APIRouter, Request, HTTPException
 from sqlalchemy.orm import Session
 
 from app.db import SessionLocal
-from app.models.billing import Invoice, Subscription, User
+from app.models.billing import Invoice, Subscription
+from app.models.user import User
 from app.core.config import settings
+from app.services.stripe_prices import invalidate_price_cache, upsert_price
 
 router = APIRouter(prefix="/webhook", tags=["webhook"])
 
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY") or (settings.STRIPE_SECRET_KEY if settings.STRIPE_SECRET_KEY else None)
+stripe.api_key = os.getenv("STRIPE_SECRET_KEY") or getattr(settings, "STRIPE_SECRET_KEY", None)
 WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET") or (settings.STRIPE_WEBHOOK_SECRET if hasattr(settings, 'STRIPE_WEBHOOK_SECRET') else None)
 
 
@@ -114,6 +116,7 @@ async def stripe_webhook(request: Request):
     Handles:
       - invoice.paid, invoice.finalized, invoice.updated
       - customer.subscription.created/updated/deleted
+      - price.created/updated/deleted
       - invoice.payment_failed
     Make sure the STRIPE_WEBHOOK_SECRET environment var is configured.
     """
@@ -148,6 +151,13 @@ async def stripe_webhook(request: Request):
             sub = data
             upsert_subscription(db, sub)
 
+        elif typ.startswith("price."):
+            # Keep the local price table in sync and drop the cached price
+            if typ == "price.deleted":
+                data = {**data, "active": False}
+            upsert_price(db, data)
+            await invalidate_price_cache(data.get("id"))
+
         elif typ == "invoice.payment_failed":
             inv = data
             upsert_invoice(db, inv)
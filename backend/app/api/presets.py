@@ -3,12 +3,45 @@ Presets endpoint - Manage lighting presets.
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse, Response
+from typing import Any, Dict, List
 from app.models.schemas import PresetListResponse, PresetResponse
-from app.data.mock_data import MockDataManager
+from app.data.mock_data import MockDataManager, LIGHTING_PRESETS
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+
+def _to_preset_response(p: Dict[str, Any]) -> PresetResponse:
+    """Convert a preset record to its response model."""
+    return PresetResponse(
+        preset_id=p["presetId"],
+        name=p["name"],
+        category=p["category"],
+        description=p["description"],
+        lighting_config=p["lighting"],
+        ideal_for=p["ideal_for"]
+    )
+
+
+# Presets are static: validate and serialize each one once at import
+_PRESET_JSON: Dict[str, bytes] = {
+    p["presetId"]: orjson.dumps(_to_preset_response(p).model_dump())
+    for p in LIGHTING_PRESETS
+}
+
+
+def _preset_list_json(presets: List[Dict[str, Any]], total: int, page: int, page_size: int) -> Response:
+    """Build a PresetListResponse body from the pre-serialized presets."""
+    body = b"".join((
+        b'{"presets":[',
+        b",".join(_PRESET_JSON[p["presetId"]] for p in presets),
+        b"],",
+        orjson.dumps({"total": total, "page": page, "page_size": page_size})[1:],
+    ))
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/presets", response_model=PresetListResponse)
@@ -29,29 +62,12 @@ async def list_presets(
         PresetListResponse with list of presets
     """
     try:
-        # Get presets
+        # Filter once; the total and the requested page both come from that list
         presets = MockDataManager.get_presets(category=category)
+        offset = (page - 1) * page_size
         
-        # Paginate
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        paginated = presets[start_idx:end_idx]
-        
-        # Convert to response format
-        preset_responses = [
-            PresetResponse(
-                preset_id=p["presetId"],
-                name=p["name"],
-                category=p["category"],
-                description=p["description"],
-                lighting_config=p["lighting"],
-                ideal_for=p["ideal_for"]
-            )
-            for p in paginated
-        ]
-        
-        return PresetListResponse(
-            presets=preset_responses,
+        return _preset_list_json(
+            presets[offset:offset + page_size],
             total=len(presets),
             page=page,
             page_size=page_size
@@ -62,6 +78,26 @@ async def list_presets(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/presets/categories")
+async def list_categories():
+    """
+    List all available preset categories.
+    
+    Returns:
+        List of category names
+    """
+    try:
+        categories = MockDataManager.get_categories()
+        return {
+            "categories": categories,
+            "total": len(categories)
+        }
+    
+    except Exception as e:
+        logger.error(f"Error listing categories: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/presets/{preset_id}", response_model=PresetResponse)
 async def get_preset(preset_id: str):
     """
@@ -78,14 +114,7 @@ async def get_preset(preset_id: str):
         if not preset:
             raise HTTPException(status_code=404, detail=f"Preset {preset_id} not found")
         
-        return PresetResponse(
-            preset_id=preset["presetId"],
-            name=preset["name"],
-            category=preset["category"],
-            description=preset["description"],
-            lighting_config=preset["lighting"],
-            ideal_for=preset["ideal_for"]
-        )
+        return Response(content=_PRESET_JSON[preset_id], media_type="application/json")
     
     except HTTPException:
         raise
@@ -94,27 +123,6 @@ async def get_preset(preset_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/presets/categories")
-async def list_categories():
-    """
-    List all available preset categories.
-    
-    Returns:
-        List of category names
-    """
-    try:
-        presets = MockDataManager.get_presets()
-        categories = list(set(p["category"] for p in presets))
-        return {
-            "categories": sorted(categories),
-            "total": len(categories)
-        }
-    
-    except Exception as e:
-        logger.error(f"Error listing categories: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
 @router.post("/presets/search")
 async def search_presets(
     query: str,
@@ -133,38 +141,13 @@ async def search_presets(
         PresetListResponse with matching presets
     """
     try:
-        presets = MockDataManager.get_presets()
-        
-        # Search
-        query_lower = query.lower()
-        results = [
-            p for p in presets
-            if query_lower in p["name"].lower()
-            or query_lower in p["description"].lower()
-            or any(query_lower in ideal.lower() for ideal in p["ideal_for"])
-        ]
+        # Search once; the total and the requested page both come from that list
+        presets = MockDataManager.get_presets(search=query)
+        offset = (page - 1) * page_size
         
-        # Paginate
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        paginated = results[start_idx:end_idx]
-        
-        # Convert to response format
-        preset_responses = [
-            PresetResponse(
-                preset_id=p["presetId"],
-                name=p["name"],
-                category=p["category"],
-                description=p["description"],
-                lighting_config=p["lighting"],
-                ideal_for=p["ideal_for"]
-            )
-            for p in paginated
-        ]
-        
-        return PresetListResponse(
-            presets=preset_responses,
-            total=len(results),
+        return _preset_list_json(
+            presets[offset:offset + page_size],
+            total=len(presets),
             page=page,
             page_size=page_size
         )
@@ -2,102 +2,236 @@
 Revenue dashboard endpoints.
 Provides MRR, ARR, churn, and other revenue metrics (admin-only).
 """
+from anyio import from_thread
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from typing import Optional
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import func, and_, or_, case, select
+from typing import Dict, Optional, Set
 from datetime import datetime, timedelta
+import asyncio
 import logging
 
-from app.db import SessionLocal
-from app.models.billing import Subscription, Invoice, User
+from app.db import get_readonly_db
+from app.models.billing import Subscription, Invoice, StripePrice
 from app.auth.role_middleware import require_role
 from app.core.config import settings
+from app.core.cache import (
+    get_generic_cache,
+    set_generic_cache,
+    mget_generic_cache,
+    mset_generic_cache,
+)
+from app.services.stripe_prices import PRICE_CACHE_TTL_SECONDS, price_cache_key, upsert_prices
 
-router = APIRouter(prefix="/api/admin", tags=["Revenue Dashboard"])
+router = APIRouter(prefix="/api/admin", tags=["Revenue Dashboard"], default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 
-def get_db():
-    """Dependency to get database session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Up to this many uncached prices are retrieved by id (in parallel); more are
+# looked up in the list of active prices
+PRICE_RETRIEVE_MAX = 10
+
+# Mock mode price data
+MOCK_PRICE = {
+    "unit_amount": 3500,  # $35.00
+    "recurring": {"interval": "month"},
+    "currency": "usd"
+}
+
 
+def _stripe_enabled() -> bool:
+    return bool(settings.STRIPE_SECRET_KEY and not settings.USE_MOCK_STRIPE)
 
-# Cache for price lookups (to avoid hitting Stripe API repeatedly)
-_price_cache = {}
+
+def _price_data(price) -> dict:
+    """Reduce a Stripe Price object to the fields the dashboard needs."""
+    return {
+        "unit_amount": price.get("unit_amount", 0),  # in cents
+        "recurring": price.get("recurring", {}),
+        "currency": price.get("currency", "usd")
+    }
 
 
-def get_price_from_stripe(price_id: str) -> Optional[dict]:
+async def get_price_from_stripe(price_id: str) -> Optional[dict]:
     """
-    Get price information from Stripe API.
-    In production, you should cache this aggressively.
+    Get price information, checking the Redis cache before the Stripe API.
+    Cached entries live for 24h or until invalidated by a price webhook.
     """
-    global _price_cache
-    
-    if price_id in _price_cache:
-        return _price_cache[price_id]
+    cached = await get_generic_cache(price_cache_key(price_id))
+    if cached is not None:
+        return cached
     
     try:
         import stripe
-        if settings.STRIPE_SECRET_KEY and not settings.USE_MOCK_STRIPE:
+        if _stripe_enabled():
             stripe.api_key = settings.STRIPE_SECRET_KEY
-            price = stripe.Price.retrieve(price_id)
-            price_data = {
-                "unit_amount": price.get("unit_amount", 0),  # in cents
-                "recurring": price.get("recurring", {}),
-                "currency": price.get("currency", "usd")
-            }
-            _price_cache[price_id] = price_data
+            price = await asyncio.to_thread(stripe.Price.retrieve, price_id)
+            price_data = _price_data(price)
+            await set_generic_cache(price_cache_key(price_id), price_data, ttl=PRICE_CACHE_TTL_SECONDS)
             return price_data
         else:
-            # Mock mode - return mock price data
-            return {
-                "unit_amount": 3500,  # $35.00
-                "recurring": {"interval": "month"},
-                "currency": "usd"
-            }
+            return MOCK_PRICE
     except Exception as e:
         logger.error(f"Failed to fetch price {price_id} from Stripe: {e}")
         return None
 
 
+def _list_stripe_prices(price_ids: Set[str]) -> Dict[str, dict]:
+    """
+    Page through the active Stripe prices, keeping only the requested ones and
+    stopping once all are found. Stripe has no bulk retrieve-by-id; this serves
+    large misses (see PRICE_RETRIEVE_MAX) in a few list calls.
+    """
+    import stripe
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    
+    found = {}
+    for price in stripe.Price.list(active=True, limit=100).auto_paging_iter():
+        if price["id"] in price_ids:
+            found[price["id"]] = _price_data(price)
+            if len(found) == len(price_ids):
+                break
+    return found
+
+
+async def _retrieve_stripe_prices(price_ids: Set[str]) -> Dict[str, dict]:
+    """Retrieve prices by id, concurrently (prices that fail are logged and omitted)."""
+    import stripe
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    
+    price_ids = list(price_ids)
+    results = await asyncio.gather(
+        *(asyncio.to_thread(stripe.Price.retrieve, price_id) for price_id in price_ids),
+        return_exceptions=True
+    )
+    found = {}
+    for price_id, result in zip(price_ids, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to fetch price {price_id} from Stripe: {result}")
+        else:
+            found[price_id] = _price_data(result)
+    return found
+
+
+async def get_prices_from_stripe(price_ids: Set[str]) -> Dict[str, dict]:
+    """
+    Get price information for many prices at once.
+    Cache hits come from a single Redis MGET; a few misses are retrieved by id,
+    more from the paginated list of active prices, and both are written back in
+    one pipeline.
+    
+    Returns:
+        Dict of price_id -> price data (prices that could not be found are omitted)
+    """
+    price_ids = {price_id for price_id in price_ids if price_id}
+    if not price_ids:
+        return {}
+    
+    if not _stripe_enabled():
+        return {price_id: MOCK_PRICE for price_id in price_ids}
+    
+    keys = {price_cache_key(price_id): price_id for price_id in price_ids}
+    cached = await mget_generic_cache(list(keys))
+    prices = {keys[key]: value for key, value in cached.items()}
+    
+    missing = price_ids - prices.keys()
+    if missing:
+        if len(missing) <= PRICE_RETRIEVE_MAX:
+            fetched = await _retrieve_stripe_prices(missing)
+        else:
+            try:
+                fetched = await asyncio.to_thread(_list_stripe_prices, missing)
+            except Exception as e:
+                logger.error(f"Failed to list prices from Stripe: {e}")
+                fetched = {}
+            # Archived prices are not in the active list
+            unlisted = missing - fetched.keys()
+            if unlisted:
+                fetched.update(await _retrieve_stripe_prices(unlisted))
+        
+        await mset_generic_cache(
+            {price_cache_key(price_id): value for price_id, value in fetched.items()},
+            ttl=PRICE_CACHE_TTL_SECONDS
+        )
+        prices.update(fetched)
+    
+    return prices
+
+
+def _monthly_amount_expr(unit_amount, interval):
+    """SQL expression normalizing a price to its monthly amount in cents."""
+    # Other intervals (week, day) can be handled similarly
+    return case(
+        (interval == "month", unit_amount),
+        (interval == "year", unit_amount / 12.0),
+        else_=0
+    )
+
+
+async def _unsynced_mrr_cents(unsynced) -> float:
+    """
+    MRR contribution of active subscriptions whose price is missing from the
+    local stripe_prices table. Prices are fetched in bulk and persisted (one
+    transaction, off the event loop) so the next request is served entirely from SQL.
+    """
+    prices = await get_prices_from_stripe({row.price_id for row in unsynced})
+    if _stripe_enabled() and prices:
+        try:
+            await asyncio.to_thread(
+                upsert_prices,
+                [{"id": price_id, **price_info} for price_id, price_info in prices.items()]
+            )
+        except Exception as e:
+            # The metrics don't depend on the backfill; the next request retries it
+            logger.warning(f"Failed to persist Stripe prices: {e}")
+    
+    mrr_cents = 0
+    for row in unsynced:
+        price_info = prices.get(row.price_id)
+        if not price_info:
+            logger.warning(f"Could not fetch price info for price_id: {row.price_id}")
+            continue
+        
+        unit_amount = price_info.get("unit_amount", 0)  # in cents
+        interval = (price_info.get("recurring") or {}).get("interval", row.interval)
+        if interval == "month":
+            mrr_cents += unit_amount * row.subs
+        elif interval == "year":
+            mrr_cents += unit_amount / 12.0 * row.subs
+    return mrr_cents
+
+
 @router.get("/revenue", dependencies=[Depends(require_role("admin"))])
 def revenue_dashboard(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_readonly_db)
 ):
     """
     Get revenue dashboard metrics: MRR, ARR, churn rate, active subscriptions.
-    Admin-only endpoint.
+    Admin-only endpoint. Sync (threadpool): the queries use a blocking Session; the
+    async price cache is reached through the event loop.
     """
     try:
-        # Get all active subscriptions
-        active_subs = db.query(Subscription).filter(
-            Subscription.status == "active"
-        ).all()
-        
-        # Calculate MRR (Monthly Recurring Revenue)
-        mrr_cents = 0
+        # Calculate MRR (Monthly Recurring Revenue) in SQL from the local price table
+        mrr_cents = db.scalar(
+            select(func.coalesce(func.sum(_monthly_amount_expr(
+                StripePrice.unit_amount,
+                func.coalesce(StripePrice.interval, Subscription.interval)
+            )), 0))
+            .select_from(Subscription)
+            .join(StripePrice, Subscription.price_id == StripePrice.price_id)
+            .where(Subscription.status == "active")
+        ) or 0
         
-        for sub in active_subs:
-            price_info = get_price_from_stripe(sub.price_id)
-            
-            if not price_info:
-                logger.warning(f"Could not fetch price info for price_id: {sub.price_id}")
-                continue
-            
-            unit_amount = price_info.get("unit_amount", 0)  # in cents
-            recurring = price_info.get("recurring", {})
-            interval = recurring.get("interval", sub.interval)
-            
-            if interval == "month":
-                mrr_cents += unit_amount
-            elif interval == "year":
-                mrr_cents += unit_amount / 12.0
-            # Other intervals (week, day) can be handled similarly
+        # Prices not synced locally yet (e.g. before the first price.* webhook)
+        unsynced = db.execute(
+            select(Subscription.price_id, Subscription.interval, func.count().label("subs"))
+            .outerjoin(StripePrice, Subscription.price_id == StripePrice.price_id)
+            .where(Subscription.status == "active", StripePrice.price_id.is_(None))
+            .group_by(Subscription.price_id, Subscription.interval)
+        ).all()
+        if unsynced:
+            mrr_cents += from_thread.run(_unsynced_mrr_cents, unsynced)
         
         mrr = mrr_cents / 100.0  # Convert cents to dollars
         arr = mrr * 12  # Annual Recurring Revenue
@@ -106,21 +240,29 @@ def revenue_dashboard(
         # Churn = (# canceled subs in last 30 days) / (# active subs at start of period)
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
         
-        # Count subscriptions canceled in the last 30 days
-        canceled_last_30 = db.query(Subscription).filter(
-            Subscription.status == "canceled",
-            Subscription.updated_at >= thirty_days_ago
-        ).count()
-        
-        # Count active subscriptions (as proxy for start of period)
-        # In production, you might want to store subscription state changes in an events table
-        active_count_start = db.query(Subscription).filter(
-            Subscription.status == "active",
-            Subscription.created_at < thirty_days_ago
-        ).count()
+        # All subscription counts in one round-trip (FILTER aggregates)
+        is_active = Subscription.status == "active"
+        is_canceled = Subscription.status == "canceled"
+        counts = db.execute(
+            select(
+                func.count().label("total"),
+                func.count().filter(is_active).label("active_total"),
+                func.count().filter(is_canceled).label("canceled_total"),
+                # Subscriptions canceled in the last 30 days
+                func.count().filter(
+                    and_(is_canceled, Subscription.updated_at >= thirty_days_ago)
+                ).label("canceled_last_30"),
+                # Active subscriptions created before the period (proxy for start of period)
+                # In production, you might want to store subscription state changes in an events table
+                func.count().filter(
+                    and_(is_active, Subscription.created_at < thirty_days_ago)
+                ).label("active_before_30d"),
+            )
+        ).one()
         
-        # Also count subscriptions that were active 30 days ago (including newly created ones)
-        active_count_total = len(active_subs)
+        canceled_last_30 = counts.canceled_last_30
+        active_count_start = counts.active_before_30d
+        active_count_total = counts.active_total
         
         # Churn rate calculation
         churn_rate = 0.0
@@ -128,18 +270,16 @@ def revenue_dashboard(
             churn_rate = canceled_last_30 / active_count_start
         
         # Additional metrics
-        total_subscriptions = db.query(Subscription).count()
-        canceled_subscriptions = db.query(Subscription).filter(
-            Subscription.status == "canceled"
-        ).count()
+        total_subscriptions = counts.total
+        canceled_subscriptions = counts.canceled_total
         
         # Recent revenue (last 30 days from invoices)
-        recent_invoices = db.query(Invoice).filter(
-            Invoice.status == "paid",
-            Invoice.created_at >= thirty_days_ago
-        ).all()
-        
-        recent_revenue_cents = sum(inv.amount_paid for inv in recent_invoices)
+        recent_revenue_cents = db.scalar(
+            select(func.coalesce(func.sum(Invoice.amount_paid), 0)).where(
+                Invoice.status == "paid",
+                Invoice.created_at >= thirty_days_ago
+            )
+        ) or 0
         recent_revenue = recent_revenue_cents / 100.0
         
         # Average revenue per subscription
@@ -156,7 +296,7 @@ def revenue_dashboard(
             "recent_revenue_30d": round(recent_revenue, 2),  # Revenue from paid invoices in last 30 days
             "arpu": round(arpu, 2),  # Average Revenue Per User (monthly)
             "metrics_period": "30_days",
-            "calculated_at": datetime.utcnow().isoformat()
+            "calculated_at": datetime.utcnow()
         }
         
     except Exception as e:
@@ -164,22 +304,54 @@ def revenue_dashboard(
         raise HTTPException(status_code=500, detail=f"Failed to calculate revenue metrics: {str(e)}")
 
 
+SUBSCRIPTION_LIST_COLUMNS = (
+    Subscription.id,
+    Subscription.stripe_subscription_id,
+    Subscription.stripe_customer_id,
+    Subscription.status,
+    Subscription.price_id,
+    Subscription.interval,
+    Subscription.subscription_item_id,
+    Subscription.current_period_start,
+    Subscription.current_period_end,
+    Subscription.cancel_at_period_end,
+    Subscription.created_at,
+)
+
+
 @router.get("/subscriptions")
 def list_subscriptions(
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = Query(None, description="Filter by status: active, canceled, past_due, etc."),
-    db: Session = Depends(get_db),
+    cursor: Optional[datetime] = Query(None, description="created_at of the last row of the previous page (next_cursor)"),
+    cursor_id: Optional[int] = Query(None, description="id of the last row of the previous page (next_cursor_id)"),
+    db: Session = Depends(get_readonly_db),
     user = Depends(require_role("admin"))
 ):
     """
-    List all subscriptions (admin-only).
+    List all subscriptions (admin-only), newest first.
+    Keyset-paginated: pass next_cursor/next_cursor_id from the previous page.
     """
-    query = db.query(Subscription)
+    # Only load the columns serialized below
+    stmt = select(Subscription).options(load_only(*SUBSCRIPTION_LIST_COLUMNS))
     
     if status:
-        query = query.filter(Subscription.status == status)
+        stmt = stmt.where(Subscription.status == status)
+    
+    if cursor is not None:
+        if cursor_id is not None:
+            stmt = stmt.where(or_(
+                Subscription.created_at < cursor,
+                and_(Subscription.created_at == cursor, Subscription.id < cursor_id)
+            ))
+        else:
+            stmt = stmt.where(Subscription.created_at < cursor)
+    
+    subs = db.execute(
+        stmt.order_by(Subscription.created_at.desc(), Subscription.id.desc()).limit(limit)
+    ).scalars().all()
     
-    subs = query.order_by(Subscription.created_at.desc()).limit(limit).all()
+    last = subs[-1] if len(subs) == limit else None
     
     return {
         "subscriptions": [
@@ -190,13 +362,15 @@ def list_subscriptions(
                 "status": sub.status,
                 "price_id": sub.price_id,
                 "interval": sub.interval,
-                "subscription_item_id": sub.stripe_subscription_item_id,
-                "current_period_start": sub.current_period_start.isoformat() if sub.current_period_start else None,
-                "current_period_end": sub.current_period_end.isoformat() if sub.current_period_end else None,
+                "subscription_item_id": sub.subscription_item_id,
+                "current_period_start": sub.current_period_start,
+                "current_period_end": sub.current_period_end,
                 "cancel_at_period_end": sub.cancel_at_period_end,
-                "created_at": sub.created_at.isoformat() if sub.created_at else None
+                "created_at": sub.created_at
             }
             for sub in subs
         ],
-        "total": len(subs)
+        "total": len(subs),
+        "next_cursor": last.created_at if last else None,
+        "next_cursor_id": last.id if last else None
     }
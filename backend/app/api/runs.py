@@ -4,17 +4,21 @@ Endpoints for managing workflow runs.
 """
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
+from datetime import datetime
+import asyncio
 import logging
 
 from app.orchestration.orchestrator import WorkflowContext, advance, WorkflowState
 from app.core.config import settings
 from app.orchestration.queue_manager import enqueue_run
+from app.storage.run_store import get_run as load_run, put_run, cas_state
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix=f"{settings.API_PREFIX}/runs", tags=["Runs"])
+router = APIRouter(prefix=f"{settings.API_PREFIX}/runs", tags=["Runs"], default_response_class=ORJSONResponse)
 
 
 class RunCreate(BaseModel):
@@ -42,8 +46,8 @@ class RunDetailResponse(BaseModel):
     critique: Optional[Dict[str, Any]] = None
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
-    created_at: str
-    updated_at: str
+    created_at: datetime
+    updated_at: datetime
 
 
 class RunApproveRequest(BaseModel):
@@ -52,43 +56,39 @@ class RunApproveRequest(BaseModel):
     plan_override: Optional[Dict[str, Any]] = Field(None, description="Optional plan override (admin only)")
 
 
-# In-memory storage (replace with database/Redis in production)
-_runs_store: Dict[str, WorkflowContext] = {}
-
-
 async def run_workflow(ctx: WorkflowContext):
-    """Background task to run workflow."""
+    """
+    Background task to run workflow.
+    The caller stores the new run; the store is written once after planning
+    (so progress is visible, overlapping the critic) and once with the final state.
+    """
     try:
         logger.info(f"Starting workflow {ctx.run_id}")
-        _runs_store[ctx.run_id] = ctx
         
         # Planner
         logger.info(f"Workflow {ctx.run_id}: Running planner agent")
         ctx = await advance(ctx)
-        _runs_store[ctx.run_id] = ctx
         logger.info(f"Workflow {ctx.run_id}: Planner completed, state: {ctx.state}")
         
-        # Critic
+        # Critic needs the complete plan, so it cannot start earlier; persist a
+        # snapshot of the planned state concurrently instead of before it
         logger.info(f"Workflow {ctx.run_id}: Running critic agent")
-        ctx = await advance(ctx)
-        _runs_store[ctx.run_id] = ctx
+        planned = WorkflowContext.from_dict(ctx.to_dict())
+        _, ctx = await asyncio.gather(put_run(planned), advance(ctx))
         logger.info(f"Workflow {ctx.run_id}: Critic completed, state: {ctx.state}")
         
         # Pause here for HITL - workflow will wait for approval
         if ctx.state == WorkflowState.CRITIQUED:
             logger.info(f"Workflow {ctx.run_id} waiting for human approval")
-            _runs_store[ctx.run_id] = ctx
             return
         
         # Once human approves:
         logger.info(f"Workflow {ctx.run_id}: Human approved, proceeding to execution")
         ctx = await advance(ctx, human_approved=True)
-        _runs_store[ctx.run_id] = ctx
         
         # Execute
         logger.info(f"Workflow {ctx.run_id}: Running executor agent")
         ctx = await advance(ctx)
-        _runs_store[ctx.run_id] = ctx
         
         logger.info(f"Workflow {ctx.run_id} completed with state: {ctx.state}")
     
@@ -96,7 +96,9 @@ async def run_workflow(ctx: WorkflowContext):
         logger.error(f"Workflow {ctx.run_id} failed: {e}", exc_info=True)
         ctx.error = str(e)
         ctx.state = WorkflowState.FAILED
-        _runs_store[ctx.run_id] = ctx
+    
+    finally:
+        await put_run(ctx)
 
 
 @router.post("/{agent_id}/run", response_model=RunResponse)
@@ -109,7 +111,7 @@ async def start_run(agent_id: str, run_data: RunCreate, background: BackgroundTa
         metadata={"agent_id": agent_id, "priority": run_data.priority},
     )
     
-    _runs_store[ctx.run_id] = ctx
+    await put_run(ctx)
     
     # Enqueue to Redis queue if available, otherwise run in background
     try:
@@ -136,26 +138,24 @@ async def start_run(agent_id: str, run_data: RunCreate, background: BackgroundTa
 @router.get("/{run_id}/status")
 async def get_run_status(run_id: str):
     """Get run status (lightweight endpoint)."""
-    if run_id not in _runs_store:
+    ctx = await load_run(run_id)
+    if ctx is None:
         raise HTTPException(status_code=404, detail="Run not found")
-    
-    ctx = _runs_store[run_id]
     return {
         "run_id": ctx.run_id,
         "state": ctx.state.value if isinstance(ctx.state, WorkflowState) else ctx.state,
         "status": ctx.state.value.lower() if isinstance(ctx.state, WorkflowState) else str(ctx.state).lower(),
         "error": ctx.error,
-        "updated_at": ctx.updated_at.isoformat(),
+        "updated_at": ctx.updated_at,
     }
 
 
 @router.get("/{run_id}", response_model=RunDetailResponse)
 async def get_run(run_id: str):
     """Get run details."""
-    if run_id not in _runs_store:
+    ctx = await load_run(run_id)
+    if ctx is None:
         raise HTTPException(status_code=404, detail="Run not found")
-    
-    ctx = _runs_store[run_id]
     return RunDetailResponse(
         run_id=ctx.run_id,
         agent_id=ctx.metadata.get("agent_id", "unknown"),
@@ -165,8 +165,8 @@ async def get_run(run_id: str):
         critique=ctx.critique,
         result=ctx.result,
         error=ctx.error,
-        created_at=ctx.created_at.isoformat(),
-        updated_at=ctx.updated_at.isoformat(),
+        created_at=ctx.created_at,
+        updated_at=ctx.updated_at,
     )
 
 
@@ -177,13 +177,11 @@ async def approve_run(run_id: str, approval: RunApproveRequest):
     Supports plan_override for admin edits (must pass guardrails).
     """
     from app.services.guardrails import validate_plan_override, GuardrailError
-    from app.auth.dependencies import require_admin
     
-    if run_id not in _runs_store:
+    ctx = await load_run(run_id)
+    if ctx is None:
         raise HTTPException(status_code=404, detail="Run not found")
     
-    ctx = _runs_store[run_id]
-    
     if ctx.state != WorkflowState.CRITIQUED:
         raise HTTPException(
             status_code=400,
@@ -211,9 +209,10 @@ async def approve_run(run_id: str, approval: RunApproveRequest):
                 detail=f"plan_override guardrail failed: {e.reason}"
             )
     
-    # Advance workflow with approval
+    # Advance workflow with approval; only persist if no other request moved the run meanwhile
     ctx = await advance(ctx, human_approved=approval.approved)
-    _runs_store[run_id] = ctx
+    if not await cas_state(run_id, WorkflowState.CRITIQUED, ctx):
+        raise HTTPException(status_code=409, detail="Run state changed concurrently, approval not applied")
     
     return {
         "run_id": run_id,
@@ -226,12 +225,11 @@ async def approve_run(run_id: str, approval: RunApproveRequest):
 @router.post("/{run_id}/stop")
 async def stop_run(run_id: str):
     """Stop a running workflow."""
-    if run_id not in _runs_store:
+    ctx = await load_run(run_id)
+    if ctx is None:
         raise HTTPException(status_code=404, detail="Run not found")
-    
-    ctx = _runs_store[run_id]
     ctx.state = WorkflowState.STOPPED
-    _runs_store[run_id] = ctx
+    await put_run(ctx)
     
     logger.info(f"Stopped run: {run_id}")
     return {
@@ -1,28 +1,94 @@
 """
-S3 presigned URL endpoint for resume uploads.
+S3 presigned URL endpoints for resume, image and guidance uploads.
+URLs are signed locally with SigV4 (app.utils.s3_presign); no botocore call per request.
+Signing is pure CPU (microseconds), so the handlers are async and never use the threadpool.
 """
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, field_validator
 import boto3
+from botocore.config import Config
+import itertools
 import os
+import re
+import secrets
 import time
+from typing import Dict, Tuple
 
-router = APIRouter()
+from app.utils.s3_presign import presign_url
+
+router = APIRouter(default_response_class=ORJSONResponse)
 
 S3_BUCKET = os.getenv("S3_BUCKET")
 S3_REGION = os.getenv("S3_REGION", "us-east-1")
+AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
+AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
+AWS_SESSION_TOKEN = os.getenv("AWS_SESSION_TOKEN")
+S3_POOL_SIZE = int(os.getenv("S3_POOL_SIZE", "50"))
+
+# Public object URL prefix (bucket and region are fixed for the process)
+_PUBLIC_URL_BASE = f"https://{S3_BUCKET}.s3.{S3_REGION}.amazonaws.com/" if S3_BUCKET else None
+
+# Presigned GET URLs: 1 hour - enough time for Bria to fetch. Cached per key and handed
+# out again while at least the margin of validity remains.
+GET_URL_EXPIRES_SECONDS = 3600
+GET_URL_REUSE_MARGIN_SECONDS = 600
+GET_URL_CACHE_MAXSIZE = 4096
+
+# key -> (reuse deadline on the monotonic clock, url)
+_get_url_cache: Dict[str, Tuple[float, str]] = {}
+
+# Content types accepted by /s3/presign-image
+VALID_IMAGE_TYPES = frozenset({"image/jpeg", "image/jpg", "image/png"})
+
+# Shared client config: larger connection pool, TCP keepalive, adaptive retries, and
+# short timeouts so a stalled peer can't pin sockets (botocore defaults to 60s each)
+S3_CLIENT_CONFIG = Config(
+    signature_version="s3v4",
+    max_pool_connections=S3_POOL_SIZE,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 3},
+    connect_timeout=3,
+    read_timeout=10,
+)
 
 # Initialize S3 client if credentials are available
 s3 = None
-if os.getenv("AWS_ACCESS_KEY_ID") and os.getenv("AWS_SECRET_ACCESS_KEY"):
+if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY:
     s3 = boto3.client(
         "s3",
         region_name=S3_REGION,
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+        config=S3_CLIENT_CONFIG,
     )
 
 
+_UNSAFE_KEY_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+# Upload key namespace: a per-process counter seeded from the start time (ms), plus a
+# random per-process tag so workers started in the same millisecond never collide.
+_key_counter = itertools.count(time.time_ns() // 1_000_000)
+_KEY_PROCESS_TAG = secrets.token_hex(4)
+
+
+def next_key_prefix() -> str:
+    """Unique, per-process increasing prefix for upload keys (no clock read per call)."""
+    return f"{next(_key_counter):013d}_{_KEY_PROCESS_TAG}"
+
+
+def sanitize_filename(filename: str) -> str:
+    """
+    Make a client-supplied filename safe to embed in an S3 key.
+    Drops any path components, maps everything outside [A-Za-z0-9._-] to "_"
+    and collapses "..".
+    """
+    name = filename.replace("\\", "/").rsplit("/", 1)[-1]
+    name = _UNSAFE_KEY_CHARS.sub("_", name)
+    name = re.sub(r"\.{2,}", ".", name).strip(".")
+    return name or "file"
+
+
 class PresignIn(BaseModel):
     filename: str
     content_type: str
@@ -34,36 +100,48 @@ class ImagePresignIn(BaseModel):
     content_type: str = "image/jpeg"  # Default to JPEG
     make_public: bool = False  # Whether to make the object public
 
+    @field_validator("content_type")
+    @classmethod
+    def check_content_type(cls, v):
+        """Reject unsupported image types at parse time (case-insensitive, value kept as sent)."""
+        # The value is signed as-is, so it must match the header the client will send
+        if v not in VALID_IMAGE_TYPES and v.lower() not in VALID_IMAGE_TYPES:
+            raise ValueError(f"Invalid content type. Must be one of: {', '.join(sorted(VALID_IMAGE_TYPES))}")
+        return v
+
 
 @router.post("/s3/presign")
-def presign(data: PresignIn):
-    """Generate presigned URL for S3 upload."""
+async def presign(data: PresignIn):
+    """
+    Generate presigned URL for S3 upload.
+    """
     if not S3_BUCKET:
         raise HTTPException(status_code=500, detail="S3 not configured")
     
     if not s3:
         raise HTTPException(status_code=500, detail="AWS credentials not configured")
     
-    # Generate unique key
-    timestamp = int(time.time())
-    key = f"uploads/resumes/{timestamp}_{data.filename}"
+    # Generate unique key (same-second uploads don't collide)
+    key = f"uploads/resumes/{next_key_prefix()}_{sanitize_filename(data.filename)}"
     
     try:
-        url = s3.generate_presigned_url(
-            "put_object",
-            Params={
-                "Bucket": S3_BUCKET,
-                "Key": key,
-                "ContentType": data.content_type
-            },
-            ExpiresIn=900,  # 15 minutes
-            HttpMethod="PUT"
+        # Signed locally (SigV4); no botocore request per call
+        url = presign_url(
+            S3_BUCKET,
+            S3_REGION,
+            key,
+            AWS_ACCESS_KEY_ID,
+            AWS_SECRET_ACCESS_KEY,
+            method="PUT",
+            expires_in=900,  # 15 minutes
+            content_type=data.content_type,
+            session_token=AWS_SESSION_TOKEN,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Presign failed: {str(e)}")
     
     # Construct public URL (adjust based on your S3 bucket configuration)
-    public_url = f"https://{S3_BUCKET}.s3.{S3_REGION}.amazonaws.com/{key}"
+    public_url = _PUBLIC_URL_BASE + key
     
     return {
         "upload_url": url,
@@ -73,10 +151,8 @@ def presign(data: PresignIn):
 
 
 @router.get("/s3/presign-get")
-def presign_get(key: str = None):
+async def presign_get(key: str = Query(None, description="S3 object key")):
     """Generate presigned GET URL for S3 object (for Bria to fetch videos)."""
-    from fastapi import Query
-    
     if not S3_BUCKET:
         raise HTTPException(status_code=500, detail="S3 not configured")
     
@@ -86,18 +162,34 @@ def presign_get(key: str = None):
     if not key:
         raise HTTPException(status_code=400, detail="key query parameter required")
     
+    # Re-requests for the same object (retries, the video-editing flow) reuse the URL
+    now = time.monotonic()
+    cached = _get_url_cache.get(key)
+    if cached is not None and cached[0] > now:
+        return {
+            "url": cached[1],
+            "key": key
+        }
+    
     try:
-        url = s3.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": S3_BUCKET,
-                "Key": key
-            },
-            ExpiresIn=3600,  # 1 hour - enough time for Bria to fetch
+        url = presign_url(
+            S3_BUCKET,
+            S3_REGION,
+            key,
+            AWS_ACCESS_KEY_ID,
+            AWS_SECRET_ACCESS_KEY,
+            expires_in=GET_URL_EXPIRES_SECONDS,
+            session_token=AWS_SESSION_TOKEN,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Presign failed: {str(e)}")
     
+    _get_url_cache.pop(key, None)
+    if len(_get_url_cache) >= GET_URL_CACHE_MAXSIZE:
+        # Oldest entry first (dicts keep insertion order)
+        del _get_url_cache[next(iter(_get_url_cache))]
+    _get_url_cache[key] = (now + GET_URL_EXPIRES_SECONDS - GET_URL_REUSE_MARGIN_SECONDS, url)
+    
     return {
         "url": url,
         "key": key
@@ -105,7 +197,7 @@ def presign_get(key: str = None):
 
 
 @router.post("/s3/presign-image")
-def presign_image(data: ImagePresignIn):
+async def presign_image(data: ImagePresignIn):
     """
     Generate presigned URL for image upload (for Bria Image Onboarding).
     
@@ -117,40 +209,30 @@ def presign_image(data: ImagePresignIn):
     if not s3:
         raise HTTPException(status_code=500, detail="AWS credentials not configured")
     
-    # Validate content type
-    valid_types = ["image/jpeg", "image/jpg", "image/png"]
-    if data.content_type.lower() not in valid_types:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid content type. Must be one of: {', '.join(valid_types)}"
-        )
-    
     # Generate unique key for image uploads
-    timestamp = int(time.time())
-    key = f"uploads/images/{timestamp}_{data.filename}"
-    
-    params = {
-        "Bucket": S3_BUCKET,
-        "Key": key,
-        "ContentType": data.content_type
-    }
+    key = f"uploads/images/{next_key_prefix()}_{sanitize_filename(data.filename)}"
     
-    # Set ACL if public
-    if data.make_public:
-        params["ACL"] = "public-read"
+    # Set ACL if public (signed, so the client must send the same x-amz-acl header)
+    extra_headers = {"x-amz-acl": "public-read"} if data.make_public else None
     
     try:
-        upload_url = s3.generate_presigned_url(
-            "put_object",
-            Params=params,
-            ExpiresIn=900,  # 15 minutes
-            HttpMethod="PUT"
+        upload_url = presign_url(
+            S3_BUCKET,
+            S3_REGION,
+            key,
+            AWS_ACCESS_KEY_ID,
+            AWS_SECRET_ACCESS_KEY,
+            method="PUT",
+            expires_in=900,  # 15 minutes
+            content_type=data.content_type,
+            session_token=AWS_SESSION_TOKEN,
+            extra_headers=extra_headers,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Presign failed: {str(e)}")
     
     # Construct public URL
-    public_url = f"https://{S3_BUCKET}.s3.{S3_REGION}.amazonaws.com/{key}"
+    public_url = _PUBLIC_URL_BASE + key
     
     return {
         "upload_url": upload_url,
@@ -160,42 +242,8 @@ def presign_image(data: ImagePresignIn):
     }
 
 
-@router.post("/s3/presign-get")
-def presign_get(key: str = None):
-    """Generate presigned GET URL for S3 object (for Bria to fetch videos)."""
-    from fastapi import Query
-    
-    key = Query(None, description="S3 object key")
-    
-    if not S3_BUCKET:
-        raise HTTPException(status_code=500, detail="S3 not configured")
-    
-    if not s3:
-        raise HTTPException(status_code=500, detail="AWS credentials not configured")
-    
-    if not key:
-        raise HTTPException(status_code=400, detail="key parameter required")
-    
-    try:
-        url = s3.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": S3_BUCKET,
-                "Key": key
-            },
-            ExpiresIn=3600,  # 1 hour - enough time for Bria to fetch
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Presign failed: {str(e)}")
-    
-    return {
-        "url": url,
-        "key": key
-    }
-
-
 @router.get("/s3/presign")
-def presign_get_put(
+async def presign_get_put(
     filename: str = Query(..., description="Filename for the upload"),
     contentType: str = Query("image/png", description="Content type of the file"),
     expiresSec: int = Query(3600, description="Expiration time in seconds")
@@ -213,30 +261,31 @@ def presign_get_put(
         raise HTTPException(status_code=500, detail="AWS credentials not configured")
     
     # Generate unique key
-    timestamp = int(time.time())
-    key = f"prolight/v1/{timestamp}-{filename.replace(' ', '_')}"
+    key = f"prolight/v1/{next_key_prefix()}-{sanitize_filename(filename)}"
     
     try:
         # Presigned PUT URL for upload
-        presigned_put = s3.generate_presigned_url(
-            "put_object",
-            Params={
-                "Bucket": S3_BUCKET,
-                "Key": key,
-                "ContentType": contentType
-            },
-            ExpiresIn=expiresSec,
-            HttpMethod="PUT"
+        presigned_put = presign_url(
+            S3_BUCKET,
+            S3_REGION,
+            key,
+            AWS_ACCESS_KEY_ID,
+            AWS_SECRET_ACCESS_KEY,
+            method="PUT",
+            expires_in=expiresSec,
+            content_type=contentType,
+            session_token=AWS_SESSION_TOKEN,
         )
         
         # Presigned GET URL for Bria to fetch
-        presigned_get = s3.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": S3_BUCKET,
-                "Key": key
-            },
-            ExpiresIn=expiresSec
+        presigned_get = presign_url(
+            S3_BUCKET,
+            S3_REGION,
+            key,
+            AWS_ACCESS_KEY_ID,
+            AWS_SECRET_ACCESS_KEY,
+            expires_in=expiresSec,
+            session_token=AWS_SESSION_TOKEN,
         )
         
         return {
@@ -1,46 +1,66 @@
 """
 Server-Sent Events API
 Real-time streaming of workflow updates.
-Uses Redis pub/sub with redis.asyncio if available, otherwise falls back to polling in-memory store.
+Uses Redis pub/sub with redis.asyncio if available, otherwise run store writes are
+pushed through the in-process run bus, with a periodic re-read of the run store for
+writes made by other workers.
 """
 
 from fastapi import APIRouter
-from sse_starlette.sse import EventSourceResponse
-from typing import AsyncGenerator
+from typing import AsyncGenerator, List, Union
 import asyncio
 import logging
-import json
+
+import orjson
 
 from app.core.config import settings
-from app.api.runs import _runs_store
+from app.events import run_bus
+from app.orchestration.orchestrator import WorkflowContext, WorkflowState
+from app.storage.run_store import get_run
+from app.utils.sse import EventSourceResponse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix=f"{settings.API_PREFIX}/runs", tags=["SSE"])
 
+# Below common proxy idle timeouts (nginx/ELB default to 60s)
+PING_INTERVAL_SECONDS = 15
+
+# The run bus only sees writes made in this process; without a push for this long
+# the run is re-read from the store
+RUN_REPOLL_SECONDS = 2.0
+
 # Try to import Redis events support
 try:
     from app.events.redis_events import subscribe_run_events
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
-    logger.warning("Redis events not available, using polling fallback")
+    logger.warning("Redis events not available, using in-process run bus")
+
+
+# States after which a run never changes again; the stream closes on them
+TERMINAL_STATES = frozenset({"COMPLETED", "FAILED"})
+_TERMINAL_STATUSES = frozenset(state.lower() for state in TERMINAL_STATES)
+
+# Status messages per state (FAILED is formatted with the run's error)
+_STATE_MESSAGES = {
+    "CREATED": "Workflow created",
+    "PLANNED": "Planning completed",
+    "CRITIQUED": "Critique completed - awaiting approval",
+    "APPROVED": "Approved - ready for execution",
+    "EXECUTING": "Executing workflow",
+    "COMPLETED": "Workflow completed successfully",
+    "STOPPED": "Workflow stopped",
+}
 
 
 def _build_status_event(ctx, run_id: str, current_state: str) -> dict:
     """Build status event payload from context."""
-    state_messages = {
-        "CREATED": "Workflow created",
-        "PLANNED": "Planning completed",
-        "CRITIQUED": "Critique completed - awaiting approval",
-        "APPROVED": "Approved - ready for execution",
-        "EXECUTING": "Executing workflow",
-        "COMPLETED": "Workflow completed successfully",
-        "FAILED": f"Workflow failed: {ctx.error or 'Unknown error'}",
-        "STOPPED": "Workflow stopped",
-    }
-    
-    log_message = state_messages.get(current_state, f"State: {current_state}")
+    if current_state == "FAILED":
+        log_message = f"Workflow failed: {ctx.error or 'Unknown error'}"
+    else:
+        log_message = _STATE_MESSAGES.get(current_state) or f"State: {current_state}"
     
     event_payload = {
         "type": "status",
@@ -57,21 +77,26 @@ def _build_status_event(ctx, run_id: str, current_state: str) -> dict:
     return event_payload
 
 
+# Proposal defaults for plans that omit determinism metadata. Shared by every event
+# and only ever serialized, never mutated (a plain dict, since orjson rejects mappingproxy).
+_DEFAULT_DETERMINISM = {
+    "seed": 0,
+    "prompt_hash": "",
+    "model_version": "bria-edit-2025.1",
+}
+
+
 def _build_proposal_event(ctx, run_id: str) -> dict:
     """Build proposal event for HITL."""
     plan_dict = ctx.plan if isinstance(ctx.plan, dict) else {}
     proposal = {
         "agent": ctx.metadata.get("agent_id", "unknown"),
         "intent": plan_dict.get("intent", ctx.input_data.get("intent", "enhance")),
-        "steps": plan_dict.get("steps", []),
+        "steps": plan_dict.get("steps", ()),
         "estimated_cost_usd": plan_dict.get("estimated_cost_usd", 0.0),
-        "outputs": plan_dict.get("outputs", []),
-        "determinism": plan_dict.get("determinism", {
-            "seed": 0,
-            "prompt_hash": "",
-            "model_version": "bria-edit-2025.1"
-        }),
-        "risk_flags": plan_dict.get("risk_flags", []),
+        "outputs": plan_dict.get("outputs", ()),
+        "determinism": plan_dict.get("determinism", _DEFAULT_DETERMINISM),
+        "risk_flags": plan_dict.get("risk_flags", ()),
         "request_id": run_id,
         "timestamp": ctx.updated_at.isoformat(),
     }
@@ -83,16 +108,44 @@ def _build_proposal_event(ctx, run_id: str) -> dict:
     }
 
 
-async def event_generator(run_id: str) -> AsyncGenerator[dict, None]:
+def _state_change_events(ctx, run_id: str, current_state: str) -> list:
+    """Events sent when a run's state changes: log, proposal (HITL), status, and completion."""
+    event_payload = _build_status_event(ctx, run_id, current_state)
+    events = [{
+        "type": "log",
+        "data": {
+            "message": event_payload["data"]["message"]
+        }
+    }]
+    
+    # Also send proposal event for HITL if needed
+    if ctx.plan and current_state in ["CRITIQUED", "PROPOSED"]:
+        events.append(_build_proposal_event(ctx, run_id))
+    
+    events.append(event_payload)
+    
+    if current_state in TERMINAL_STATES:
+        events.append({
+            "type": "status",
+            "data": {
+                "status": current_state.lower(),
+                "message": f"Run {run_id} finished with state: {current_state}",
+            }
+        })
+    return events
+
+
+async def event_generator(run_id: str) -> AsyncGenerator[Union[dict, List[dict]], None]:
     """
     Generate SSE events for a run.
-    Uses Redis pub/sub if available, otherwise falls back to polling in-memory store.
+    Uses Redis pub/sub if available, otherwise awaits snapshots pushed by run store
+    writes in this process and re-reads the run every RUN_REPOLL_SECONDS without one.
     
     Args:
         run_id: Run ID to stream updates for
     
     Yields:
-        Event dictionaries in SSE format
+        Event dictionaries in SSE format (a list for events sent together)
     """
     # Try Redis pub/sub first if available
     if REDIS_AVAILABLE and hasattr(settings, "REDIS_URL") and settings.REDIS_URL:
@@ -101,100 +154,80 @@ async def event_generator(run_id: str) -> AsyncGenerator[dict, None]:
                 # Transform event to SSE format
                 yield {
                     "event": "message",
-                    "data": json.dumps(event),
+                    "data": orjson.dumps(event),
                 }
                 # Check if workflow is complete
-                if event.get("type") == "status" and event.get("data", {}).get("status") in ["completed", "failed"]:
+                if event.get("type") == "status" and event.get("data", {}).get("status") in _TERMINAL_STATUSES:
                     break
             return
         except Exception as e:
-            logger.warning(f"Redis pub/sub failed for run {run_id}, falling back to polling: {e}")
+            logger.warning(f"Redis pub/sub failed for run {run_id}, falling back to run bus: {e}")
     
-    # Fallback: Poll in-memory store
+    # Fallback: push from the in-process run bus. Subscribe before loading the
+    # current snapshot so no transition between the two is missed.
+    queue = run_bus.subscribe(run_id)
     last_state = None
     last_update = None
     
-    while True:
-        try:
-            # Check if run exists
-            if run_id in _runs_store:
-                ctx = _runs_store[run_id]
-                current_state = ctx.state.value if hasattr(ctx.state, "value") else str(ctx.state)
-                current_update = ctx.updated_at.isoformat() if hasattr(ctx, "updated_at") else None
-                
-                # Only send update if state changed
-                if current_state != last_state or current_update != last_update:
-                    # Send log event
-                    log_event = {
-                        "type": "log",
-                        "data": {
-                            "message": _build_status_event(ctx, run_id, current_state)["data"]["message"]
-                        }
-                    }
-                    yield {
-                        "event": "message",
-                        "data": json.dumps(log_event),
-                    }
-                    
-                    # Send status event
-                    event_payload = _build_status_event(ctx, run_id, current_state)
-                    
-                    # Also send proposal event for HITL if needed
-                    if ctx.plan and current_state in ["CRITIQUED", "PROPOSED"]:
-                        proposal_event = _build_proposal_event(ctx, run_id)
-                        yield {
-                            "event": "message",
-                            "data": json.dumps(proposal_event),
-                        }
-                    
-                    yield {
-                        "event": "message",
-                        "data": json.dumps(event_payload),
-                    }
-                    
-                    last_state = current_state
-                    last_update = current_update
-                    
-                    # If completed or failed, close connection
-                    if current_state in ["COMPLETED", "FAILED"]:
-                        complete_event = {
-                            "type": "status",
-                            "data": {
-                                "status": current_state.lower(),
-                                "message": f"Run {run_id} finished with state: {current_state}",
-                            }
-                        }
-                        yield {
-                            "event": "message",
-                            "data": json.dumps(complete_event),
-                        }
-                        break
-            else:
-                # Run not found
-                yield {
-                    "event": "error",
-                    "data": json.dumps({"error": f"Run {run_id} not found"}),
-                }
-                break
-            
-            # Wait before next check
-            await asyncio.sleep(1)
-        
-        except asyncio.CancelledError:
-            logger.info(f"SSE connection cancelled for run {run_id}")
-            break
-        except Exception as e:
-            logger.error(f"Error in SSE stream for run {run_id}: {e}")
+    try:
+        ctx = await get_run(run_id)
+        if ctx is None:
             yield {
                 "event": "error",
-                "data": json.dumps({"error": str(e)}),
+                "data": orjson.dumps({"error": f"Run {run_id} not found"}),
             }
-            break
+            return
+        
+        while True:
+            # Snapshots from the bus are rebuilt by from_dict, so state is a WorkflowState;
+            # only the initially loaded context may carry a plain string
+            current_state = ctx.state.value if type(ctx.state) is WorkflowState else str(ctx.state)
+            # Compare the datetime itself; it is only formatted when an event is built
+            current_update = ctx.updated_at
+            
+            # Only send update if state changed
+            if current_state != last_state or current_update != last_update:
+                # One write per transition; the client still sees separate messages
+                yield [
+                    {"event": "message", "data": orjson.dumps(event)}
+                    for event in _state_change_events(ctx, run_id, current_state)
+                ]
+                
+                last_state = current_state
+                last_update = current_update
+                
+                # If completed or failed, close connection
+                if current_state in TERMINAL_STATES:
+                    break
+            
+            # Wait for the next write to this run
+            try:
+                ctx = WorkflowContext.from_dict(
+                    await asyncio.wait_for(queue.get(), timeout=RUN_REPOLL_SECONDS)
+                )
+            except asyncio.TimeoutError:
+                # Written by another worker (or not at all): read the stored run
+                ctx = await get_run(run_id) or ctx
+    
+    except asyncio.CancelledError:
+        logger.info(f"SSE connection cancelled for run {run_id}")
+    except Exception as e:
+        logger.error(f"Error in SSE stream for run {run_id}: {e}")
+        yield {
+            "event": "error",
+            "data": orjson.dumps({"error": str(e)}),
+        }
+    finally:
+        run_bus.unsubscribe(run_id, queue)
 
 
 @router.get("/{run_id}/stream")
 async def stream(run_id: str):
-    """Stream workflow updates via Server-Sent Events."""
-    return EventSourceResponse(event_generator(run_id))
+    """
+    Stream workflow updates via Server-Sent Events.
+    A keep-alive comment is sent every PING_INTERVAL_SECONDS while a run is idle
+    (e.g. long EXECUTING phases) so proxies don't drop the connection.
+    """
+    return EventSourceResponse(event_generator(run_id), ping_interval=PING_INTERVAL_SECONDS)
 
 
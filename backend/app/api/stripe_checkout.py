@@ -1,10 +1,13 @@
 """
 Stripe Checkout API endpoints.
 Handles payment session creation and webhooks.
+Stripe SDK calls are blocking HTTP requests, so they run in worker threads.
 """
 
 from fastapi import APIRouter, HTTPException, Request, Header
+from fastapi.responses import ORJSONResponse
 from typing import Optional
+import asyncio
 import logging
 
 from app.models.schemas import (
@@ -13,11 +16,56 @@ from app.models.schemas import (
     CreatePortalSessionRequest,
     PortalSessionResponse
 )
-from app.services.stripe_client import get_stripe_client
+from app.services.stripe_client import construct_webhook_event, get_stripe_client
+from app.services.customer_cache import invalidate_cached_customer
+from app.core.cache import add_generic_cache, delete_generic_cache, set_generic_cache_max
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/stripe", tags=["Stripe"])
+
+# Webhook signing secret, bound once (settings are fixed for the process)
+_WEBHOOK_SECRET = settings.STRIPE_WEBHOOK_SECRET
+
+# Mounted under /api/stripe by app.api.stripe_router
+router = APIRouter(tags=["Stripe"], default_response_class=ORJSONResponse)
+
+# Metadata attached to every checkout session (price_id is added per call)
+_BASE_CHECKOUT_METADATA = {"app": "prolight-ai"}
+
+# Stripe retries deliveries (at-least-once); each event id is handled once
+EVENT_DEDUP_PREFIX = "stripe:evt:"
+EVENT_DEDUP_TTL_SECONDS = 86400
+
+# Events carrying a full object snapshot: one older than the newest seen for the
+# same object is stale and skipped
+SNAPSHOT_EVENT_TYPES = frozenset({"customer.subscription.updated"})
+EVENT_LATEST_PREFIX = "stripe:evt:latest:"
+
+# Stripe event payloads are a few KB; anything larger is rejected before it is read
+MAX_WEBHOOK_BODY_BYTES = 1_048_576
+
+
+async def _read_webhook_body(request: Request) -> bytes:
+    """
+    Read the request body, rejecting it with 413 once it exceeds MAX_WEBHOOK_BODY_BYTES.
+    A declared Content-Length is checked before anything is read; chunked bodies are
+    counted while streaming.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length")
+        if declared > MAX_WEBHOOK_BODY_BYTES:
+            raise HTTPException(status_code=413, detail="Payload too large")
+    
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_WEBHOOK_BODY_BYTES:
+            raise HTTPException(status_code=413, detail="Payload too large")
+    return bytes(body)
 
 
 @router.post("/create-checkout-session", response_model=CheckoutSessionResponse)
@@ -29,29 +77,16 @@ async def create_checkout_session(body: CreateCheckoutSessionRequest):
     try:
         stripe = get_stripe_client()
         
-        # Build line items
-        line_items = [{
-            "price": body.priceId,
-            "quantity": 1,
-        }]
-        
-        # Build discounts if coupon provided
-        discounts = []
-        if body.coupon:
-            discounts.append({"coupon": body.coupon})
-        
         # Create checkout session
-        session = stripe.checkout.Session.create(
+        session = await asyncio.to_thread(
+            stripe.checkout.Session.create,
             payment_method_types=["card"],
-            line_items=line_items,
+            line_items=[{"price": body.priceId, "quantity": 1}],
             mode=body.mode,
-            discounts=discounts if discounts else None,
+            discounts=[{"coupon": body.coupon}] if body.coupon else None,
             success_url=body.successUrl,
             cancel_url=body.cancelUrl,
-            metadata={
-                "app": "prolight-ai",
-                "price_id": body.priceId
-            }
+            metadata={**_BASE_CHECKOUT_METADATA, "price_id": body.priceId}
         )
         
         return CheckoutSessionResponse(id=session["id"], url=session["url"])
@@ -69,7 +104,8 @@ async def create_portal_session(body: CreatePortalSessionRequest):
     try:
         stripe = get_stripe_client()
         
-        session = stripe.billing_portal.Session.create(
+        session = await asyncio.to_thread(
+            stripe.billing_portal.Session.create,
             customer=body.customerId,
             return_url=body.returnUrl
         )
@@ -81,48 +117,74 @@ async def create_portal_session(body: CreatePortalSessionRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+async def handle_stripe_event(event) -> None:
+    """
+    Process a verified Stripe event. Raises on failure.
+    """
+    if event["type"] == "checkout.session.completed":
+        session = event["data"]["object"]
+        logger.info(f"Checkout completed: {session['id']}")
+        customer_details = session.get("customer_details") or {}
+        await invalidate_cached_customer(session.get("customer_email") or customer_details.get("email"))
+        # TODO: Update user subscription status in database
+        
+    elif event["type"] == "customer.subscription.updated":
+        subscription = event["data"]["object"]
+        logger.info(f"Subscription updated: {subscription['id']}")
+        # TODO: Update subscription status in database
+        
+    elif event["type"] == "customer.subscription.deleted":
+        subscription = event["data"]["object"]
+        logger.info(f"Subscription cancelled: {subscription['id']}")
+        # TODO: Mark subscription as cancelled in database
+
+
 @router.post("/webhook")
-async def stripe_webhook(request: Request, stripe_signature: Optional[str] = Header(None)):
+async def stripe_webhook(
+    request: Request,
+    stripe_signature: Optional[str] = Header(None)
+):
     """
     Handle Stripe webhook events.
+    The event is verified, deduplicated and processed before the response: Stripe
+    only retries a delivery that got a non-2xx, so a failure returns 500 (and
+    releases the dedup claim) for the retry to process the event.
     In mock mode, this will log events but not process them.
     """
-    payload = await request.body()
+    payload = await _read_webhook_body(request)
     
-    if settings.USE_MOCK_STRIPE or not settings.STRIPE_WEBHOOK_SECRET:
+    if settings.USE_MOCK_STRIPE or not _WEBHOOK_SECRET:
         # Mock mode - just log the event
         logger.info(f"Mock webhook received: {len(payload)} bytes")
         return {"status": "success", "mode": "mock"}
     
-    # Real Stripe webhook processing
+    # Real Stripe webhook processing (payload is verified as raw bytes)
     try:
-        import stripe
-        event = stripe.Webhook.construct_event(
-            payload, stripe_signature, settings.STRIPE_WEBHOOK_SECRET
-        )
-        
-        # Handle different event types
-        if event["type"] == "checkout.session.completed":
-            session = event["data"]["object"]
-            logger.info(f"Checkout completed: {session['id']}")
-            # TODO: Update user subscription status in database
-            
-        elif event["type"] == "customer.subscription.updated":
-            subscription = event["data"]["object"]
-            logger.info(f"Subscription updated: {subscription['id']}")
-            # TODO: Update subscription status in database
-            
-        elif event["type"] == "customer.subscription.deleted":
-            subscription = event["data"]["object"]
-            logger.info(f"Subscription cancelled: {subscription['id']}")
-            # TODO: Mark subscription as cancelled in database
-        
-        return {"status": "success"}
-        
+        event = construct_webhook_event(payload, stripe_signature, _WEBHOOK_SECRET)
     except ValueError as e:
         logger.error(f"Invalid payload: {e}")
         raise HTTPException(status_code=400, detail="Invalid payload")
     except Exception as e:
-        logger.error(f"Webhook processing failed: {e}")
+        logger.error(f"Webhook verification failed: {e}")
         raise HTTPException(status_code=400, detail=str(e))
-
+    
+    # Redeliveries are acknowledged without reprocessing (no-op without Redis)
+    event_key = f"{EVENT_DEDUP_PREFIX}{event['id']}"
+    if await add_generic_cache(event_key, event["created"], ttl=EVENT_DEDUP_TTL_SECONDS) is False:
+        logger.info(f"Duplicate webhook event {event['id']} ignored")
+        return {"status": "duplicate"}
+    
+    if event["type"] in SNAPSHOT_EVENT_TYPES:
+        latest_key = f"{EVENT_LATEST_PREFIX}{event['type']}:{event['data']['object']['id']}"
+        if await set_generic_cache_max(latest_key, event["created"], ttl=EVENT_DEDUP_TTL_SECONDS) is False:
+            logger.info(f"Stale webhook event {event['id']} ({event['type']}) ignored")
+            return {"status": "stale"}
+    
+    try:
+        await handle_stripe_event(event)
+    except Exception as e:
+        logger.error(f"Webhook event {event['id']} processing failed: {e}", exc_info=True)
+        await delete_generic_cache(event_key)
+        raise HTTPException(status_code=500, detail="Webhook processing failed")
+    
+    return {"status": "success"}
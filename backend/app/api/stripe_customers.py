@@ -1,22 +1,30 @@
 """
 Stripe customer management endpoints.
 Handles creation and synchronization of Stripe customers with local user records.
+Stripe SDK calls are blocking HTTP requests, so they run in worker threads.
 """
+import asyncio
 import os
 import stripe
 from fastapi import APIRouter, Depends, HTTPException, Header
-from typing import Optional
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from typing import Any, Optional, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.db import SessionLocal
-from app.models.billing import User, Subscription
-from app.auth.role_middleware import get_current_user
+from app.db import get_async_db
+from app.models.billing import Subscription
+from app.models.user import User
+from app.auth.role_middleware import authorization_email, get_current_user_async
 from app.core.config import settings
 from app.services.stripe_client import get_stripe_client
+from app.services.customer_cache import get_cached_customer, set_cached_customer, invalidate_cached_customer
 from datetime import datetime
+from functools import lru_cache
 
-router = APIRouter(prefix="/api/stripe", tags=["Stripe Customers"])
+# Mounted under /api/stripe by app.api.stripe_router
+router = APIRouter(tags=["Stripe Customers"], default_response_class=ORJSONResponse)
 
 # Initialize Stripe
 if settings.STRIPE_SECRET_KEY and not settings.USE_MOCK_STRIPE:
@@ -25,13 +33,10 @@ else:
     stripe.api_key = "sk_test_mock_key_for_development"
 
 
-def get_db():
-    """Dependency to get database session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def _get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    """Load the local user record for an email."""
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
 
 class CustomerResponse(BaseModel):
@@ -53,47 +58,50 @@ class CreateSubscriptionRequest(BaseModel):
     trial_period_days: int = 0
 
 
-@router.post("/create_customer", response_model=CreateCustomerResponse)
-def create_stripe_customer(
-    db: Session = Depends(get_db),
+# (user_email, user_id, full_name, db_user)
+ResolvedUser = Tuple[str, Any, Optional[str], Optional[User]]
+
+
+async def _resolve_user(
+    db: AsyncSession = Depends(get_async_db),
     authorization: Optional[str] = Header(None)
-):
-    """
-    Create a Stripe customer for the current user (if missing) and persist stripe_customer_id.
-    Idempotent: returns existing stripe_customer_id if present.
+) -> ResolvedUser:
     """
-    # Get current user
-    current_user = get_current_user(authorization, db)
-    
-    # Extract user info (handle both User model and dict)
-    if hasattr(current_user, 'email'):
-        user_email = current_user.email
-        user_id = current_user.id
-        full_name = getattr(current_user, 'full_name', None) or getattr(current_user, 'name', None)
-        db_user = current_user if isinstance(current_user, User) else None
-    elif isinstance(current_user, dict):
-        user_email = current_user.get("email")
-        user_id = current_user.get("id")
-        full_name = current_user.get("full_name") or current_user.get("name")
-        db_user = None
-    else:
-        raise HTTPException(status_code=401, detail="Invalid user")
+    Authenticate the caller and load their local user record.
+    Used as a dependency, so FastAPI resolves it once per request (sharing the
+    request's session); get_customer calls it directly after its cache check.
     
-    if not user_email:
-        raise HTTPException(status_code=400, detail="User email not found")
+    Returns:
+        (user_email, user_id, full_name, db_user); db_user is None if there is no record
+    """
+    current_user = await get_current_user_async(authorization, db)
     
-    # Try to get user from database
-    if not db_user:
-        db_user = db.query(User).filter(User.email == user_email).first()
+    # Auth returns the DB user when it finds one; only mock users need a lookup
+    user_email = current_user.email
+    db_user = current_user if isinstance(current_user, User) else await _get_user_by_email(db, user_email)
     
-    # If user exists in DB and has Stripe customer ID, return it
+    return user_email, current_user.id, current_user.full_name, db_user
+
+
+async def _ensure_stripe_customer(
+    db: AsyncSession,
+    user_email: str,
+    user_id,
+    full_name: Optional[str],
+    db_user: Optional[User],
+) -> User:
+    """
+    Return the user record, creating its Stripe customer (and the record) if missing.
+    Idempotent: a user that already has a stripe_customer_id is returned unchanged.
+    """
     if db_user and db_user.stripe_customer_id:
-        return CreateCustomerResponse(stripe_customer_id=db_user.stripe_customer_id)
+        return db_user
     
     # Create Stripe customer
     try:
         if not settings.USE_MOCK_STRIPE:
-            cust = stripe.Customer.create(
+            cust = await asyncio.to_thread(
+                stripe.Customer.create,
                 email=user_email,
                 name=full_name or None,
                 metadata={"user_id": str(user_id)}
@@ -105,63 +113,66 @@ def create_stripe_customer(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Stripe error: {str(e)}")
     
-    # Create or update user in database
+    # Create or update user in database (no refresh: the session keeps loaded
+    # attributes across commit, and an INSERT returns the new row)
     if db_user:
         db_user.stripe_customer_id = customer_id
         db.add(db_user)
     else:
         # Create new user record
-        db_user = User(
-            email=user_email,
-            stripe_customer_id=customer_id,
-            full_name=full_name,
-            role="viewer"  # Default role
+        result = await db.execute(
+            insert(User)
+            .values(
+                email=user_email,
+                stripe_customer_id=customer_id,
+                full_name=full_name,
+                role="viewer"  # Default role
+            )
+            .returning(User)
         )
-        db.add(db_user)
+        db_user = result.scalar_one()
     
-    db.commit()
-    db.refresh(db_user)
-    return CreateCustomerResponse(stripe_customer_id=customer_id)
+    await db.commit()
+    await invalidate_cached_customer(user_email)
+    return db_user
+
+
+@router.post("/create_customer", response_model=CreateCustomerResponse)
+async def create_stripe_customer(
+    db: AsyncSession = Depends(get_async_db),
+    resolved: ResolvedUser = Depends(_resolve_user)
+):
+    """
+    Create a Stripe customer for the current user (if missing) and persist stripe_customer_id.
+    Idempotent: returns existing stripe_customer_id if present.
+    """
+    user_email, user_id, full_name, db_user = resolved
+    db_user = await _ensure_stripe_customer(db, user_email, user_id, full_name, db_user)
+    return CreateCustomerResponse(stripe_customer_id=db_user.stripe_customer_id)
 
 
 @router.post("/attach_payment_method")
-def attach_payment_method(
+async def attach_payment_method(
     payload: AttachPaymentMethodRequest,
-    db: Session = Depends(get_db),
-    authorization: Optional[str] = Header(None)
+    db: AsyncSession = Depends(get_async_db),
+    resolved: ResolvedUser = Depends(_resolve_user)
 ):
     """
     Attach a PaymentMethod to the current user's Stripe Customer and set as default.
     """
-    # Get current user
-    current_user = get_current_user(authorization, db)
-    
-    # Extract user info
-    if hasattr(current_user, 'email'):
-        user_email = current_user.email
-        db_user = current_user if isinstance(current_user, User) else None
-    elif isinstance(current_user, dict):
-        user_email = current_user.get("email")
-        db_user = None
-    else:
-        raise HTTPException(status_code=401, detail="Invalid user")
-    
-    # Ensure user exists in DB and has Stripe customer
-    if not db_user:
-        db_user = db.query(User).filter(User.email == user_email).first()
-    
-    if not db_user or not db_user.stripe_customer_id:
-        # create customer first (idempotent)
-        _ = create_stripe_customer(db, authorization)
-        db_user = db.query(User).filter(User.email == user_email).first()
+    # Ensure user exists in DB and has Stripe customer (idempotent)
+    user_email, user_id, full_name, db_user = resolved
+    db_user = await _ensure_stripe_customer(db, user_email, user_id, full_name, db_user)
     
     try:
         if not settings.USE_MOCK_STRIPE:
-            stripe.PaymentMethod.attach(
+            await asyncio.to_thread(
+                stripe.PaymentMethod.attach,
                 payload.payment_method_id,
                 customer=db_user.stripe_customer_id
             )
-            stripe.Customer.modify(
+            await asyncio.to_thread(
+                stripe.Customer.modify,
                 db_user.stripe_customer_id,
                 invoice_settings={"default_payment_method": payload.payment_method_id}
             )
@@ -171,38 +182,39 @@ def attach_payment_method(
 
 
 @router.get("/customer")
-def get_customer(
-    db: Session = Depends(get_db),
+async def get_customer(
+    db: AsyncSession = Depends(get_async_db),
     authorization: Optional[str] = Header(None)
 ):
     """
     Get the current user's Stripe customer information.
+    Served from the customer cache when possible (no database round-trip).
     """
-    # Get current user
-    current_user = get_current_user(authorization, db)
-    
-    # Extract user info
-    if hasattr(current_user, 'email'):
-        user_email = current_user.email
-        db_user = current_user if isinstance(current_user, User) else None
-    elif isinstance(current_user, dict):
-        user_email = current_user.get("email")
-        db_user = None
-    else:
-        raise HTTPException(status_code=401, detail="Invalid user")
-    
-    # Get user from DB
-    if not db_user:
-        db_user = db.query(User).filter(User.email == user_email).first()
+    # Tokens that map to an email are always accepted, so a cached summary can be
+    # returned before the user lookup
+    token_email = authorization_email(authorization)
+    if token_email:
+        cached = await get_cached_customer(token_email)
+        if cached is not None:
+            return cached
     
+    _, _, _, db_user = await _resolve_user(db, authorization)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return {
+    customer = {
         "stripe_customer_id": db_user.stripe_customer_id,
         "email": db_user.email,
         "role": db_user.role
     }
+    await set_cached_customer(db_user.email, customer)
+    return customer
+
+
+@lru_cache(maxsize=4096)
+def _utc_from_epoch(ts: int) -> datetime:
+    # Period boundaries repeat across subscriptions; datetimes are immutable, so shared
+    return datetime.utcfromtimestamp(ts)
 
 
 def func_to_datetime(ts):
@@ -210,47 +222,29 @@ def func_to_datetime(ts):
     if not ts:
         return None
     try:
-        return datetime.utcfromtimestamp(int(ts))
+        return _utc_from_epoch(int(ts))
     except Exception:
         return None
 
 
 @router.post("/create_subscription")
-def create_subscription(
+async def create_subscription(
     payload: CreateSubscriptionRequest,
-    db: Session = Depends(get_db),
-    authorization: Optional[str] = Header(None)
+    db: AsyncSession = Depends(get_async_db),
+    resolved: ResolvedUser = Depends(_resolve_user)
 ):
     """
     Create a subscription for the current user. Stores subscription & subscription_item IDs.
     - For metered usage, subscription_item_id is needed for usage reporting (store it).
     """
-    # Get current user
-    current_user = get_current_user(authorization, db)
-    
-    # Extract user info
-    if hasattr(current_user, 'email'):
-        user_email = current_user.email
-        user_id = current_user.id
-        db_user = current_user if isinstance(current_user, User) else None
-    elif isinstance(current_user, dict):
-        user_email = current_user.get("email")
-        user_id = current_user.get("id")
-        db_user = None
-    else:
-        raise HTTPException(status_code=401, detail="Invalid user")
-    
-    # Ensure user exists in DB and has Stripe customer
-    if not db_user:
-        db_user = db.query(User).filter(User.email == user_email).first()
-    
-    if not db_user or not db_user.stripe_customer_id:
-        _ = create_stripe_customer(db, authorization)
-        db_user = db.query(User).filter(User.email == user_email).first()
+    # Ensure user exists in DB and has Stripe customer (idempotent)
+    user_email, user_id, full_name, db_user = resolved
+    db_user = await _ensure_stripe_customer(db, user_email, user_id, full_name, db_user)
     
     try:
         if not settings.USE_MOCK_STRIPE:
-            sub = stripe.Subscription.create(
+            sub = await asyncio.to_thread(
+                stripe.Subscription.create,
                 customer=db_user.stripe_customer_id,
                 items=[{"price": payload.price_id}],
                 trial_period_days=payload.trial_period_days or None,
@@ -290,6 +284,5 @@ def create_subscription(
         current_period_end=func_to_datetime(sub.get("current_period_end"))
     )
     db.add(subscription)
-    db.commit()
-    db.refresh(subscription)
+    await db.commit()
     return {"subscription_id": sub["id"], "subscription_item_id": item["id"]}
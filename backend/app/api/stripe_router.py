@@ -0,0 +1,12 @@
+"""
+Stripe API router.
+Checkout/webhook and customer endpoints share one /api/stripe prefix, declared here
+once; include this router instead of the per-module ones.
+"""
+from fastapi import APIRouter
+
+from app.api import stripe_checkout, stripe_customers
+
+router = APIRouter(prefix="/api/stripe")
+router.include_router(stripe_checkout.router)
+router.include_router(stripe_customers.router)
@@ -3,25 +3,88 @@ Text-to-Image Generation API endpoints with deterministic generation,
 caching, job queue, and SSE status updates.
 """
 from fastapi import APIRouter, HTTPException, Query, Depends
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any, AsyncGenerator
 from datetime import datetime
-import uuid
-import secrets
+import base64
+import os
+import random
 import logging
-import json
+import orjson
 import asyncio
-from sqlalchemy.orm import Session
-
+import time
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.orm import Session, load_only
+
+from app.api.s3 import (
+    AWS_ACCESS_KEY_ID,
+    AWS_SECRET_ACCESS_KEY,
+    AWS_SESSION_TOKEN,
+    S3_BUCKET,
+    S3_REGION,
+    _PUBLIC_URL_BASE,
+    next_key_prefix,
+    s3,
+    sanitize_filename,
+)
 from app.db import SessionLocal
+from app.events.job_events import subscribe_job_events, unsubscribe_job_events
 from app.models.image_generation import ImageJob, Artifact
-from app.services.prompt_cache import compute_prompt_hash, lookup_cache, store_cache
+from app.services.prompt_cache import compute_prompt_hash, lookup_cache
 from app.services.cost_estimator import estimate_cost
-from app.clients.bria_client import BriaClient
+from app.services.job_queue import enqueue_image_job
+from app.utils.s3_presign import presign_url
+from app.utils.sse import EventSourceResponse
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Progress percent reported for each job status
+_PROGRESS_MAP = {
+    "queued": 10,
+    "processing": 30,
+    "generating": 60,
+    "evaluating": 80,
+    "uploading": 90,
+    "completed": 100,
+    "failed": 0,
+    "cancelled": 0
+}
+
+# Serialized progress events per status, split around the run_id value:
+# head + orjson.dumps(run_id) + tail. Byte-identical to dumping the full dict.
+_PROGRESS_EVENT_HEAD = b'{"type":"progress","run_id":'
+_PROGRESS_EVENT_TAILS = {
+    status: b"," + orjson.dumps({
+        "percent": percent,
+        "step": status,
+        "message": f"Status: {status}",
+        "payload": {}
+    })[1:]
+    for status, percent in _PROGRESS_MAP.items()
+}
+
+# Seeds for requests that don't pin one (OS entropy; no shared Mersenne Twister state)
+_seed_rng = random.SystemRandom()
+
+# Job statuses after which no further events are sent
+_FINAL_JOB_STATUSES = frozenset({"completed", "failed", "cancelled"})
+
+# Pause before a stream resubscribes after losing the Redis feed
+JOB_RESUBSCRIBE_DELAY_SECONDS = 2
+
+# Streams end after this long (a stuck job must not hold a stream open forever)
+SSE_STREAM_MAX_SECONDS = 3600
+
+# Database polling without Redis: back off while nothing changes, tighten on change
+POLL_MIN_INTERVAL_SECONDS = 0.5
+POLL_MAX_INTERVAL_SECONDS = 10.0
+POLL_BACKOFF_FACTOR = 1.5
+
+# With Redis, re-read the job row when no event has arrived for this long:
+# job status is written to the database, and not every writer publishes events
+JOB_REPOLL_SECONDS = 2.0
 
 
 # ============================================================================
@@ -30,12 +93,16 @@ router = APIRouter()
 
 class GuidanceImage(BaseModel):
     """Guidance image configuration."""
+    model_config = ConfigDict(extra="forbid")
+
     url: str = Field(..., description="URL of guidance image")
     role: str = Field("reference", description="Role: reference, style, texture")
 
 
 class ControlNetConfig(BaseModel):
     """ControlNet configuration."""
+    model_config = ConfigDict(extra="forbid")
+
     name: str = Field(..., description="ControlNet name (e.g., canny, depth, recoloring)")
     weight: float = Field(0.8, ge=0.0, le=1.0, description="ControlNet weight (0-1)")
     mask_url: Optional[str] = Field(None, description="Optional mask URL")
@@ -43,6 +110,8 @@ class ControlNetConfig(BaseModel):
 
 class TextToImageRequest(BaseModel):
     """Request for text-to-image generation."""
+    model_config = ConfigDict(extra="forbid")
+
     prompt: Optional[str] = Field(None, description="Free text prompt")
     fibo_json: Optional[Dict[str, Any]] = Field(None, description="Optional structured FIBO JSON override")
     model: str = Field("bria-fibo-v1", description="Model identifier")
@@ -141,16 +210,16 @@ async def create_text_to_image_job(
     guidance images, and ControlNet configuration.
     """
     try:
-        # Generate IDs
-        request_id = f"req_{uuid.uuid4().hex[:16]}"
-        run_id = f"run_{uuid.uuid4().hex[:16]}"
-        sse_token = secrets.token_urlsafe(32)
+        # Generate IDs from one CSPRNG draw (64-bit ids, 256-bit SSE token as before)
+        raw = os.urandom(48)
+        request_id = f"req_{raw[:8].hex()}"
+        run_id = f"run_{raw[8:16].hex()}"
+        sse_token = base64.urlsafe_b64encode(raw[16:]).rstrip(b"=").decode()
         
         # Generate seed if not provided
         seed = request.seed
         if seed is None:
-            import random
-            seed = random.randint(1, 2**31 - 1)
+            seed = _seed_rng.getrandbits(31) or 1
         
         # Compute prompt hash
         prompt_hash = compute_prompt_hash(
@@ -198,40 +267,45 @@ async def create_text_to_image_job(
                 "mask_url": request.controlnet.mask_url
             }
         
-        # Create job record
+        # Create job record. Core INSERT: the row is not used again in this request,
+        # so it skips the ORM unit of work. created_at is set here so the response
+        # needs no SELECT after the INSERT.
+        queued_at = datetime.utcnow()
+        job_values = {
+            "created_at": queued_at,
+            "request_id": request_id,
+            "run_id": run_id,
+            "prompt_text": request.prompt,
+            "prompt_hash": prompt_hash,
+            "fibo_json": request.fibo_json,
+            "model_version": request.model,
+            "seed": seed,
+            "cost_estimate_cents": est_cost,
+            "width": request.width,
+            "height": request.height,
+            "num_variants": request.num_variants,
+            "guidance_images": guidance_images_json,
+            "controlnet_config": controlnet_json,
+            "refine_mode": request.refine_mode,
+            "meta": request.meta,
+            "sse_token": sse_token,
+        }
         if cached_result:
             # Cache hit - return cached artifact immediately
-            job = ImageJob(
-                request_id=request_id,
-                run_id=run_id,
-                prompt_text=request.prompt,
-                prompt_hash=prompt_hash,
-                fibo_json=request.fibo_json,
-                model_version=request.model,
-                seed=seed,
+            db.execute(insert(ImageJob).values(
+                **job_values,
                 status="completed",  # Already cached
                 cost_cents=0,  # No cost for cache hit
-                cost_estimate_cents=est_cost,
-                width=request.width,
-                height=request.height,
-                num_variants=request.num_variants,
-                guidance_images=guidance_images_json,
-                controlnet_config=controlnet_json,
-                refine_mode=request.refine_mode,
-                meta=request.meta,
-                sse_token=sse_token,
                 cached_hit=True
-            )
-            db.add(job)
+            ))
             db.commit()
-            db.refresh(job)
             
             return TextToImageResponse(
                 request_id=request_id,
                 run_id=run_id,
                 seed=seed,
                 model_version=request.model,
-                queued_at=datetime.utcnow(),
+                queued_at=queued_at,
                 est_cost_cents=0,
                 sse_token=sse_token,
                 cached_hit=True,
@@ -239,105 +313,106 @@ async def create_text_to_image_job(
             )
         else:
             # Cache miss - create job for processing
-            job = ImageJob(
+            db.execute(insert(ImageJob).values(
+                **job_values,
                 user_id=request.meta.get("user_id") if request.meta else None,
-                request_id=request_id,
-                run_id=run_id,
-                prompt_text=request.prompt,
-                prompt_hash=prompt_hash,
-                fibo_json=request.fibo_json,
-                model_version=request.model,
-                seed=seed,
                 status="queued",
-                cost_estimate_cents=est_cost,
-                width=request.width,
-                height=request.height,
-                num_variants=request.num_variants,
-                guidance_images=guidance_images_json,
-                controlnet_config=controlnet_json,
-                refine_mode=request.refine_mode,
-                meta=request.meta,
-                sse_token=sse_token,
                 cached_hit=False
-            )
-            db.add(job)
+            ))
             db.commit()
-            db.refresh(job)
             
-            # TODO: Enqueue job to worker queue (BullMQ/Redis)
-            # For now, we'll just return the job info
-            # In production, this would trigger async processing
+            # Hand the job to the generation workers. A job no worker will see must
+            # not be reported as queued: fail it and let the client retry.
+            if not await enqueue_image_job({"run_id": run_id, "request_id": request_id}):
+                logger.warning(f"Job {run_id} not enqueued: worker queue unavailable")
+                db.query(ImageJob).filter(ImageJob.run_id == run_id).update(
+                    {"status": "failed"}, synchronize_session=False
+                )
+                db.commit()
+                raise HTTPException(status_code=503, detail="Job queue unavailable")
             
             return TextToImageResponse(
                 request_id=request_id,
                 run_id=run_id,
                 seed=seed,
                 model_version=request.model,
-                queued_at=job.created_at,
+                queued_at=queued_at,
                 est_cost_cents=est_cost,
                 sse_token=sse_token,
                 cached_hit=False
             )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating text-to-image job: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+_STATUS_JOB_COLUMNS = load_only(
+    ImageJob.run_id, ImageJob.status, ImageJob.cached_hit, ImageJob.seed,
+    ImageJob.model_version, ImageJob.cost_cents
+)
+_STATUS_ARTIFACT_COLUMNS = load_only(
+    Artifact.url, Artifact.thumb_url, Artifact.width, Artifact.height, Artifact.variant_index,
+    Artifact.evaluator_score, Artifact.semantic_score, Artifact.perceptual_score, Artifact.meta
+)
+
+
+def _artifact_to_dict(art: Artifact) -> Dict[str, Any]:
+    """Artifact row as an ArtifactInfo-shaped dict (no model construction)."""
+    return {
+        "id": str(art.id),
+        "url": art.url,
+        "thumb_url": art.thumb_url,
+        "width": art.width,
+        "height": art.height,
+        "variant_index": art.variant_index,
+        "evaluator_score": art.evaluator_score,
+        "semantic_score": art.semantic_score,
+        "perceptual_score": art.perceptual_score,
+        "meta": art.meta
+    }
+
+
 @router.get("/status/{run_id}", response_model=StatusResponse)
 async def get_status(
     run_id: str,
     db: Session = Depends(get_db)
 ):
     """Get status of a generation run."""
-    job = db.query(ImageJob).filter(ImageJob.run_id == run_id).first()
-    if not job:
+    # Job and artifacts in one query, loading only the columns in the response
+    rows = (
+        db.query(ImageJob, Artifact)
+        .outerjoin(Artifact, Artifact.job_id == ImageJob.id)
+        .filter(ImageJob.run_id == run_id)
+        .options(_STATUS_JOB_COLUMNS, _STATUS_ARTIFACT_COLUMNS)
+        .all()
+    )
+    if not rows:
         raise HTTPException(status_code=404, detail="Run not found")
-    
-    # Fetch artifacts
-    artifacts = db.query(Artifact).filter(Artifact.job_id == job.id).all()
+    job = rows[0][0]
+    artifacts = [art for _, art in rows if art is not None]
     
     # Determine progress
-    progress_map = {
-        "queued": 10,
-        "processing": 30,
-        "generating": 60,
-        "evaluating": 80,
-        "uploading": 90,
-        "completed": 100,
-        "failed": 0,
-        "cancelled": 0
-    }
-    progress = progress_map.get(job.status, 0)
+    progress = _PROGRESS_MAP.get(job.status, 0)
     
-    artifact_infos = [
-        ArtifactInfo(
-            id=str(art.id),
-            url=art.url,
-            thumb_url=art.thumb_url,
-            width=art.width,
-            height=art.height,
-            variant_index=art.variant_index,
-            evaluator_score=art.evaluator_score,
-            semantic_score=art.semantic_score,
-            perceptual_score=art.perceptual_score,
-            meta=art.meta
-        )
-        for art in artifacts
-    ]
+    # Plain dicts: response_model validates and serializes them once (returning
+    # model instances would build every model twice)
+    artifact_infos = [_artifact_to_dict(art) for art in artifacts]
     
-    return StatusResponse(
-        run_id=job.run_id,
-        status=job.status,
-        progress_percent=progress,
-        step=job.status,
-        message=f"Status: {job.status}",
-        artifacts=artifact_infos,
-        cached_hit=job.cached_hit,
-        seed=job.seed,
-        model_version=job.model_version,
-        cost_cents=job.cost_cents
-    )
+    return {
+        "run_id": job.run_id,
+        "status": job.status,
+        "progress_percent": progress,
+        "step": job.status,
+        "message": f"Status: {job.status}",
+        "artifacts": artifact_infos,
+        "cached_hit": job.cached_hit,
+        "seed": job.seed,
+        "model_version": job.model_version,
+        "cost_cents": job.cost_cents
+    }
 
 
 @router.post("/uploads/presign", response_model=PresignResponse)
@@ -348,33 +423,30 @@ async def presign_upload(
     Generate presigned URL for guidance image upload.
     
     Returns a presigned PUT URL for uploading guidance images to S3/MinIO.
+    Signing is local and pure CPU (microseconds), so it runs on the event loop.
     """
+    if not S3_BUCKET or not s3:
+        raise HTTPException(status_code=500, detail="S3 not configured")
+    
     try:
-        # Import S3 client (reuse from s3.py)
-        from app.api.s3 import s3, S3_BUCKET, S3_REGION
+        # Generate unique, URL-safe key
+        key = f"prolight/guidance/{next_key_prefix()}_{sanitize_filename(request.filename)}"
         
-        if not S3_BUCKET or not s3:
-            raise HTTPException(status_code=500, detail="S3 not configured")
-        
-        # Generate unique key
-        import time
-        timestamp = int(time.time())
-        key = f"prolight/guidance/{timestamp}_{request.filename.replace(' ', '_')}"
-        
-        # Generate presigned PUT URL
-        upload_url = s3.generate_presigned_url(
-            "put_object",
-            Params={
-                "Bucket": S3_BUCKET,
-                "Key": key,
-                "ContentType": request.content_type
-            },
-            ExpiresIn=900,  # 15 minutes
-            HttpMethod="PUT"
+        # Presigned PUT URL, signed locally (SigV4) like the /s3 endpoints
+        upload_url = presign_url(
+            S3_BUCKET,
+            S3_REGION,
+            key,
+            AWS_ACCESS_KEY_ID,
+            AWS_SECRET_ACCESS_KEY,
+            method="PUT",
+            expires_in=900,  # 15 minutes
+            content_type=request.content_type,
+            session_token=AWS_SESSION_TOKEN,
         )
         
         # Construct public URL
-        public_url = f"https://{S3_BUCKET}.s3.{S3_REGION}.amazonaws.com/{key}"
+        public_url = _PUBLIC_URL_BASE + key
         
         return PresignResponse(
             upload_url=upload_url,
@@ -413,6 +485,88 @@ async def lookup_prompt_cache(
         return {"cache_hit": False}
 
 
+def _job_events(db: Session, run_id: str, last_status: Optional[str], artifact_cursor: Optional[tuple]):
+    """
+    Read a job from the database and build the SSE events for what changed since
+    the previous read.
+    The job and its new artifacts come back in one query: artifacts are joined
+    past the (created_at, id) cursor of the last one sent, in that order.
+    
+    Returns:
+        (serialized events, last_status, artifact_cursor, done)
+    """
+    events = []
+    artifact_join = Artifact.job_id == ImageJob.id
+    if artifact_cursor is not None:
+        last_created_at, last_id = artifact_cursor
+        artifact_join = and_(
+            artifact_join,
+            or_(
+                Artifact.created_at > last_created_at,
+                and_(Artifact.created_at == last_created_at, Artifact.id > last_id)
+            )
+        )
+    rows = (
+        db.query(ImageJob, Artifact)
+        .outerjoin(Artifact, artifact_join)
+        .filter(ImageJob.run_id == run_id)
+        .order_by(Artifact.created_at, Artifact.id)
+        .populate_existing()  # the session is reused across polls: refresh the job row
+        .all()
+    )
+    if not rows:
+        events.append(orjson.dumps({'type': 'error', 'message': 'Job not found'}))
+        return events, last_status, artifact_cursor, True
+    job = rows[0][0]
+    
+    # Check if status changed
+    if job.status != last_status:
+        # Send progress event
+        tail = _PROGRESS_EVENT_TAILS.get(job.status)
+        if tail is not None:
+            events.append(_PROGRESS_EVENT_HEAD + orjson.dumps(run_id) + tail)
+        else:
+            events.append(orjson.dumps({
+                "type": "progress",
+                "run_id": run_id,
+                "percent": 0,
+                "step": job.status,
+                "message": f"Status: {job.status}",
+                "payload": {}
+            }))
+        last_status = job.status
+    
+    # New artifacts (None when the outer join matched nothing)
+    for _, art in rows:
+        if art is not None:
+            events.append(orjson.dumps({
+                "type": "artifact",
+                "run_id": run_id,
+                "step": "upload",
+                "message": "Artifact ready",
+                "payload": {
+                    "artifacts": [_artifact_to_dict(art)]
+                }
+            }))
+            artifact_cursor = (art.created_at, art.id)
+    
+    # Check if completed or failed
+    done = job.status in _FINAL_JOB_STATUSES
+    if done:
+        events.append(orjson.dumps({
+            "type": "final",
+            "run_id": run_id,
+            "status": job.status,
+            "message": f"Job {job.status}",
+            "payload": {
+                "cost_cents": job.cost_cents,
+                "cached_hit": job.cached_hit
+            }
+        }))
+    
+    return events, last_status, artifact_cursor, done
+
+
 @router.get("/status/stream/{run_id}")
 async def stream_status(
     run_id: str,
@@ -422,6 +576,16 @@ async def stream_status(
     """
     Stream real-time status updates via Server-Sent Events (SSE).
     
+    The current state is read from the database on connect (and again after the
+    Redis feed reconnects); after that, events published on the job's channel
+    (app.events.job_events) are pushed as they arrive, and the database is
+    re-read whenever the feed has been idle for JOB_REPOLL_SECONDS (2s), so
+    status written without an event still reaches the client. Without Redis the database
+    is polled with backoff: every POLL_MIN_INTERVAL_SECONDS (0.5s) while events
+    keep coming, growing by POLL_BACKOFF_FACTOR (1.5x) per idle poll up to
+    POLL_MAX_INTERVAL_SECONDS (10s). Either way the stream is closed after
+    SSE_STREAM_MAX_SECONDS (one hour).
+    
     Events:
     - progress: Progress updates with percent and step
     - log: Log messages
@@ -438,90 +602,56 @@ async def stream_status(
     if not job:
         raise HTTPException(status_code=404, detail="Run not found or invalid token")
     
-    async def event_generator() -> AsyncGenerator[str, None]:
+    async def event_generator() -> AsyncGenerator[Dict[str, Any], None]:
         """Generate SSE events for status updates."""
         last_status = None
-        last_artifact_count = 0
+        artifact_cursor = None
+        poll_interval = POLL_MIN_INTERVAL_SECONDS
+        deadline = time.monotonic() + SSE_STREAM_MAX_SECONDS
+        # Subscribe before the snapshot so nothing published in between is missed
+        queue = await subscribe_job_events(run_id)
         
         try:
             while True:
-                # Query latest status
-                job = db.query(ImageJob).filter(ImageJob.run_id == run_id).first()
-                if not job:
-                    yield f"data: {json.dumps({'type': 'error', 'message': 'Job not found'})}\n\n"
+                events, last_status, artifact_cursor, done = _job_events(
+                    db, run_id, last_status, artifact_cursor
+                )
+                for event in events:
+                    yield {"data": event}
+                if done:
                     break
                 
-                # Check if status changed
-                if job.status != last_status:
-                    # Send progress event
-                    progress_map = {
-                        "queued": 10,
-                        "processing": 30,
-                        "generating": 60,
-                        "evaluating": 80,
-                        "uploading": 90,
-                        "completed": 100,
-                        "failed": 0,
-                        "cancelled": 0
-                    }
-                    progress = progress_map.get(job.status, 0)
-                    
-                    event = {
-                        "type": "progress",
-                        "run_id": run_id,
-                        "percent": progress,
-                        "step": job.status,
-                        "message": f"Status: {job.status}",
-                        "payload": {}
-                    }
-                    yield f"data: {json.dumps(event)}\n\n"
-                    last_status = job.status
-                
-                # Check for new artifacts
-                artifacts = db.query(Artifact).filter(Artifact.job_id == job.id).all()
-                if len(artifacts) > last_artifact_count:
-                    new_artifacts = artifacts[last_artifact_count:]
-                    for art in new_artifacts:
-                        artifact_event = {
-                            "type": "artifact",
-                            "run_id": run_id,
-                            "step": "upload",
-                            "message": "Artifact ready",
-                            "payload": {
-                                "artifacts": [{
-                                    "id": str(art.id),
-                                    "url": art.url,
-                                    "thumb_url": art.thumb_url,
-                                    "width": art.width,
-                                    "height": art.height,
-                                    "variant_index": art.variant_index,
-                                    "evaluator_score": art.evaluator_score,
-                                    "semantic_score": art.semantic_score,
-                                    "perceptual_score": art.perceptual_score,
-                                    "meta": art.meta
-                                }]
-                            }
-                        }
-                        yield f"data: {json.dumps(artifact_event)}\n\n"
-                    last_artifact_count = len(artifacts)
-                
-                # Check if completed or failed
-                if job.status in ["completed", "failed", "cancelled"]:
-                    final_event = {
-                        "type": "final",
-                        "run_id": run_id,
-                        "status": job.status,
-                        "message": f"Job {job.status}",
-                        "payload": {
-                            "cost_cents": job.cost_cents,
-                            "cached_hit": job.cached_hit
-                        }
-                    }
-                    yield f"data: {json.dumps(final_event)}\n\n"
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
                     break
                 
-                # Wait before next poll
-                await asyncio.sleep(2)
+                if queue is None:
+                    # Wait before next poll
+                    if events:
+                        poll_interval = POLL_MIN_INTERVAL_SECONDS
+                    else:
+                        poll_interval = min(poll_interval * POLL_BACKOFF_FACTOR, POLL_MAX_INTERVAL_SECONDS)
+                    await asyncio.sleep(min(poll_interval, remaining))
+                    continue
+                
+                # Push mode: relay published events, re-reading the database when idle
+                while True:
+                    try:
+                        message = await asyncio.wait_for(
+                            queue.get(), min(JOB_REPOLL_SECONDS, deadline - time.monotonic())
+                        )
+                    except asyncio.TimeoutError:
+                        break
+                    if message is None:
+                        # Redis feed lost: resubscribe (polling if that fails) and
+                        # resync from the database, since events may have been missed
+                        unsubscribe_job_events(run_id, queue)
+                        await asyncio.sleep(JOB_RESUBSCRIBE_DELAY_SECONDS)
+                        queue = await subscribe_job_events(run_id)
+                        break
+                    yield {"data": message}
+                    if orjson.loads(message).get("type") == "final":
+                        return
         
         except Exception as e:
             logger.error(f"Error in SSE stream: {e}", exc_info=True)
@@ -529,15 +659,9 @@ async def stream_status(
                 "type": "error",
                 "message": str(e)
             }
-            yield f"data: {json.dumps(error_event)}\n\n"
+            yield {"data": orjson.dumps(error_event)}
+        finally:
+            if queue is not None:
+                unsubscribe_job_events(run_id, queue)
     
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
-    )
-
+    return EventSourceResponse(event_generator())
@@ -2,22 +2,41 @@
 Metered usage reporting endpoints.
 Handles reporting usage to Stripe for metered billing.
 """
+import calendar
 import os
 import stripe
-from fastapi import APIRouter, Depends, HTTPException, Header
+from anyio import from_thread
+from fastapi import APIRouter, Depends, Header, HTTPException
 from typing import Optional
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from decimal import Decimal
+from pydantic import BaseModel, Field
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
 
-from app.db import SessionLocal
-from app.models.billing import User, UsageRecord, Subscription
-from app.auth.role_middleware import get_current_user
+from app.models.billing import UsageRecord, Subscription
+from app.models.user import User
+from app.auth.role_middleware import get_current_db_user, get_db
 from app.core.config import settings
 from app.services.stripe_client import get_stripe_client
+from app.services.usage_reporter import queue_usage
 
 router = APIRouter(prefix="/api/billing", tags=["Usage"])
 
+# Stored usage quantities are rounded to this step
+_QUANTITY_STEP = Decimal("0.000001")
+
+# Columns returned by /usage_records
+_USAGE_RECORD_COLUMNS = (
+    UsageRecord.id,
+    UsageRecord.quantity,
+    UsageRecord.stripe_subscription_item_id,
+    UsageRecord.reported_at,
+    UsageRecord.stripe_report_id,
+    UsageRecord.meta,
+)
+
 # Initialize Stripe
 if settings.STRIPE_SECRET_KEY and not settings.USE_MOCK_STRIPE:
     stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -25,57 +44,52 @@ else:
     stripe.api_key = "sk_test_mock_key_for_development"
 
 
-def get_db():
-    """Dependency to get database session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 class ReportUsageRequest(BaseModel):
     subscription_item_id: str  # required: the subscription_item to record usage against
-    quantity: float
+    quantity: Decimal  # parsed straight from the JSON number (no float round-trip)
     metadata: dict = None
 
 
 class ReportUsageResponse(BaseModel):
     ok: bool
     usage_id: int
-    stripe_report_id: Optional[str] = None
+    stripe_report_id: Optional[str] = Field(
+        None,
+        description=(
+            "Stripe UsageRecord id. None when the usage was queued for a batched report "
+            "(Redis available): the id is stored on the usage record once the batch is "
+            "sent, see /usage_records"
+        ),
+    )
     error: Optional[str] = None
 
 
-@router.post("/report_usage")
+def _insert(db: Session):
+    """INSERT construct with ON CONFLICT support for the session's database."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+@router.post("/report_usage", response_model=ReportUsageResponse)
 def report_usage(
     payload: ReportUsageRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     db: Session = Depends(get_db),
-    authorization: Optional[str] = Header(None)
+    db_user: User = Depends(get_current_db_user)
 ):
     """
     Record usage locally and send UsageRecord to Stripe (increment).
-    This endpoint is idempotent for local persistence but Stripe creates a usage record per request.
-    For high volume usage, batch on the client/server and call this endpoint periodically.
-    """
-    # Get current user
-    current_user = get_current_user(authorization, db)
+    With Redis available, Stripe reporting is batched (app.services.usage_reporter): the
+    record is queued, stripe_report_id is None in the response, and the report id is
+    filled in when the aggregated increment for the subscription item is sent.
+    Without Redis, each call is reported to Stripe directly.
     
-    # Extract user info
-    if hasattr(current_user, 'id') and isinstance(current_user, User):
-        user_id = current_user.id
-        db_user = current_user
-    elif hasattr(current_user, 'id'):
-        user_id = current_user.id
-        db_user = db.query(User).filter(User.id == user_id).first()
-    elif isinstance(current_user, dict):
-        user_email = current_user.get("email")
-        db_user = db.query(User).filter(User.email == user_email).first()
-        if not db_user:
-            raise HTTPException(status_code=404, detail="User not found in database")
-        user_id = db_user.id
-    else:
-        raise HTTPException(status_code=401, detail="Invalid user")
+    Calls with an Idempotency-Key header are recorded once per user and key: a retry
+    returns the record the first call created and reports nothing (409 if it carries
+    a different item or quantity).
+    """
+    user_id = db_user.id
     
     # Validate subscription ownership (optional)
     sub = None
@@ -84,68 +98,88 @@ def report_usage(
         if sub and sub.stripe_customer_id != db_user.stripe_customer_id:
             raise HTTPException(status_code=403, detail="Subscription item does not belong to the current user")
 
-    # Persist local UsageRecord
-    usage = UsageRecord(
-        user_id=user_id,
-        stripe_subscription_item_id=payload.subscription_item_id,
-        quantity=Decimal(str(payload.quantity)),
-        metadata=(str(payload.metadata) if payload.metadata else None)
-    )
-    db.add(usage)
+    # Persist local UsageRecord. reported_at is set here and the id comes back from
+    # the INSERT (RETURNING), so nothing is re-read after commit. A key that is already
+    # recorded for this user inserts nothing and returns no id.
+    reported_at = datetime.utcnow()
+    quantity = payload.quantity.quantize(_QUANTITY_STEP, rounding=ROUND_HALF_UP)
+    usage_id = db.execute(
+        _insert(db)(UsageRecord)
+        .values(
+            user_id=user_id,
+            stripe_subscription_item_id=payload.subscription_item_id,
+            quantity=quantity,
+            reported_at=reported_at,
+            stripe_report_id=None,
+            meta=(str(payload.metadata) if payload.metadata else None),
+            idempotency_key=idempotency_key,
+        )
+        .on_conflict_do_nothing(index_elements=[UsageRecord.user_id, UsageRecord.idempotency_key])
+        .returning(UsageRecord.id)
+    ).scalar()
     db.commit()
-    db.refresh(usage)
+
+    if usage_id is None:
+        # Retry of a recorded call: the first call reports (or queued) it
+        existing = db.query(
+            UsageRecord.id,
+            UsageRecord.stripe_subscription_item_id,
+            UsageRecord.quantity,
+            UsageRecord.stripe_report_id,
+        ).filter(
+            UsageRecord.user_id == user_id,
+            UsageRecord.idempotency_key == idempotency_key
+        ).one()
+        if (existing.stripe_subscription_item_id != payload.subscription_item_id
+                or Decimal(existing.quantity) != quantity):
+            raise HTTPException(status_code=409, detail="Idempotency-Key was used for a different usage report")
+        return {"ok": True, "usage_id": existing.id, "stripe_report_id": existing.stripe_report_id}
 
     # Send to Stripe
+    timestamp = calendar.timegm(reported_at.utctimetuple())
     try:
         if not settings.USE_MOCK_STRIPE:
+            # Batched: reported with the item's other pending usage on the next flush
+            if from_thread.run(queue_usage, usage_id, payload.subscription_item_id, payload.quantity, timestamp):
+                return {"ok": True, "usage_id": usage_id, "stripe_report_id": None}
+            # No Redis: report this record directly
             report = stripe.UsageRecord.create(
                 subscription_item=payload.subscription_item_id,
                 quantity=int(payload.quantity),
-                timestamp=int(usage.reported_at.timestamp()),
+                timestamp=timestamp,
                 action="increment"
             )
             stripe_report_id = report.get("id")
         else:
             # Mock mode
-            stripe_report_id = f"ur_mock_{usage.id}"
+            stripe_report_id = f"ur_mock_{usage_id}"
     except stripe.error.StripeError as e:
         # don't delete local record — mark stripe_report_id null so it can be retried via admin task
-        return {"ok": False, "error": str(e), "usage_id": usage.id}
-
-    # Persist stripe report id
-    usage.stripe_report_id = stripe_report_id
-    db.add(usage)
+        return {"ok": False, "error": str(e), "usage_id": usage_id}
+
+    # Persist stripe report id (single UPDATE; no reload of the record)
+    db.execute(
+        update(UsageRecord)
+        .where(UsageRecord.id == usage_id)
+        .values(stripe_report_id=stripe_report_id)
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
-    return {"ok": True, "usage_id": usage.id, "stripe_report_id": usage.stripe_report_id}
+    return {"ok": True, "usage_id": usage_id, "stripe_report_id": stripe_report_id}
 
 
 @router.get("/usage_records")
 def get_usage_records(
     limit: int = 100,
     db: Session = Depends(get_db),
-    authorization: Optional[str] = Header(None)
+    db_user: User = Depends(get_current_db_user)
 ):
     """
     Get usage records for the current user.
     """
-    # Get current user
-    current_user = get_current_user(authorization, db)
-    
-    # Extract user info
-    if hasattr(current_user, 'id') and isinstance(current_user, User):
-        user_id = current_user.id
-    elif isinstance(current_user, dict):
-        user_email = current_user.get("email")
-        db_user = db.query(User).filter(User.email == user_email).first()
-        if not db_user:
-            raise HTTPException(status_code=404, detail="User not found")
-        user_id = db_user.id
-    else:
-        raise HTTPException(status_code=401, detail="Invalid user")
-    
-    # Query usage records
-    usage_records = db.query(UsageRecord).filter(
-        UsageRecord.user_id == user_id
+    # Query usage records (only the columns the response needs)
+    usage_records = db.query(*_USAGE_RECORD_COLUMNS).filter(
+        UsageRecord.user_id == db_user.id
     ).order_by(UsageRecord.reported_at.desc()).limit(limit).all()
     
     return {
@@ -156,7 +190,7 @@ def get_usage_records(
                 "subscription_item_id": record.stripe_subscription_item_id,
                 "reported_at": record.reported_at.isoformat() if record.reported_at else None,
                 "stripe_report_id": record.stripe_report_id,
-                "metadata": record.metadata
+                "metadata": record.meta
             }
             for record in usage_records
         ],
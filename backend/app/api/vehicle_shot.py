@@ -4,6 +4,7 @@ Handles vehicle-specific product shot editing operations using Bria APIs.
 """
 
 import logging
+from functools import lru_cache
 from typing import Optional, List
 from fastapi import APIRouter, HTTPException, status, Query
 from pydantic import BaseModel, Field
@@ -73,14 +74,20 @@ class SegmentationRequest(BaseModel):
 # Helper Functions
 # ============================================================================
 
-def get_bria_api_token() -> str:
-    """Get Bria API token from settings."""
+@lru_cache(maxsize=1)
+def _resolve_bria_token() -> Optional[str]:
+    """First configured Bria token (settings don't change at runtime)."""
     # Try different environment variable names
-    token = (
+    return (
         settings.BRIA_API_TOKEN or
         settings.BRIA_API_KEY or
         settings.FIBO_API_KEY
     )
+
+
+def get_bria_api_token() -> str:
+    """Get Bria API token from settings."""
+    token = _resolve_bria_token()
     if not token:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -3,18 +3,36 @@ WebSocket Voice Assistant API
 Handles binary audio streaming for STT, LLM, and TTS pipeline.
 """
 import os
+import re
 import logging
 import asyncio
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Depends
-from typing import Optional
-import json
+from typing import AsyncIterator, Optional
+import orjson
 
 from app.core.config import settings
+from app.services.voice_vad import create_segmenter
+from app.utils.websocket import send_json
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix=f"{settings.API_PREFIX}/voice", tags=["Voice"])
 
+# Input audio: 16 kHz, 16-bit mono PCM
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_BYTES_PER_SAMPLE = 2
+# Sliding window kept for STT; older audio is dropped (memory stays O(window))
+AUDIO_WINDOW_BYTES = 30 * AUDIO_SAMPLE_RATE * AUDIO_BYTES_PER_SAMPLE
+# New audio between interim transcriptions
+STT_PARTIAL_INTERVAL_BYTES = 16000
+# Acknowledge received audio every N chunks rather than per frame
+AUDIO_ACK_INTERVAL_CHUNKS = 25
+# Sentences waiting for TTS while the LLM keeps streaming
+TTS_QUEUE_MAXSIZE = 8
+
+# End of a sentence in the LLM output: flushed to TTS as soon as it is seen
+_SENTENCE_END = re.compile(r"[.!?](?:\s|$)")
+
 # Simple auth check (can be enhanced with JWT)
 def check_voice_auth(token: Optional[str] = Query(None)) -> bool:
     """
@@ -31,6 +49,85 @@ def check_voice_auth(token: Optional[str] = Query(None)) -> bool:
     return token == expected_token
 
 
+async def _transcribe(audio: bytes) -> dict:
+    """Final transcript for an utterance."""
+    # TODO: Send audio to STT service (Deepgram, Whisper, etc.)
+    return {"text": "[final transcription...]", "confidence": 0.92}
+
+
+async def _llm_stream(transcript: str) -> AsyncIterator[str]:
+    """LLM response to a transcript, as token deltas."""
+    # TODO: Stream from the LLM
+    for delta in ("Hello! ", "How can I ", "help you?"):
+        yield delta
+
+
+async def _synthesize(sentence: str) -> AsyncIterator[bytes]:
+    """TTS audio for a sentence, as chunks in playback order."""
+    # TODO: Stream from the TTS service
+    yield b"[TTS audio chunk placeholder]"
+
+
+async def _llm_stage(websocket: WebSocket, transcript: str, tts_queue: asyncio.Queue) -> None:
+    """Relay LLM tokens and hand each completed sentence to the TTS stage."""
+    response = []
+    pending = ""
+    async for delta in _llm_stream(transcript):
+        await send_json(websocket, {"type": "llm_token", "delta": delta})
+        response.append(delta)
+        pending += delta
+        while True:
+            match = _SENTENCE_END.search(pending)
+            if match is None:
+                break
+            await tts_queue.put(pending[:match.end()].strip())
+            pending = pending[match.end():]
+    if pending.strip():
+        await tts_queue.put(pending.strip())
+    # End of input for the TTS stage
+    await tts_queue.put(None)
+    await send_json(websocket, {"type": "llm_done", "full_response": "".join(response)})
+
+
+async def _tts_stage(websocket: WebSocket, tts_queue: asyncio.Queue) -> None:
+    """Stream TTS audio sentence by sentence as the LLM produces them."""
+    while True:
+        sentence = await tts_queue.get()
+        if sentence is None:
+            return
+        async for chunk in _synthesize(sentence):
+            await websocket.send_bytes(chunk)
+
+
+async def _respond(websocket: WebSocket, audio: bytes) -> None:
+    """
+    STT -> LLM -> TTS for one utterance.
+    LLM and TTS run concurrently, so the first sentence is spoken while the rest
+    of the response is still being generated.
+    """
+    try:
+        transcript = await _transcribe(audio)
+        await send_json(websocket, {"type": "stt_final", **transcript})
+
+        tts_queue: asyncio.Queue = asyncio.Queue(maxsize=TTS_QUEUE_MAXSIZE)
+        stages = (
+            asyncio.create_task(_llm_stage(websocket, transcript["text"], tts_queue)),
+            asyncio.create_task(_tts_stage(websocket, tts_queue)),
+        )
+        try:
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for stage in done:
+                stage.result()  # Re-raise a stage failure
+        finally:
+            # A failed stage must not leave the other blocked on the queue
+            for stage in stages:
+                stage.cancel()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Voice response pipeline failed: {e}", exc_info=True)
+
+
 @router.websocket("/ws")
 async def voice_assistant_ws(
     websocket: WebSocket,
@@ -70,9 +167,16 @@ async def voice_assistant_ws(
     await websocket.accept()
     logger.info("Voice assistant WebSocket connected")
     
-    # Audio buffer for STT
+    # Audio window for STT, plus counters so the hot path never measures the buffer
     audio_buffer = bytearray()
+    pending_bytes = 0  # received since the last interim transcription
+    total_bytes = 0
+    chunk_count = 0
     is_recording = False
+    # Response pipeline for the last utterance; the receive loop keeps running meanwhile
+    response_task: Optional[asyncio.Task] = None
+    # Speech segmentation (Silero VAD) gates interim STT; None -> fixed-size chunks
+    segmenter = await create_segmenter()
     
     try:
         while True:
@@ -86,38 +190,59 @@ async def voice_assistant_ws(
             # Handle binary audio data
             if "bytes" in message:
                 audio_chunk = message["bytes"]
-                audio_buffer.extend(audio_chunk)
+                audio_buffer += audio_chunk
+                if len(audio_buffer) > AUDIO_WINDOW_BYTES:
+                    # Drop the oldest audio (FIFO)
+                    del audio_buffer[:-AUDIO_WINDOW_BYTES]
+                pending_bytes += len(audio_chunk)
+                total_bytes += len(audio_chunk)
+                chunk_count += 1
                 is_recording = True
                 
-                # Send acknowledgment (optional)
-                await websocket.send_json({
-                    "type": "audio_received",
-                    "bytes": len(audio_chunk),
-                    "total_bytes": len(audio_buffer)
-                })
+                # Periodic acknowledgment (a JSON frame per audio frame doubles traffic)
+                if chunk_count % AUDIO_ACK_INTERVAL_CHUNKS == 0:
+                    await send_json(websocket, {
+                        "type": "audio_received",
+                        "chunks": chunk_count,
+                        "total_bytes": total_bytes
+                    })
                 
-                # Process audio in chunks (simplified - in production, use proper STT streaming)
-                if len(audio_buffer) > 16000:  # Process every ~1 second at 16kHz
-                    # TODO: Send to STT service (Deepgram, Whisper, etc.)
+                if segmenter is not None:
+                    # Interim STT once per completed speech segment (silence never reaches STT).
+                    # VAD inference blocks, so it runs off the event loop.
+                    for segment in await asyncio.to_thread(segmenter.feed, audio_chunk):
+                        # TODO: Send segment to STT service (Deepgram, Whisper, etc.)
+                        # For now, send stub response
+                        await send_json(websocket, {
+                            "type": "stt_partial",
+                            "text": "[interim transcription...]",
+                            "confidence": 0.85
+                        })
+                elif pending_bytes >= STT_PARTIAL_INTERVAL_BYTES:
+                    # No VAD: process audio in fixed-size chunks
+                    # TODO: Send audio_buffer (sliding window) to STT service (Deepgram, Whisper, etc.)
                     # For now, send stub response
-                    await websocket.send_json({
+                    await send_json(websocket, {
                         "type": "stt_partial",
                         "text": "[interim transcription...]",
                         "confidence": 0.85
                     })
-                    audio_buffer.clear()
+                    pending_bytes = 0
             
             # Handle text/JSON control messages
             elif "text" in message:
                 try:
-                    data = json.loads(message["text"])
+                    data = orjson.loads(message["text"])
                     msg_type = data.get("type")
                     
                     if msg_type == "start":
                         # Start recording
                         is_recording = True
                         audio_buffer.clear()
-                        await websocket.send_json({
+                        pending_bytes = 0
+                        if segmenter is not None:
+                            segmenter.reset()
+                        await send_json(websocket, {
                             "type": "status",
                             "status": "recording",
                             "message": "Recording started"
@@ -127,56 +252,30 @@ async def voice_assistant_ws(
                         # Stop recording and process final transcript
                         is_recording = False
                         
-                        # TODO: Send final audio buffer to STT service
-                        # For now, send stub final transcript
-                        await websocket.send_json({
-                            "type": "stt_final",
-                            "text": "[final transcription...]",
-                            "confidence": 0.92
-                        })
-                        
-                        # TODO: Send transcript to LLM and stream response
-                        # For now, send stub LLM response
-                        await websocket.send_json({
-                            "type": "llm_token",
-                            "delta": "Hello! "
-                        })
-                        await asyncio.sleep(0.1)
-                        await websocket.send_json({
-                            "type": "llm_token",
-                            "delta": "How can I "
-                        })
-                        await asyncio.sleep(0.1)
-                        await websocket.send_json({
-                            "type": "llm_token",
-                            "delta": "help you?"
-                        })
-                        await asyncio.sleep(0.1)
-                        await websocket.send_json({
-                            "type": "llm_done",
-                            "full_response": "Hello! How can I help you?"
-                        })
-                        
-                        # TODO: Send LLM response to TTS and stream audio
-                        # For now, send stub TTS audio chunk
-                        await websocket.send_bytes(b"[TTS audio chunk placeholder]")
+                        # A new utterance supersedes a response still in progress
+                        if response_task is not None:
+                            response_task.cancel()
+                        response_task = asyncio.create_task(_respond(websocket, bytes(audio_buffer)))
                         
                         audio_buffer.clear()
+                        pending_bytes = 0
+                        if segmenter is not None:
+                            segmenter.reset()
                     
                     elif msg_type == "config":
                         # Update configuration
-                        await websocket.send_json({
+                        await send_json(websocket, {
                             "type": "config_updated",
                             "config": data.get("config", {})
                         })
                     
                     elif msg_type == "ping":
                         # Keep-alive
-                        await websocket.send_json({"type": "pong"})
+                        await send_json(websocket, {"type": "pong"})
                     
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     logger.warning(f"Invalid JSON received: {message['text']}")
-                    await websocket.send_json({
+                    await send_json(websocket, {
                         "type": "error",
                         "error": "Invalid JSON"
                     })
@@ -186,12 +285,14 @@ async def voice_assistant_ws(
     except Exception as e:
         logger.error(f"Voice assistant WebSocket error: {e}", exc_info=True)
         try:
-            await websocket.send_json({
+            await send_json(websocket, {
                 "type": "error",
                 "error": str(e)
             })
         except:
             pass
     finally:
+        if response_task is not None:
+            response_task.cancel()
         logger.info("Voice assistant WebSocket closed")
 
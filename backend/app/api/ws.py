@@ -5,11 +5,14 @@ Real-time bidirectional communication for workflow updates.
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from typing import Dict, Set
-import json
+import asyncio
 import logging
 
+import orjson
+
 from app.core.config import settings
-from app.orchestration.orchestrator import _runs_store
+from app.storage.run_store import get_run
+from app.utils.websocket import send_json
 
 logger = logging.getLogger(__name__)
 
@@ -32,26 +35,30 @@ async def broadcast_run_update(run_id: str, message: dict):
         run_id: Run ID
         message: Message to broadcast
     """
-    connections = get_connections_for_run(run_id)
+    # Snapshot: connections may come and go while the sends are in flight
+    connections = list(get_connections_for_run(run_id))
     if not connections:
         return
     
-    message_json = json.dumps(message)
-    disconnected = set()
+    # Serialized once for all subscribers; sent as a text frame (clients JSON.parse it)
+    message_json = orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
     
-    for ws in connections:
-        try:
-            await ws.send_text(message_json)
-        except Exception as e:
-            logger.warning(f"Failed to send to WebSocket: {e}")
-            disconnected.add(ws)
+    # Send to all subscribers concurrently (a slow socket doesn't delay the rest)
+    results = await asyncio.gather(
+        *(ws.send_text(message_json) for ws in connections),
+        return_exceptions=True
+    )
     
     # Remove disconnected connections
-    for ws in disconnected:
-        connections.discard(ws)
+    live = _connections.get(run_id)
+    for ws, result in zip(connections, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to send to WebSocket: {result}")
+            if live is not None:
+                live.discard(ws)
     
-    if not connections and run_id in _connections:
-        del _connections[run_id]
+    if live is not None and not live:
+        _connections.pop(run_id, None)
 
 
 @router.websocket("/runs/{run_id}")
@@ -68,9 +75,9 @@ async def run_ws(websocket: WebSocket, run_id: str):
     
     try:
         # Send initial state
-        if run_id in _runs_store:
-            ctx = _runs_store[run_id]
-            await websocket.send_json({
+        ctx = await get_run(run_id)
+        if ctx is not None:
+            await send_json(websocket, {
                 "type": "initial",
                 "run_id": run_id,
                 "state": ctx.state.value if hasattr(ctx.state, "value") else str(ctx.state),
@@ -81,20 +88,20 @@ async def run_ws(websocket: WebSocket, run_id: str):
         while True:
             try:
                 data = await websocket.receive_text()
-                message = json.loads(data)
+                message = orjson.loads(data)
                 
                 # Handle incoming messages (e.g., pause, resume, cancel)
                 if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    await send_json(websocket, {"type": "pong"})
                 elif message.get("type") == "cancel":
                     # Cancel workflow (implement cancellation logic)
-                    await websocket.send_json({
+                    await send_json(websocket, {
                         "type": "cancelled",
                         "run_id": run_id,
                     })
                     break
                 
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 logger.warning(f"Invalid JSON received from WebSocket: {data}")
     
     except WebSocketDisconnect:
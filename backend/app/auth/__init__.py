@@ -1,7 +1,6 @@
 """
 Authentication and authorization utilities.
 """
-from app.auth.role_middleware import get_current_user, require_role, require_any_role
-
-__all__ = ["get_current_user", "require_role", "require_any_role"]
+from app.auth.role_middleware import get_current_user, get_current_db_user, require_role, require_any_role
 
+__all__ = ["get_current_user", "get_current_db_user", "require_role", "require_any_role"]
@@ -4,15 +4,30 @@ Provides dependency functions for role-based route protection.
 Supports both mock mode (for development) and database-backed user lookup.
 """
 from fastapi import Request, HTTPException, Depends, Header
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Union
 import logging
 
-from app.db import SessionLocal
-from app.models.billing import User
+from app.db import SessionLocal, get_async_db
+from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
+# Role hierarchy: viewer < editor < admin
+_ROLE_ORDER = MappingProxyType({"viewer": 0, "editor": 1, "admin": 2})
+
+# Development test tokens -> user emails (looked up in the database)
+_TEST_TOKEN_EMAILS = MappingProxyType({
+    "testtoken_admin": "admin@example.com",
+    "testtoken_user": "user@example.com",
+    "testtoken_editor": "editor@example.com",
+})
+
 
 def get_db():
     """Dependency to get database session."""
@@ -23,14 +38,10 @@ def get_db():
         db.close()
 
 
-def get_current_user(
-    authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
-):
+def _token_and_email(authorization: Optional[str]):
     """
-    Extract current user from Authorization header.
-    Attempts to lookup user from database, falls back to mock implementation for development.
-    In production, this should decode and validate JWT tokens.
+    Parse the bearer token and map it to a user email.
+    Returns (token, email); email is None if the token is not a known test token.
     """
     # Mock implementation - replace with real JWT decoding in production
     if not authorization:
@@ -48,69 +59,113 @@ def get_current_user(
     
     # Mock token validation for development - replace with real JWT validation
     # Map test tokens to emails and lookup in database
-    email_map = {
-        "testtoken_admin": "admin@example.com",
-        "testtoken_user": "user@example.com",
-        "testtoken_editor": "editor@example.com",
-    }
-    
-    email = None
-    if token in email_map:
-        email = email_map[token]
-    else:
-        # In production: decode JWT and extract email/user_id from token
-        # For now, if token doesn't match known test tokens, try to extract from token
-        # This is a placeholder for JWT decoding
-        pass
+    # In production: decode JWT and extract email/user_id from token
+    email = _TEST_TOKEN_EMAILS.get(token)
     
-    # If we have an email, try to find user in database
+    return token, email
+
+
+def authorization_email(authorization: Optional[str]) -> Optional[str]:
+    """
+    Email the Authorization header maps to, without touching the database.
+    Raises 401 for a missing or malformed header; None if the token maps to no email.
+    """
+    return _token_and_email(authorization)[1]
+
+
+@dataclass(frozen=True, slots=True)
+class MockUser:
+    """Development stand-in for a User that has no database record."""
+    id: str
+    email: str
+    name: str
+    role: str
+    stripe_customer_id: Optional[str] = None
+
+    @property
+    def full_name(self) -> str:
+        return self.name
+
+
+# Fallback mock users for test tokens, by token substring
+_MOCK_TOKEN_USERS = (
+    ("testtoken_admin", MockUser(id='u-admin', email='admin@example.com', name='Admin', role='admin')),
+    ("testtoken_user", MockUser(id='u-user', email='user@example.com', name='User', role='viewer')),
+    ("testtoken_editor", MockUser(id='u-editor', email='editor@example.com', name='Editor', role='editor')),
+)
+
+
+@lru_cache(maxsize=256)
+def _mock_user_for_email(email: str) -> MockUser:
+    """Mock user for an email with no database record (immutable, so shared)."""
+    local_part = email.split('@')[0]
+    return MockUser(
+        id=local_part,
+        email=email,
+        name=local_part.capitalize(),
+        role='admin' if 'admin' in email else ('editor' if 'editor' in email else 'viewer'),
+    )
+
+
+def _resolve_user(token: str, email: Optional[str], user: Optional[User]) -> Union[User, MockUser]:
+    """Return the database user for email, or a mock user for development."""
+    # If we have an email, use the user found in the database
     if email:
-        user = db.query(User).filter(User.email == email).first()
         if user:
             return user
-        # If not found in DB, create mock user object for backward compatibility
+        # If not found in DB, use a mock user for backward compatibility
         # In production, user should exist in DB
-        mock_user = type('MockUser', (), {
-            'id': email.split('@')[0],
-            'email': email,
-            'name': email.split('@')[0].capitalize(),
-            'role': 'admin' if 'admin' in email else ('editor' if 'editor' in email else 'viewer'),
-            'stripe_customer_id': None
-        })()
-        return mock_user
+        return _mock_user_for_email(email)
     
     # Fallback: return mock user for development
-    if "testtoken_admin" in token:
-        mock_user = type('MockUser', (), {
-            'id': 'u-admin',
-            'email': 'admin@example.com',
-            'name': 'Admin',
-            'role': 'admin',
-            'stripe_customer_id': None
-        })()
-        return mock_user
-    elif "testtoken_user" in token:
-        mock_user = type('MockUser', (), {
-            'id': 'u-user',
-            'email': 'user@example.com',
-            'name': 'User',
-            'role': 'viewer',
-            'stripe_customer_id': None
-        })()
-        return mock_user
-    elif "testtoken_editor" in token:
-        mock_user = type('MockUser', (), {
-            'id': 'u-editor',
-            'email': 'editor@example.com',
-            'name': 'Editor',
-            'role': 'editor',
-            'stripe_customer_id': None
-        })()
-        return mock_user
-    else:
-        # In production, decode JWT and extract roles from token payload
-        # For now, raise error for unknown tokens
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    for token_marker, mock_user in _MOCK_TOKEN_USERS:
+        if token_marker in token:
+            return mock_user
+    # In production, decode JWT and extract roles from token payload
+    # For now, raise error for unknown tokens
+    raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+
+def get_current_user(
+    authorization: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> Union[User, MockUser]:
+    """
+    Extract current user from Authorization header.
+    Attempts to lookup user from database, falls back to mock implementation for development
+    (a MockUser, with the same id/email/role/stripe_customer_id/full_name attributes).
+    In production, this should decode and validate JWT tokens.
+    """
+    token, email = _token_and_email(authorization)
+    user = db.query(User).filter(User.email == email).first() if email else None
+    return _resolve_user(token, email, user)
+
+
+def get_current_db_user(
+    authorization: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Current user's database record, for endpoints that write rows keyed by users.id.
+    Raises 404 for callers without one (development mock users).
+    """
+    user = get_current_user(authorization, db)
+    if not isinstance(user, User):
+        raise HTTPException(status_code=404, detail="User not found in database")
+    return user
+
+
+async def get_current_user_async(
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+) -> Union[User, MockUser]:
+    """Same as get_current_user, for endpoints that use an AsyncSession."""
+    token, email = _token_and_email(authorization)
+    user = None
+    if email:
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalars().first()
+    return _resolve_user(token, email, user)
 
 
 def require_role(min_role: str):
@@ -126,24 +181,14 @@ def require_role(min_role: str):
     Args:
         min_role: Minimum required role ("viewer", "editor", or "admin")
     """
-    role_order = {"viewer": 0, "editor": 1, "admin": 2}
+    required_level = _ROLE_ORDER.get(min_role, 0)
     
     def dependency(user = Depends(get_current_user)):
-        # Handle both dict (mock) and User object (database)
-        if hasattr(user, 'role'):
-            user_role = user.role
-            user_email = getattr(user, 'email', 'unknown')
-        elif isinstance(user, dict):
-            user_role = user.get("role") or user.get("roles", ["viewer"])[0] if user.get("roles") else "viewer"
-            user_email = user.get("email", "unknown")
-        else:
-            user_role = "viewer"
-            user_email = "unknown"
+        # get_current_user always returns a User or MockUser
+        user_role = user.role
+        user_email = user.email
         
-        user_level = role_order.get(user_role, 0)
-        required_level = role_order.get(min_role, 0)
-        
-        if user_level < required_level:
+        if _ROLE_ORDER.get(user_role, 0) < required_level:
             logger.warning(f"Access denied for user {user_email}: required role '{min_role}', has role '{user_role}'")
             raise HTTPException(
                 status_code=403,
@@ -166,19 +211,14 @@ def require_any_role(*roles: str):
     Args:
         *roles: One or more allowed roles
     """
+    allowed_roles = frozenset(roles)
+    
     def dependency(user = Depends(get_current_user)):
-        # Handle both dict (mock) and User object (database)
-        if hasattr(user, 'role'):
-            user_role = user.role
-            user_email = getattr(user, 'email', 'unknown')
-        elif isinstance(user, dict):
-            user_role = user.get("role") or (user.get("roles", [])[0] if user.get("roles") else "viewer")
-            user_email = user.get("email", "unknown")
-        else:
-            user_role = "viewer"
-            user_email = "unknown"
+        # get_current_user always returns a User or MockUser
+        user_role = user.role
+        user_email = user.email
         
-        if user_role not in roles:
+        if user_role not in allowed_roles:
             logger.warning(f"Access denied for user {user_email}: required one of roles {roles}, has role '{user_role}'")
             raise HTTPException(
                 status_code=403,
@@ -0,0 +1,233 @@
+"""
+Generic Redis-backed cache helpers.
+Values are JSON-encoded and stored with a TTL. When Redis is not available,
+every lookup is a miss and writes are no-ops so callers fall back to the source.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Try to import Redis
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    logger.warning("redis.asyncio not available, generic cache disabled")
+
+REDIS_URL = getattr(settings, "REDIS_URL", "redis://localhost:6379/0")
+DEFAULT_TTL_SECONDS = 3600
+
+# Store ARGV[1] unless the current value is greater (a rolling max).
+# KEYS[1] = key, ARGV[1] = number, ARGV[2] = ttl
+_SET_MAX_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and tonumber(current) > tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('SETEX', KEYS[1], ARGV[2], ARGV[1])
+return 1
+"""
+
+# Global Redis client
+_redis_client = None
+
+
+async def get_cache_client():
+    """Get or create Redis client for the generic cache."""
+    global _redis_client
+    if not REDIS_AVAILABLE:
+        return None
+    if _redis_client is None:
+        try:
+            _redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
+            await _redis_client.ping()
+            logger.info(f"Connected to Redis cache at {REDIS_URL}")
+        except Exception as e:
+            logger.warning(f"Redis cache connection failed: {e}")
+            _redis_client = None
+    return _redis_client
+
+
+async def get_generic_cache(key: str) -> Optional[Any]:
+    """
+    Get a cached value.
+
+    Args:
+        key: Cache key
+
+    Returns:
+        Decoded value, or None on miss / Redis unavailable
+    """
+    client = await get_cache_client()
+    if not client:
+        return None
+
+    try:
+        raw = await client.get(key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+    except Exception as e:
+        logger.warning(f"Cache get failed for {key}: {e}")
+        return None
+
+
+async def set_generic_cache(key: str, value: Any, ttl: int = DEFAULT_TTL_SECONDS) -> bool:
+    """
+    Store a value with a TTL.
+
+    Args:
+        key: Cache key
+        value: JSON-serializable value
+        ttl: Time to live in seconds
+
+    Returns:
+        True if the value was stored
+    """
+    client = await get_cache_client()
+    if not client:
+        return False
+
+    try:
+        await client.setex(key, ttl, json.dumps(value))
+        return True
+    except Exception as e:
+        logger.warning(f"Cache set failed for {key}: {e}")
+        return False
+
+
+async def delete_generic_cache(key: str) -> bool:
+    """
+    Remove a cached value.
+
+    Args:
+        key: Cache key
+
+    Returns:
+        True if the delete was issued
+    """
+    client = await get_cache_client()
+    if not client:
+        return False
+
+    try:
+        await client.delete(key)
+        return True
+    except Exception as e:
+        logger.warning(f"Cache delete failed for {key}: {e}")
+        return False
+
+
+async def mget_generic_cache(keys: List[str]) -> Dict[str, Any]:
+    """
+    Get several cached values in one round-trip.
+
+    Args:
+        keys: Cache keys
+
+    Returns:
+        Dict of key -> decoded value for the keys that were hits
+    """
+    if not keys:
+        return {}
+
+    client = await get_cache_client()
+    if not client:
+        return {}
+
+    try:
+        raws = await client.mget(keys)
+    except Exception as e:
+        logger.warning(f"Cache mget failed: {e}")
+        return {}
+
+    hits = {}
+    for key, raw in zip(keys, raws):
+        if raw is None:
+            continue
+        try:
+            hits[key] = json.loads(raw)
+        except json.JSONDecodeError:
+            continue
+    return hits
+
+
+async def mset_generic_cache(values: Dict[str, Any], ttl: int = DEFAULT_TTL_SECONDS) -> bool:
+    """
+    Store several values with the same TTL in one pipelined round-trip.
+
+    Args:
+        values: Dict of key -> JSON-serializable value
+        ttl: Time to live in seconds
+
+    Returns:
+        True if the values were stored
+    """
+    if not values:
+        return True
+
+    client = await get_cache_client()
+    if not client:
+        return False
+
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.setex(key, ttl, json.dumps(value))
+            await pipe.execute()
+        return True
+    except Exception as e:
+        logger.warning(f"Cache mset failed: {e}")
+        return False
+
+
+async def add_generic_cache(key: str, value: Any, ttl: int = DEFAULT_TTL_SECONDS) -> Optional[bool]:
+    """
+    Store a value only if the key does not exist yet (SET NX), e.g. to claim an event once.
+
+    Args:
+        key: Cache key
+        value: JSON-serializable value
+        ttl: Time to live in seconds
+
+    Returns:
+        True if stored, False if the key already existed, None if Redis is unavailable
+    """
+    client = await get_cache_client()
+    if not client:
+        return None
+
+    try:
+        return bool(await client.set(key, json.dumps(value), ex=ttl, nx=True))
+    except Exception as e:
+        logger.warning(f"Cache add failed for {key}: {e}")
+        return None
+
+
+async def set_generic_cache_max(key: str, value: int, ttl: int = DEFAULT_TTL_SECONDS) -> Optional[bool]:
+    """
+    Atomically store a number unless the stored one is greater (a rolling max).
+
+    Args:
+        key: Cache key
+        value: Number to store
+        ttl: Time to live in seconds
+
+    Returns:
+        True if stored, False if the stored value is greater, None if Redis is unavailable
+    """
+    client = await get_cache_client()
+    if not client:
+        return None
+
+    try:
+        return bool(await client.eval(_SET_MAX_SCRIPT, 1, key, value, ttl))
+    except Exception as e:
+        logger.warning(f"Cache set-max failed for {key}: {e}")
+        return None
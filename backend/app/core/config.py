@@ -27,11 +27,23 @@ class Settings(BaseSettings):
     BRIA_API_URL: str = "https://engine.prod.bria-api.com/v2"
     USE_MOCK_FIBO: bool = True
     
+    # Stripe Configuration
+    STRIPE_SECRET_KEY: Optional[str] = None
+    STRIPE_WEBHOOK_SECRET: Optional[str] = None
+    USE_MOCK_STRIPE: bool = True
+    
     # Gemini Configuration (for natural language processing)
     GEMINI_API_KEY: Optional[str] = None
     
     # Database
     DATABASE_URL: str = "sqlite:///./prolight.db"
+    # PostgreSQL pools, per worker process. The sync and async engines share one
+    # budget: a worker opens at most the sum of all four (30 by default), so
+    # workers x 30 must stay below the server's max_connections.
+    DB_POOL_SIZE: int = 15
+    DB_MAX_OVERFLOW: int = 5
+    DB_ASYNC_POOL_SIZE: int = 5
+    DB_ASYNC_MAX_OVERFLOW: int = 5
     
     # CORS
     CORS_ORIGINS: list = ["http://localhost:5173", "http://localhost:3000", "http://localhost:8000"]
@@ -4,7 +4,7 @@ Contains presets, FIBO templates, generation history, and test fixtures.
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Set, Tuple
 
 # ============================================================================
 # FIBO JSON Prompt Templates
@@ -435,6 +435,56 @@ LIGHTING_PRESETS = [
     }
 ]
 
+# ============================================================================
+# Preset Search Index
+# ============================================================================
+
+# Searchable text per preset (lowercased and UTF-8 encoded once at load), aligned
+# with LIGHTING_PRESETS. Fields are joined with NUL so a query cannot match across
+# field boundaries. Matching on bytes skips str's per-call width dispatch and,
+# UTF-8 being self-synchronizing, gives the same answers as matching on str.
+PRESET_SEARCH_TEXT: List[bytes] = [
+    "\0".join([p["name"], p["description"], *p["ideal_for"]]).lower().encode("utf-8")
+    for p in LIGHTING_PRESETS
+]
+
+
+def _trigrams(text: bytes) -> Set[bytes]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _build_trigram_index(texts: List[bytes]) -> Dict[bytes, Set[int]]:
+    """Map each trigram to the indices of the texts containing it."""
+    index: Dict[bytes, Set[int]] = {}
+    for i, text in enumerate(texts):
+        for gram in _trigrams(text):
+            index.setdefault(gram, set()).add(i)
+    return index
+
+
+PRESET_TRIGRAM_INDEX = _build_trigram_index(PRESET_SEARCH_TEXT)
+
+# Sorted preset categories (presets are static, so computed once at load)
+PRESET_CATEGORIES = tuple(sorted({p["category"] for p in LIGHTING_PRESETS}))
+
+
+def search_preset_indices(query: str) -> List[int]:
+    """
+    Indices of presets whose name, description or ideal_for contain query
+    (case-insensitive substring match), in catalog order.
+    Candidates come from intersecting trigram postings; only those are scanned.
+    """
+    query_lower = query.lower().encode("utf-8")
+    grams = _trigrams(query_lower)
+    if grams:
+        postings = sorted((PRESET_TRIGRAM_INDEX.get(g, set()) for g in grams), key=len)
+        candidates = set.intersection(*postings)
+    else:
+        # Queries shorter than a trigram scan every preset
+        candidates = range(len(PRESET_SEARCH_TEXT))
+    return sorted(i for i in candidates if query_lower in PRESET_SEARCH_TEXT[i])
+
+
 # ============================================================================
 # Generation History Mock Data
 # ============================================================================
@@ -636,11 +686,24 @@ class MockDataManager:
     """Manager for mock data access."""
     
     @staticmethod
-    def get_presets(category: str = None) -> List[Dict[str, Any]]:
-        """Get presets, optionally filtered by category."""
+    def _filter_presets(category: str = None, search: str = None) -> List[Dict[str, Any]]:
+        """Filter presets by category and/or search query (name, description, ideal_for)."""
+        presets = LIGHTING_PRESETS
+        if search:
+            presets = [LIGHTING_PRESETS[i] for i in search_preset_indices(search)]
         if category:
-            return [p for p in LIGHTING_PRESETS if p["category"] == category]
-        return LIGHTING_PRESETS
+            presets = [p for p in presets if p["category"] == category]
+        return presets
+    
+    @staticmethod
+    def get_presets(category: str = None, search: str = None) -> List[Dict[str, Any]]:
+        """Get presets, optionally filtered by category and search query."""
+        return MockDataManager._filter_presets(category=category, search=search)
+    
+    @staticmethod
+    def get_categories() -> Tuple[str, ...]:
+        """Get sorted preset categories."""
+        return PRESET_CATEGORIES
     
     @staticmethod
     def get_preset_by_id(preset_id: str) -> Dict[str, Any]:
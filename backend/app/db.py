@@ -3,6 +3,7 @@ Database setup and connection management.
 Supports both SQLite (dev) and PostgreSQL (production).
 """
 from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, Text, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import NullPool
@@ -19,8 +20,19 @@ if settings.DATABASE_URL.startswith("postgresql") or settings.DATABASE_URL.start
         DATABASE_URL = f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
     else:
         DATABASE_URL = settings.DATABASE_URL
-    # Use NullPool for async compatibility (or use asyncpg)
-    engine = create_engine(DATABASE_URL, poolclass=NullPool, echo=settings.DEBUG)
+    # Pooled connections sized for webhook bursts; pre-ping drops connections the
+    # server closed, recycle stays under typical idle timeouts, and a short
+    # pool_timeout fails fast instead of queueing requests for 30s. Sized together
+    # with the async pool below (see Settings.DB_POOL_SIZE).
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=5,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        echo=settings.DEBUG,
+    )
 else:
     # SQLite for development
     DATABASE_URL = settings.DATABASE_URL or "sqlite:///./prolight.db"
@@ -55,6 +67,49 @@ applications = Table(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read-only sessions for reporting endpoints: AUTOCOMMIT skips transaction setup,
+# and a read replica is used when DATABASE_REPLICA_URL is configured
+DATABASE_REPLICA_URL = getattr(settings, "DATABASE_REPLICA_URL", None) or os.getenv("DATABASE_REPLICA_URL")
+if DATABASE_REPLICA_URL:
+    replica_engine = create_engine(DATABASE_REPLICA_URL, poolclass=NullPool, echo=settings.DEBUG)
+else:
+    replica_engine = engine
+readonly_engine = replica_engine.execution_options(isolation_level="AUTOCOMMIT", postgresql_readonly=True)
+ReadOnlySessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=readonly_engine)
+
+# Async sessions (asyncpg / aiosqlite) for endpoints that await their queries.
+# Disabled if the async driver for the configured database is not installed.
+def _async_database_url(url: str) -> str:
+    """Map a sync database URL to its async-driver equivalent."""
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme.startswith("postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
+ASYNC_DATABASE_URL = _async_database_url(DATABASE_URL)
+try:
+    if ASYNC_DATABASE_URL.startswith("postgresql"):
+        # Only a few endpoints use async sessions: a small pool, counted in the
+        # same per-worker budget as the sync pool
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_pre_ping=True,
+            pool_size=settings.DB_ASYNC_POOL_SIZE,
+            max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+            pool_timeout=5,
+            pool_recycle=1800,
+            echo=settings.DEBUG,
+        )
+    else:
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=settings.DEBUG)
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+except ImportError:
+    async_engine = None
+    AsyncSessionLocal = None
+
 Base = declarative_base()
 
 # Import all models to register them with Base
@@ -82,3 +137,20 @@ def get_db():
 def get_db_session() -> Session:
     """Get a database session."""
     return SessionLocal()
+
+
+def get_readonly_db():
+    """FastAPI dependency yielding a read-only database session."""
+    db = ReadOnlySessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """FastAPI dependency yielding an AsyncSession."""
+    if AsyncSessionLocal is None:
+        raise RuntimeError(f"No async driver installed for {ASYNC_DATABASE_URL.split('://', 1)[0]}")
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,146 @@
+"""
+Job Events - Redis pub/sub fan-out for text-to-image job status.
+Workers publish each status change / artifact as an SSE event payload on
+job:{run_id}. Each process holds one pattern subscription (job:*) and fans the
+messages out to its local stream subscribers through bounded queues, so the
+number of Redis connections does not grow with the number of open streams.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+
+import orjson
+
+from app.core.cache import get_cache_client
+
+logger = logging.getLogger(__name__)
+
+JOB_CHANNEL_PREFIX = "job:"
+QUEUE_MAXSIZE = 64
+
+# run_id -> subscriber queues. A queue receives each message as a JSON string, and
+# None if the Redis feed is lost (the subscriber should fall back to the database).
+_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+_listener_task: Optional[asyncio.Task] = None
+
+
+async def publish_job_event(run_id: str, event: Dict[str, Any]) -> bool:
+    """
+    Publish a job event to the stream subscribers of a run.
+
+    Args:
+        run_id: Run ID
+        event: SSE event payload (progress / artifact / final)
+
+    Returns:
+        True if the event was published
+    """
+    client = await get_cache_client()
+    if not client:
+        return False
+
+    try:
+        await client.publish(f"{JOB_CHANNEL_PREFIX}{run_id}", orjson.dumps(event))
+        return True
+    except Exception as e:
+        logger.warning(f"Job event publish failed for {run_id}: {e}")
+        return False
+
+
+def _deliver(queue: asyncio.Queue, message: Optional[str]) -> None:
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # Slow consumer: drop the oldest message
+        queue.get_nowait()
+        queue.put_nowait(message)
+
+
+async def _listen(pubsub) -> None:
+    """Read job:* messages and hand them to local subscribers."""
+    global _listener_task
+    prefix_len = len(JOB_CHANNEL_PREFIX)
+    try:
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is None or message.get("type") != "pmessage":
+                continue
+            queues = _subscribers.get(message["channel"][prefix_len:])
+            if queues:
+                for queue in queues:
+                    _deliver(queue, message["data"])
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Job event listener stopped: {e}")
+    finally:
+        _listener_task = None
+        for queues in _subscribers.values():
+            for queue in queues:
+                _deliver(queue, None)
+        try:
+            await pubsub.close()
+        except Exception:
+            pass
+
+
+async def _ensure_listener() -> bool:
+    """Start the process-wide listener if needed; False if Redis is unavailable."""
+    global _listener_task
+    if _listener_task is not None:
+        return True
+
+    client = await get_cache_client()
+    if not client:
+        return False
+
+    try:
+        pubsub = client.pubsub()
+        await pubsub.psubscribe(f"{JOB_CHANNEL_PREFIX}*")
+    except Exception as e:
+        logger.warning(f"Job event subscription failed: {e}")
+        return False
+
+    if _listener_task is None:
+        _listener_task = asyncio.create_task(_listen(pubsub))
+    else:
+        # Another subscriber started the listener while this one was connecting
+        await pubsub.close()
+    return True
+
+
+async def subscribe_job_events(run_id: str, maxsize: int = QUEUE_MAXSIZE) -> Optional[asyncio.Queue]:
+    """
+    Register a queue that receives every event published for a run.
+
+    Args:
+        run_id: Run ID
+        maxsize: Maximum pending messages before the oldest is dropped
+
+    Returns:
+        Queue of JSON strings (None marks a lost feed), or None if Redis is unavailable;
+        pass the queue to unsubscribe_job_events() when done
+    """
+    if not await _ensure_listener():
+        return None
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    _subscribers.setdefault(run_id, set()).add(queue)
+    return queue
+
+
+def unsubscribe_job_events(run_id: str, queue: asyncio.Queue) -> None:
+    """
+    Remove a subscriber queue.
+
+    Args:
+        run_id: Run ID
+        queue: Queue returned by subscribe_job_events()
+    """
+    queues = _subscribers.get(run_id)
+    if queues is None:
+        return
+    queues.discard(queue)
+    if not queues:
+        del _subscribers[run_id]
@@ -0,0 +1,66 @@
+"""
+Run Bus - In-process push of run snapshots to SSE subscribers.
+Each subscriber gets a bounded asyncio.Queue; publishers never block and drop
+the oldest pending snapshot when a slow subscriber's queue is full.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Set
+
+logger = logging.getLogger(__name__)
+
+QUEUE_MAXSIZE = 64
+
+# run_id -> subscriber queues
+_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+
+def subscribe(run_id: str, maxsize: int = QUEUE_MAXSIZE) -> asyncio.Queue:
+    """
+    Register a queue that receives every snapshot published for a run.
+
+    Args:
+        run_id: Run ID
+        maxsize: Maximum pending snapshots before the oldest is dropped
+
+    Returns:
+        Queue of snapshot dicts; pass it to unsubscribe() when done
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    _subscribers.setdefault(run_id, set()).add(queue)
+    return queue
+
+
+def unsubscribe(run_id: str, queue: asyncio.Queue) -> None:
+    """
+    Remove a subscriber queue.
+
+    Args:
+        run_id: Run ID
+        queue: Queue returned by subscribe()
+    """
+    queues = _subscribers.get(run_id)
+    if queues is None:
+        return
+    queues.discard(queue)
+    if not queues:
+        del _subscribers[run_id]
+
+
+def publish(run_id: str, snapshot: Dict[str, Any]) -> None:
+    """
+    Push a run snapshot to every subscriber of the run.
+
+    Args:
+        run_id: Run ID
+        snapshot: Run snapshot (WorkflowContext.to_dict())
+    """
+    for queue in _subscribers.get(run_id, ()):
+        try:
+            queue.put_nowait(snapshot)
+        except asyncio.QueueFull:
+            # Slow consumer: drop the oldest snapshot, the newest supersedes it
+            queue.get_nowait()
+            queue.put_nowait(snapshot)
+            logger.debug(f"Dropped oldest snapshot for slow subscriber of run {run_id}")
@@ -13,6 +13,7 @@ import logging
 from app.core.config import settings
 from app.models.schemas import HealthResponse, ErrorResponse
 from app.services.fibo_adapter import FIBOAdapter
+from app.services.bria_vehicle_service import close_http_client as close_bria_vehicle_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +39,7 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down ProLight AI Backend...")
     if fibo_adapter:
         await fibo_adapter.close()
+    await close_bria_vehicle_client()
     logger.info("Shutdown complete")
 
 
@@ -2,7 +2,7 @@
 SQLAlchemy models for billing: invoices, subscriptions, and usage records.
 Note: User model is defined in app.models.user
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Numeric, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Numeric, Text, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db import Base
@@ -32,6 +32,11 @@ class Invoice(Base):
 
     user = relationship("User", back_populates="invoices")
 
+    __table_args__ = (
+        # Range scan for paid-in-period revenue queries
+        Index("ix_invoices_status_created_at", "status", "created_at"),
+    )
+
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
@@ -56,6 +61,24 @@ class Subscription(Base):
 
     user = relationship("User", back_populates="subscriptions")
 
+    __table_args__ = (
+        # Keyset pagination for the admin subscription list (newest first)
+        Index("ix_subscriptions_created_at_id", "created_at", "id"),
+    )
+
+
+class StripePrice(Base):
+    """Local copy of Stripe prices, kept in sync by price.* webhooks."""
+    __tablename__ = "stripe_prices"
+
+    price_id = Column(String(255), primary_key=True)
+    unit_amount = Column(Integer, nullable=False, default=0)  # cents
+    interval = Column(String(32), nullable=True)  # month|year|None for one-time prices
+    currency = Column(String(8), nullable=False, default="usd")
+    active = Column(Boolean, default=True)
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
 
 class UsageRecord(Base):
     __tablename__ = "usage_records"
@@ -66,8 +89,18 @@ class UsageRecord(Base):
     quantity = Column(Numeric, nullable=False)  # units (images, seconds, etc.)
     reported_at = Column(DateTime, server_default=func.now())
     stripe_report_id = Column(String(255), nullable=True)
-    metadata = Column(Text, nullable=True)
+    # Column is "metadata"; the attribute name is reserved by the declarative base
+    meta = Column("metadata", Text, nullable=True)
+    # Client-supplied Idempotency-Key of the report_usage call that created the record
+    idempotency_key = Column(String(255), nullable=True)
 
     user = relationship("User", back_populates="usage_records")
 
+    __table_args__ = (
+        # Per-user history, newest first (read backwards)
+        Index("ix_usage_records_user_id_reported_at", "user_id", "reported_at"),
+        # A retried report with the same key inserts nothing (NULL keys never conflict)
+        UniqueConstraint("user_id", "idempotency_key", name="uq_usage_records_user_id_idempotency_key"),
+    )
+
 
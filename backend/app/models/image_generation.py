@@ -5,8 +5,9 @@ from sqlalchemy import (
     Column, String, Text, DateTime, Integer, Float, Boolean,
     ForeignKey, JSON, Index
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Uuid as UUID  # native UUID on PostgreSQL, CHAR(32) elsewhere
 from sqlalchemy.sql import func
+from datetime import datetime
 import uuid
 from app.db import Base
 
@@ -36,7 +37,8 @@ class ImageJob(Base):
     meta = Column(JSON, nullable=True)  # {tags, priority, user_id}
     sse_token = Column(String(255), nullable=True)
     cached_hit = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # Python-side default so the value is known after INSERT without a refresh
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
 
@@ -78,7 +80,8 @@ class PromptCache(Base):
     
     # Composite index for fast lookups
     __table_args__ = (
-        Index('idx_prompt_cache_lookup', 'prompt_hash', 'model_version', 'seed', 'width', 'height'),
+        Index('idx_prompt_cache_lookup', 'prompt_hash', 'model_version', 'width', 'height', 'seed',
+              postgresql_include=['artifact_id']),
     )
 
 
@@ -246,3 +246,33 @@ class HealthResponse(BaseModel):
     status: str = "healthy"
     version: str
     timestamp: str
+
+
+# ============================================================================
+# Stripe Models
+# ============================================================================
+
+class CreateCheckoutSessionRequest(BaseModel):
+    """Stripe Checkout session request."""
+    priceId: str = Field(..., description="Stripe price ID")
+    successUrl: str = Field(..., description="Redirect URL after payment")
+    cancelUrl: str = Field(..., description="Redirect URL if checkout is cancelled")
+    coupon: Optional[str] = Field(None, description="Stripe coupon ID")
+    mode: str = Field("subscription", description="Checkout mode: subscription or payment")
+
+
+class CheckoutSessionResponse(BaseModel):
+    """Stripe Checkout session response."""
+    id: str
+    url: str
+
+
+class CreatePortalSessionRequest(BaseModel):
+    """Stripe Customer Portal session request."""
+    customerId: str = Field(..., description="Stripe customer ID")
+    returnUrl: str = Field(..., description="URL to return to from the portal")
+
+
+class PortalSessionResponse(BaseModel):
+    """Stripe Customer Portal session response."""
+    url: str
@@ -64,6 +64,6 @@ class AdminLog(Base):
     admin_user_id = Column(Integer, nullable=False)
     action = Column(String(100), nullable=False)  # e.g., "user_banned", "credits_added"
     target_user_id = Column(Integer, nullable=True)
-    metadata = Column(Text, nullable=True)  # JSON string
+    meta = Column("metadata", Text, nullable=True)  # JSON string; "metadata" is reserved by the declarative base
     created_at = Column(DateTime, server_default=func.now())
 
@@ -4,14 +4,17 @@ Executes agents (Planner, Critic, Executor) using MCP clients.
 """
 
 import logging
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Optional
 import httpx
 
-from .orchestrator import WorkflowContext
 from .routing import AgentRole
 from .observability import trace_agent_execution
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    # The orchestrator imports this module; the context is only needed for annotations
+    from .orchestrator import WorkflowContext
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,7 +52,7 @@ async def call_mcp(
 
 
 @trace_agent_execution("planner")
-async def planner_agent(ctx: WorkflowContext) -> WorkflowContext:
+async def planner_agent(ctx: "WorkflowContext") -> "WorkflowContext":
     """
     Planner Agent: Analyzes input and creates execution plan.
     
@@ -109,7 +112,7 @@ async def planner_agent(ctx: WorkflowContext) -> WorkflowContext:
         raise
 
 
-async def critic_agent(ctx: WorkflowContext) -> WorkflowContext:
+async def critic_agent(ctx: "WorkflowContext") -> "WorkflowContext":
     """
     Critic Agent: Reviews and critiques the plan.
     
@@ -181,7 +184,7 @@ async def critic_agent(ctx: WorkflowContext) -> WorkflowContext:
 
 
 @trace_agent_execution("executor")
-async def executor_agent(ctx: WorkflowContext) -> WorkflowContext:
+async def executor_agent(ctx: "WorkflowContext") -> "WorkflowContext":
     """
     Executor Agent: Executes the approved plan.
     
@@ -244,7 +247,7 @@ async def executor_agent(ctx: WorkflowContext) -> WorkflowContext:
         raise
 
 
-async def run_agent(role: AgentRole, ctx: WorkflowContext) -> WorkflowContext:
+async def run_agent(role: AgentRole, ctx: "WorkflowContext") -> "WorkflowContext":
     """
     Route to appropriate agent based on role.
     
@@ -197,47 +197,47 @@ async def advance(
                 operation_name=f"{role.value}_agent",
             )
         
-            # Transition to next state
-            next_state = rule["to"]
-            ctx.state = next_state
-            ctx.updated_at = datetime.utcnow()
-            ctx.retry_count = 0  # Reset retry count on success
-            
-            logger.info(f"Workflow {ctx.run_id} advanced from {rule['from'].value} to {next_state.value}")
-            
-            if broadcast_update:
-                await broadcast_update(ctx.run_id, {
-                    "state": next_state.value,
-                    "message": f"State transitioned to {next_state.value}",
-                })
+        # Transition to next state
+        next_state = rule["to"]
+        ctx.state = next_state
+        ctx.updated_at = datetime.utcnow()
+        ctx.retry_count = 0  # Reset retry count on success
         
-        except Exception as e:
-            logger.error(f"Error advancing workflow {ctx.run_id}: {e}", exc_info=True)
-            ctx.error = str(e)
-            ctx.retry_count += 1
-            
-            # Attempt recovery from checkpoint if retries available
-            if ctx.retry_count < (retry_config.max_attempts if retry_config else 3):
-                logger.info(f"Attempting recovery for workflow {ctx.run_id} (retry {ctx.retry_count})")
-                if ctx.restore_checkpoint(checkpoint_name):
-                    ctx.state = WorkflowState(rule["from"].value)  # Revert to previous state
-                    ctx.error = None
-                else:
-                    ctx.state = WorkflowState.FAILED
+        logger.info(f"Workflow {ctx.run_id} advanced from {rule['from'].value} to {next_state.value}")
+        
+        if broadcast_update:
+            await broadcast_update(ctx.run_id, {
+                "state": next_state.value,
+                "message": f"State transitioned to {next_state.value}",
+            })
+    
+    except Exception as e:
+        logger.error(f"Error advancing workflow {ctx.run_id}: {e}", exc_info=True)
+        ctx.error = str(e)
+        ctx.retry_count += 1
+        
+        # Attempt recovery from checkpoint if retries available
+        if ctx.retry_count < (retry_config.max_attempts if retry_config else 3):
+            logger.info(f"Attempting recovery for workflow {ctx.run_id} (retry {ctx.retry_count})")
+            if ctx.restore_checkpoint(checkpoint_name):
+                ctx.state = WorkflowState(rule["from"].value)  # Revert to previous state
+                ctx.error = None
             else:
                 ctx.state = WorkflowState.FAILED
-                metrics.record_workflow_failed(ctx.run_id, str(e), 0.0)
-            
-            if broadcast_update:
-                await broadcast_update(ctx.run_id, {
-                    "state": ctx.state.value,
-                    "error": str(e),
-                    "message": f"Workflow failed: {e}",
-                    "retry_count": ctx.retry_count,
-                })
+        else:
+            ctx.state = WorkflowState.FAILED
+            metrics.record_workflow_failed(ctx.run_id, str(e), 0.0)
         
-        finally:
-            ctx.locked = False
+        if broadcast_update:
+            await broadcast_update(ctx.run_id, {
+                "state": ctx.state.value,
+                "error": str(e),
+                "message": f"Workflow failed: {e}",
+                "retry_count": ctx.retry_count,
+            })
+    
+    finally:
+        ctx.locked = False
     
     return ctx
 
@@ -4,7 +4,9 @@ Implements deterministic workflow execution with human-in-the-loop gates.
 """
 
 import hashlib
+import json
 import logging
+import re
 from typing import Dict, Any, Optional, List
 from enum import Enum
 from datetime import datetime
@@ -14,6 +16,9 @@ from app.services.mcp_client import get_mcp_client
 
 logger = logging.getLogger(__name__)
 
+# Outermost {...} span in an LLM response
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
 
 class AgentState(str, Enum):
     """Agent workflow states."""
@@ -285,9 +290,7 @@ Rules:
         try:
             response = await mcp_client.call_mcp(prompt, max_tokens=2048)
             # Parse JSON from response (simplified - in production, use proper JSON extraction)
-            import json
-            import re
-            json_match = re.search(r'\{.*\}', response["content"], re.DOTALL)
+            json_match = _JSON_OBJECT_RE.search(response["content"])
             if json_match:
                 proposal = json.loads(json_match.group())
                 validate_proposal(proposal)
@@ -11,6 +11,27 @@ from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Process-wide pooled client: Bria calls reuse keep-alive connections instead of
+# paying a TCP+TLS handshake per request. Closed on app shutdown.
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared Bria HTTP client, creating it on first use or after it was closed."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=30.0,
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared Bria HTTP client (a later call creates a new one)."""
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+
 
 class PlacementType(str, Enum):
     ORIGINAL = "original"
@@ -56,14 +77,20 @@ class SegmentationMasks:
 class BriaVehicleShotService:
     """Service for Bria vehicle-specific product shot editing APIs."""
     
-    def __init__(self, api_token: str):
+    def __init__(self, api_token: str, client: Optional[httpx.AsyncClient] = None):
         self.api_token = api_token
+        self._client = client
         self.base_url = "https://engine.prod.bria-api.com/v1"
         self.headers = {
             "api_token": api_token,
             "Content-Type": "application/json",
         }
     
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Resolved per call so the service keeps working after the shared client is recreated
+        return self._client or get_http_client()
+    
     async def generate_vehicle_shot_by_text(
         self,
         image_url: str,
@@ -111,14 +138,14 @@ class BriaVehicleShotService:
         if manual_placement_selection:
             payload["manual_placement_selection"] = manual_placement_selection
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.base_url}/product/vehicle/shot_by_text",
-                json=payload,
-                headers=self.headers,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self.client.post(
+            f"{self.base_url}/product/vehicle/shot_by_text",
+            json=payload,
+            headers=self.headers,
+            timeout=60.0,
+        )
+        response.raise_for_status()
+        return response.json()
     
     async def segment_vehicle(self, image_url: str) -> SegmentationMasks:
         """
@@ -127,15 +154,14 @@ class BriaVehicleShotService:
         """
         payload = {"image_url": image_url}
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.base_url}/product/vehicle/segment",
-                json=payload,
-                headers=self.headers,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return SegmentationMasks(**data)
+        response = await self.client.post(
+            f"{self.base_url}/product/vehicle/segment",
+            json=payload,
+            headers=self.headers,
+        )
+        response.raise_for_status()
+        data = response.json()
+        return SegmentationMasks(**data)
     
     async def generate_reflections(
         self,
@@ -167,14 +193,13 @@ class BriaVehicleShotService:
         if seed is not None:
             payload["seed"] = seed
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.base_url}/product/vehicle/generate_reflections",
-                json=payload,
-                headers=self.headers,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self.client.post(
+            f"{self.base_url}/product/vehicle/generate_reflections",
+            json=payload,
+            headers=self.headers,
+        )
+        response.raise_for_status()
+        return response.json()
     
     async def refine_tires(
         self,
@@ -204,14 +229,13 @@ class BriaVehicleShotService:
             "content_moderation": content_moderation,
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.base_url}/product/vehicle/refine_tires",
-                json=payload,
-                headers=self.headers,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self.client.post(
+            f"{self.base_url}/product/vehicle/refine_tires",
+            json=payload,
+            headers=self.headers,
+        )
+        response.raise_for_status()
+        return response.json()
     
     async def apply_effect(
         self,
@@ -234,14 +258,13 @@ class BriaVehicleShotService:
         if seed is not None:
             payload["seed"] = seed
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.base_url}/product/vehicle/apply_effect",
-                json=payload,
-                headers=self.headers,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self.client.post(
+            f"{self.base_url}/product/vehicle/apply_effect",
+            json=payload,
+            headers=self.headers,
+        )
+        response.raise_for_status()
+        return response.json()
     
     async def harmonize_image(
         self,
@@ -259,14 +282,13 @@ class BriaVehicleShotService:
             "content_moderation": content_moderation,
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.base_url}/product/vehicle/harmonize",
-                json=payload,
-                headers=self.headers,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self.client.post(
+            f"{self.base_url}/product/vehicle/harmonize",
+            json=payload,
+            headers=self.headers,
+        )
+        response.raise_for_status()
+        return response.json()
     
     async def complete_vehicle_enhancement(
         self,
@@ -0,0 +1,58 @@
+"""
+Stripe customer cache.
+Caches the customer summary returned by /api/stripe/customer per user email so
+repeat reads skip the database. Backed by the generic Redis cache.
+"""
+
+from typing import Any, Dict, Optional
+
+from app.core.cache import delete_generic_cache, get_generic_cache, set_generic_cache
+
+CUSTOMER_CACHE_PREFIX = "stripe:cust:"
+CUSTOMER_CACHE_TTL_SECONDS = 3600
+
+
+def _customer_key(email: str) -> str:
+    return f"{CUSTOMER_CACHE_PREFIX}{email.lower()}"
+
+
+async def get_cached_customer(email: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the cached customer summary for a user.
+
+    Args:
+        email: User email
+
+    Returns:
+        Customer summary, or None on miss
+    """
+    return await get_generic_cache(_customer_key(email))
+
+
+async def set_cached_customer(email: str, customer: Dict[str, Any]) -> bool:
+    """
+    Cache a user's customer summary.
+
+    Args:
+        email: User email
+        customer: Customer summary (stripe_customer_id, email, role)
+
+    Returns:
+        True if the value was stored
+    """
+    return await set_generic_cache(_customer_key(email), customer, ttl=CUSTOMER_CACHE_TTL_SECONDS)
+
+
+async def invalidate_cached_customer(email: Optional[str]) -> bool:
+    """
+    Drop a user's cached customer summary (after it changed).
+
+    Args:
+        email: User email; ignored if empty
+
+    Returns:
+        True if the delete was issued
+    """
+    if not email:
+        return False
+    return await delete_generic_cache(_customer_key(email))
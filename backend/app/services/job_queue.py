@@ -0,0 +1,73 @@
+"""
+Image generation job queue.
+Jobs are added to the BullMQ queue "image-gen" with the bullmq client, so they are
+stored exactly as a BullMQ Worker (worker/) expects them. The queue is created once
+per process on top of the shared Redis client from app.core.cache - enqueueing
+never opens a connection per request.
+"""
+
+import logging
+from typing import Any, Dict
+
+from app.core.cache import get_cache_client
+
+logger = logging.getLogger(__name__)
+
+# Try to import BullMQ
+try:
+    from bullmq import Queue
+    BULLMQ_AVAILABLE = True
+except ImportError:
+    BULLMQ_AVAILABLE = False
+    logger.warning("bullmq not available, image jobs cannot be queued")
+
+IMAGE_JOB_QUEUE = "image-gen"
+IMAGE_JOB_NAME = "t2i"
+
+# Retries with exponential backoff, as worker/producer.js queues its jobs; finished
+# jobs are trimmed so the queue does not grow without bound
+IMAGE_JOB_OPTIONS = {
+    "attempts": 3,
+    "backoff": {"type": "exponential", "delay": 2000},
+    "removeOnComplete": 1000,
+    "removeOnFail": 5000,
+}
+
+# Process-wide queue
+_queue = None
+
+
+async def get_image_queue():
+    """Get or create the image job queue (None if BullMQ or Redis is unavailable)."""
+    global _queue
+    if not BULLMQ_AVAILABLE:
+        return None
+    if _queue is None:
+        client = await get_cache_client()
+        if not client:
+            return None
+        _queue = Queue(IMAGE_JOB_QUEUE, {"connection": client})
+    return _queue
+
+
+async def enqueue_image_job(job: Dict[str, Any]) -> bool:
+    """
+    Queue an image generation job for the workers.
+
+    Args:
+        job: Job data (run_id plus whatever the worker needs besides the ImageJob row);
+            the run_id is also the BullMQ job id, so a job is never queued twice
+
+    Returns:
+        True if the job was queued, False if BullMQ or Redis is unavailable
+    """
+    queue = await get_image_queue()
+    if queue is None:
+        return False
+
+    try:
+        await queue.add(IMAGE_JOB_NAME, job, {**IMAGE_JOB_OPTIONS, "jobId": job["run_id"]})
+        return True
+    except Exception as e:
+        logger.warning(f"Enqueue failed for {job.get('run_id')}: {e}")
+        return False
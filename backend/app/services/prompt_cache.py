@@ -3,15 +3,35 @@ Prompt hashing and caching service for content-addressable cache.
 """
 import hashlib
 import json
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+import time
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta, timezone
+import orjson
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, bindparam, update
 from app.models.image_generation import PromptCache, Artifact
 import logging
 
 logger = logging.getLogger(__name__)
 
+# In-process memo of cache hits, in front of the database lookup. Short TTL (never
+# past the entry's expires_at): the database entry stays authoritative.
+LOOKUP_MEMO_TTL_SECONDS = 60
+LOOKUP_MEMO_MAXSIZE = 256
+
+# Memo hits are counted in process and added to hit_count in one batched UPDATE
+# at most this often
+HIT_FLUSH_INTERVAL_SECONDS = 10
+
+# (prompt_hash, model_version, seed, width, height) ->
+#     (deadline on the monotonic clock, cache entry id, result)
+_lookup_memo: Dict[Tuple[str, str, Optional[int], int, int], Tuple[float, Any, Dict[str, Any]]] = {}
+
+# cache entry id -> memo hits not yet added to hit_count
+_pending_hits: Dict[Any, int] = {}
+_next_hit_flush = 0.0
+
 
 def normalize_prompt_text(prompt: Optional[str]) -> str:
     """Normalize prompt text for consistent hashing."""
@@ -60,6 +80,39 @@ def compute_prompt_hash(
     Returns:
         SHA256 hex digest
     """
+    # Memoized on a canonical (sorted-key) serialization of fibo_json; one fast dump
+    # is much cheaper than normalizing and hashing on every repeat
+    fibo_key = None
+    if fibo_json:
+        try:
+            fibo_key = orjson.dumps(fibo_json, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            # Not plain JSON (e.g. non-str keys): hash without memoizing
+            return _compute_prompt_hash(prompt_text, fibo_json, model_version, width, height, seed)
+    return _memoized_prompt_hash(prompt_text, fibo_key, model_version, width, height, seed)
+
+
+@lru_cache(maxsize=1024)
+def _memoized_prompt_hash(
+    prompt_text: Optional[str],
+    fibo_key: Optional[bytes],
+    model_version: str,
+    width: int,
+    height: int,
+    seed: Optional[int]
+) -> str:
+    fibo_json = orjson.loads(fibo_key) if fibo_key else None
+    return _compute_prompt_hash(prompt_text, fibo_json, model_version, width, height, seed)
+
+
+def _compute_prompt_hash(
+    prompt_text: Optional[str],
+    fibo_json: Optional[Dict[str, Any]],
+    model_version: str,
+    width: int,
+    height: int,
+    seed: Optional[int]
+) -> str:
     components = []
     
     # Normalize and add prompt text
@@ -106,6 +159,18 @@ def lookup_cache(
     Returns:
         Dictionary with artifact metadata if cache hit, None otherwise
     """
+    # Recent hits are served from the in-process memo (no database round-trip);
+    # their hits are counted and flushed in batches
+    memo_key = (prompt_hash, model_version, seed, width, height)
+    now = time.monotonic()
+    memoized = _lookup_memo.get(memo_key)
+    if memoized is not None and memoized[0] > now:
+        _pending_hits[memoized[1]] = _pending_hits.get(memoized[1], 0) + 1
+    if now >= _next_hit_flush:
+        _flush_hits(db, now)
+    if memoized is not None and memoized[0] > now:
+        return memoized[2]
+    
     try:
         # Build query conditions
         conditions = [
@@ -134,7 +199,7 @@ def lookup_cache(
             # Fetch artifact
             artifact = db.query(Artifact).filter(Artifact.id == cache_entry.artifact_id).first()
             if artifact:
-                return {
+                result = {
                     "artifact_id": str(artifact.id),
                     "url": artifact.url,
                     "thumb_url": artifact.thumb_url,
@@ -143,12 +208,52 @@ def lookup_cache(
                     "cached_at": cache_entry.created_at.isoformat(),
                     "hit_count": cache_entry.hit_count
                 }
+                _lookup_memo.pop(memo_key, None)
+                if len(_lookup_memo) >= LOOKUP_MEMO_MAXSIZE:
+                    # Oldest entry first (dicts keep insertion order)
+                    del _lookup_memo[next(iter(_lookup_memo))]
+                _lookup_memo[memo_key] = (_memo_deadline(now, cache_entry.expires_at), cache_entry.id, result)
+                return result
     except Exception as e:
         logger.error(f"Cache lookup error: {e}")
     
     return None
 
 
+def _memo_deadline(now: float, expires_at: Optional[datetime]) -> float:
+    """Monotonic deadline for a memo entry: LOOKUP_MEMO_TTL_SECONDS, capped at expires_at."""
+    deadline = now + LOOKUP_MEMO_TTL_SECONDS
+    if expires_at is not None:
+        # Naive timestamps are UTC (see store_cache)
+        utc_now = datetime.now(timezone.utc) if expires_at.tzinfo else datetime.utcnow()
+        deadline = min(deadline, now + (expires_at - utc_now).total_seconds())
+    return deadline
+
+
+def _flush_hits(db: Session, now: float) -> None:
+    """Add the pending memo hits to prompt_cache.hit_count (one executemany UPDATE)."""
+    global _pending_hits, _next_hit_flush
+    _next_hit_flush = now + HIT_FLUSH_INTERVAL_SECONDS
+    if not _pending_hits:
+        return
+    pending, _pending_hits = _pending_hits, {}
+    table = PromptCache.__table__
+    try:
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("entry_id"))
+            .values(hit_count=table.c.hit_count + bindparam("hits")),
+            [{"entry_id": entry_id, "hits": hits} for entry_id, hits in pending.items()]
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Cache hit count update failed: {e}")
+        # Keep the hits for the next flush
+        for entry_id, hits in pending.items():
+            _pending_hits[entry_id] = _pending_hits.get(entry_id, 0) + hits
+
+
 def store_cache(
     db: Session,
     prompt_hash: str,
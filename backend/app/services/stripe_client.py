@@ -4,14 +4,27 @@ Supports both real Stripe integration and mock mode for development.
 """
 
 import os
+import orjson
+import requests
 import stripe
+from requests.adapters import HTTPAdapter
 from typing import Optional, Dict, Any
 from datetime import datetime
 from app.core.config import settings
 
+STRIPE_HTTP_TIMEOUT_SECONDS = 10
+
 # Initialize Stripe
 if settings.STRIPE_SECRET_KEY and not settings.USE_MOCK_STRIPE:
     stripe.api_key = settings.STRIPE_SECRET_KEY
+    # One pooled HTTP session for every Stripe call in the process (including calls
+    # made from worker threads), so TLS connections are reused instead of renegotiated
+    _http_session = requests.Session()
+    _http_session.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=50))
+    stripe.default_http_client = stripe.http_client.RequestsClient(
+        timeout=STRIPE_HTTP_TIMEOUT_SECONDS,
+        session=_http_session,
+    )
 else:
     # Mock mode - no real Stripe calls
     stripe.api_key = "sk_test_mock_key_for_development"
@@ -89,10 +102,30 @@ class MockStripe:
         }
 
 
+_mock_stripe = MockStripe()
+
+
 def get_stripe_client():
-    """Get Stripe client (real or mock based on configuration)."""
+    """Get Stripe client (real or mock based on configuration); both are process-wide."""
     if settings.STRIPE_SECRET_KEY and not settings.USE_MOCK_STRIPE:
         return stripe
     else:
-        return MockStripe()
+        return _mock_stripe
 
+
+
+def construct_webhook_event(payload: bytes, signature: Optional[str], secret: str) -> "stripe.Event":
+    """
+    Verify a webhook signature and build the event (same contract as
+    stripe.Webhook.construct_event).
+    The signature is checked before the body is parsed, and parsing uses orjson
+    instead of the SDK's json.loads.
+    
+    Raises:
+        stripe.error.SignatureVerificationError: If the signature is invalid
+        ValueError: If the payload is not valid JSON
+    """
+    stripe.WebhookSignature.verify_header(
+        payload.decode("utf-8"), signature, secret, stripe.Webhook.DEFAULT_TOLERANCE
+    )
+    return stripe.Event.construct_from(orjson.loads(payload), stripe.api_key)
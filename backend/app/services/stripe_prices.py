@@ -0,0 +1,99 @@
+"""
+Stripe prices.
+The local stripe_prices table mirrors Stripe prices (kept current by the price.*
+webhooks, backfilled by the revenue dashboard), and price lookups that go to the
+Stripe API are cached in Redis per price id.
+"""
+
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import delete_generic_cache
+from app.db import SessionLocal
+from app.models.billing import StripePrice
+
+PRICE_CACHE_PREFIX = "stripe_price:"
+PRICE_CACHE_TTL_SECONDS = 86400  # 24 hours
+
+
+def price_cache_key(price_id: str) -> str:
+    return f"{PRICE_CACHE_PREFIX}{price_id}"
+
+
+async def invalidate_price_cache(price_id: str) -> bool:
+    """
+    Drop a cached price (after a price.* webhook changed it).
+
+    Args:
+        price_id: Stripe price id
+
+    Returns:
+        True if the delete was issued
+    """
+    return await delete_generic_cache(price_cache_key(price_id))
+
+
+def _apply_price(price: StripePrice, price_obj: dict) -> None:
+    price.unit_amount = price_obj.get("unit_amount") or 0
+    price.currency = price_obj.get("currency") or "usd"
+    price.interval = (price_obj.get("recurring") or {}).get("interval")
+    price.active = price_obj.get("active", True)
+
+
+def upsert_price(db: Session, price_obj: dict):
+    """
+    Persist or update a StripePrice row from a stripe price object.
+    Idempotent by price id.
+    """
+    price_id = price_obj.get("id")
+    if not price_id:
+        return None
+
+    price = db.query(StripePrice).filter(StripePrice.price_id == price_id).first()
+    if not price:
+        price = StripePrice(price_id=price_id)
+
+    _apply_price(price, price_obj)
+
+    db.add(price)
+    db.commit()
+    db.refresh(price)
+    return price
+
+
+def upsert_prices(price_objs: Iterable[dict]) -> int:
+    """
+    Persist or update many StripePrice rows in one transaction (one SELECT for the
+    existing rows, one commit). Blocking: call it through asyncio.to_thread from
+    async code.
+
+    Args:
+        price_objs: Stripe price objects (dicts with an "id")
+
+    Returns:
+        Number of prices written
+    """
+    by_id = {price_obj["id"]: price_obj for price_obj in price_objs if price_obj.get("id")}
+    if not by_id:
+        return 0
+
+    db = SessionLocal()
+    try:
+        existing = {
+            price.price_id: price
+            for price in db.query(StripePrice).filter(StripePrice.price_id.in_(by_id))
+        }
+        for price_id, price_obj in by_id.items():
+            price = existing.get(price_id)
+            if price is None:
+                price = StripePrice(price_id=price_id)
+                db.add(price)
+            _apply_price(price, price_obj)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return len(by_id)
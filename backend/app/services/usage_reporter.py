@@ -0,0 +1,150 @@
+"""
+Batched Stripe usage reporting.
+report_usage queues each local usage record in a Redis sorted set (scored by its
+timestamp). A per-process flusher aggregates the pending records every
+FLUSH_INTERVAL_SECONDS into one Stripe UsageRecord (action="increment") per
+subscription item, then stamps the local records with the report id. A Redis lock
+lets one process flush at a time; records whose report fails stay pending.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import List, Optional
+
+import orjson
+import stripe
+from sqlalchemy import update
+
+from app.core.cache import add_generic_cache, delete_generic_cache, get_cache_client
+from app.db import SessionLocal
+from app.models.billing import UsageRecord
+
+logger = logging.getLogger(__name__)
+
+PENDING_USAGE_KEY = "stripe:usage:pending"
+FLUSH_LOCK_KEY = "stripe:usage:flush_lock"
+FLUSH_INTERVAL_SECONDS = 30
+FLUSH_LOCK_TTL_SECONDS = 120  # Safety expiry if a flushing process dies
+
+_flusher_task: Optional[asyncio.Task] = None
+
+
+async def queue_usage(usage_id: int, subscription_item_id: str, quantity: Decimal, timestamp: int) -> bool:
+    """
+    Queue a local usage record for the next batched Stripe report.
+
+    Args:
+        usage_id: Local UsageRecord id
+        subscription_item_id: Stripe subscription item
+        quantity: Units used (queued as a decimal string, never a float)
+        timestamp: Usage time (unix seconds)
+
+    Returns:
+        True if queued, False if Redis is unavailable (report it directly)
+    """
+    client = await get_cache_client()
+    if not client:
+        return False
+
+    member = orjson.dumps({
+        "usage_id": usage_id,
+        "item": subscription_item_id,
+        "quantity": str(quantity),
+        "ts": timestamp,
+    })
+    try:
+        await client.zadd(PENDING_USAGE_KEY, {member: timestamp})
+    except Exception as e:
+        logger.warning(f"Usage queueing failed for record {usage_id}: {e}")
+        return False
+
+    _ensure_flusher()
+    return True
+
+
+def _ensure_flusher() -> None:
+    global _flusher_task
+    if _flusher_task is None or _flusher_task.done():
+        _flusher_task = asyncio.create_task(_flush_loop())
+
+
+async def _flush_loop() -> None:
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+        try:
+            await flush_pending_usage()
+        except Exception as e:
+            logger.error(f"Usage flush failed: {e}", exc_info=True)
+
+
+def _mark_reported(usage_ids: List[int], stripe_report_id: str) -> None:
+    """Stamp local usage records with the Stripe report that covered them."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(UsageRecord)
+            .where(UsageRecord.id.in_(usage_ids))
+            .values(stripe_report_id=stripe_report_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _report_quantity(entries) -> int:
+    """
+    Stripe quantity for a batch: each record is truncated to whole units as
+    report_usage does when it reports directly, so batching doesn't change the bill.
+    """
+    return sum(int(Decimal(entry["quantity"])) for entry in entries)
+
+
+async def flush_pending_usage() -> int:
+    """
+    Report all pending usage to Stripe, one increment per subscription item.
+
+    Returns:
+        Number of local usage records reported
+    """
+    client = await get_cache_client()
+    if not client:
+        return 0
+    # Another process is flushing
+    if not await add_generic_cache(FLUSH_LOCK_KEY, 1, ttl=FLUSH_LOCK_TTL_SECONDS):
+        return 0
+
+    try:
+        members = await client.zrange(PENDING_USAGE_KEY, 0, -1)
+        groups = defaultdict(list)
+        for member in members:
+            entry = orjson.loads(member)
+            groups[entry["item"]].append((member, entry))
+
+        reported = 0
+        for item, entries in groups.items():
+            usage_ids = sorted(entry["usage_id"] for _, entry in entries)
+            # Same records -> same key, so a retry after a partial failure is not double-counted
+            idempotency_key = "usage-" + hashlib.sha256(orjson.dumps(usage_ids)).hexdigest()
+            try:
+                report = await asyncio.to_thread(
+                    stripe.UsageRecord.create,
+                    subscription_item=item,
+                    quantity=_report_quantity(entry for _, entry in entries),
+                    timestamp=max(entry["ts"] for _, entry in entries),
+                    action="increment",
+                    idempotency_key=idempotency_key,
+                )
+            except stripe.error.StripeError as e:
+                logger.warning(f"Usage report for {item} failed, will retry: {e}")
+                continue
+
+            await client.zrem(PENDING_USAGE_KEY, *(member for member, _ in entries))
+            await asyncio.to_thread(_mark_reported, usage_ids, report.get("id"))
+            reported += len(entries)
+        return reported
+    finally:
+        await delete_generic_cache(FLUSH_LOCK_KEY)
@@ -0,0 +1,145 @@
+"""
+Voice activity detection for the voice assistant.
+Splits a 16 kHz, 16-bit mono PCM stream into speech segments with Silero VAD, so
+STT only runs on completed speech instead of on fixed-size chunks of audio
+(silence included, words cut mid-way). Optional: without torch and silero-vad,
+create_segmenter() returns None and callers keep their byte-count fallback.
+
+The model weights are loaded once per process; each segmenter gets its own copy
+of the model, since the model's recurrent state belongs to one stream. feed()
+runs inference and blocks, so async callers run it in a thread.
+"""
+
+import asyncio
+import copy
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import torch
+    from silero_vad import load_silero_vad
+    VAD_AVAILABLE = True
+    # Silero is tuned for single-threaded inference on small frames
+    torch.set_num_threads(1)
+except ImportError:
+    VAD_AVAILABLE = False
+    logger.warning("silero-vad not available, voice STT falls back to fixed-size chunks")
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2
+# Silero VAD takes 512-sample frames at 16 kHz (32 ms)
+FRAME_SAMPLES = 512
+FRAME_BYTES = FRAME_SAMPLES * BYTES_PER_SAMPLE
+FRAME_MS = FRAME_SAMPLES * 1000 // SAMPLE_RATE
+
+SPEECH_THRESHOLD = 0.5
+MIN_SPEECH_MS = 250
+MIN_SILENCE_MS = 500
+# Emit a segment at this length even if the speaker hasn't paused (30 s)
+MAX_SEGMENT_BYTES = 30 * SAMPLE_RATE * BYTES_PER_SAMPLE
+
+# Process-wide model as loaded; segmenters run on copies of it
+_base_model = None
+_base_model_lock = asyncio.Lock()
+
+
+class SpeechSegmenter:
+    """
+    Per-stream speech segmentation state machine.
+    Frames at or above SPEECH_THRESHOLD open (or extend) a segment; once
+    MIN_SILENCE_MS of silence follows, the segment is emitted if it holds at
+    least MIN_SPEECH_MS of speech, otherwise dropped.
+    """
+
+    def __init__(self, model):
+        # The model carries recurrent state, so each stream needs its own
+        self._model = model
+        self._pending = bytearray()  # Partial frame carried to the next feed()
+        self._segment = bytearray()
+        self._speech_ms = 0
+        self._silence_ms = 0
+
+    def _speech_probability(self, frame: bytes) -> float:
+        samples = torch.frombuffer(bytearray(frame), dtype=torch.int16).float() / 32768.0
+        return self._model(samples, SAMPLE_RATE).item()
+
+    def _take_segment(self) -> Optional[bytes]:
+        segment = bytes(self._segment) if self._speech_ms >= MIN_SPEECH_MS else None
+        self._segment.clear()
+        self._speech_ms = 0
+        self._silence_ms = 0
+        return segment
+
+    def feed(self, audio: bytes) -> List[bytes]:
+        """
+        Add audio to the stream. Runs model inference (blocking): call it from a
+        thread, not the event loop.
+
+        Returns:
+            Speech segments completed by this audio (PCM bytes), oldest first
+        """
+        self._pending += audio
+        segments = []
+        usable = len(self._pending) - len(self._pending) % FRAME_BYTES
+        for offset in range(0, usable, FRAME_BYTES):
+            frame = self._pending[offset:offset + FRAME_BYTES]
+            if self._speech_probability(frame) >= SPEECH_THRESHOLD:
+                self._segment += frame
+                self._speech_ms += FRAME_MS
+                self._silence_ms = 0
+            elif self._segment:
+                # Trailing silence stays in the segment so words aren't clipped
+                self._segment += frame
+                self._silence_ms += FRAME_MS
+            else:
+                continue
+
+            if self._silence_ms >= MIN_SILENCE_MS or len(self._segment) >= MAX_SEGMENT_BYTES:
+                segment = self._take_segment()
+                if segment:
+                    segments.append(segment)
+        del self._pending[:usable]
+        return segments
+
+    def reset(self) -> None:
+        """Drop buffered audio and model state (new utterance)."""
+        self._pending.clear()
+        self._take_segment()
+        self._model.reset_states()
+
+
+async def _get_base_model():
+    """Load the Silero VAD model on first use (weights are read from disk once)."""
+    global _base_model
+    async with _base_model_lock:
+        if _base_model is None:
+            # Loading the model reads its weights from disk: keep it off the event loop
+            _base_model = await asyncio.to_thread(load_silero_vad)
+    return _base_model
+
+
+def _stream_model(base_model):
+    """Copy of the model with fresh recurrent state, for one stream."""
+    model = copy.deepcopy(base_model)
+    model.reset_states()
+    return model
+
+
+async def create_segmenter() -> Optional[SpeechSegmenter]:
+    """
+    Speech segmenter for one audio stream.
+
+    Returns:
+        Segmenter, or None if Silero VAD is unavailable
+    """
+    if not VAD_AVAILABLE:
+        return None
+    try:
+        base_model = await _get_base_model()
+        model = await asyncio.to_thread(_stream_model, base_model)
+    except Exception as e:
+        logger.warning(f"Silero VAD model failed to load: {e}")
+        return None
+    return SpeechSegmenter(model)
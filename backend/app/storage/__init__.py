@@ -0,0 +1,3 @@
+"""
+Shared storage backends (Redis with in-process fallback)
+"""
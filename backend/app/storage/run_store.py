@@ -0,0 +1,153 @@
+"""
+Run Store - Shared workflow run storage.
+Runs are stored in Redis as JSON under run:{run_id} with a TTL so every worker
+sees the same state. Falls back to an in-process dict when Redis is unavailable.
+Every successful write is also pushed to local SSE subscribers via the run bus.
+"""
+
+import copy
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.events import run_bus
+from app.orchestration.orchestrator import WorkflowContext, WorkflowState
+
+logger = logging.getLogger(__name__)
+
+# Try to import Redis
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    logger.warning("redis.asyncio not available, using in-memory run store")
+
+REDIS_URL = getattr(settings, "REDIS_URL", "redis://localhost:6379/0")
+RUN_TTL_SECONDS = 86400  # 24 hours - workflow SLA
+
+# Global Redis client
+_redis_client = None
+
+# In-memory fallback (per process). Holds snapshots, not live contexts: callers
+# mutate the context they loaded, which must not change the stored run.
+_local_runs: Dict[str, Dict[str, Any]] = {}
+
+# Compare-and-set on the stored state: only write if the current state matches.
+# KEYS[1] = run key, ARGV[1] = expected state, ARGV[2] = new payload, ARGV[3] = ttl
+_CAS_STATE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+if cjson.decode(current)['state'] ~= ARGV[1] then
+    return 0
+end
+redis.call('SETEX', KEYS[1], ARGV[3], ARGV[2])
+return 1
+"""
+
+
+def _run_key(run_id: str) -> str:
+    return f"run:{run_id}"
+
+
+def _state_value(state) -> str:
+    return state.value if isinstance(state, WorkflowState) else str(state)
+
+
+async def get_run_store_client():
+    """Get or create Redis client for the run store."""
+    global _redis_client
+    if not REDIS_AVAILABLE:
+        return None
+    if _redis_client is None:
+        try:
+            _redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
+            await _redis_client.ping()
+            logger.info(f"Connected to Redis run store at {REDIS_URL}")
+        except Exception as e:
+            logger.warning(f"Redis run store connection failed, using in-memory store: {e}")
+            _redis_client = None
+    return _redis_client
+
+
+async def get_run(run_id: str) -> Optional[WorkflowContext]:
+    """
+    Load a run.
+    
+    Args:
+        run_id: Run ID
+        
+    Returns:
+        WorkflowContext, or None if the run does not exist
+    """
+    client = await get_run_store_client()
+    if not client:
+        snapshot = _local_runs.get(run_id)
+        return WorkflowContext.from_dict(copy.deepcopy(snapshot)) if snapshot is not None else None
+    
+    raw = await client.get(_run_key(run_id))
+    if raw is None:
+        return None
+    return WorkflowContext.from_dict(json.loads(raw))
+
+
+async def put_run(ctx: WorkflowContext, ttl: int = RUN_TTL_SECONDS) -> None:
+    """
+    Store a run, replacing any previous version.
+    
+    Args:
+        ctx: Workflow context to store
+        ttl: Time to live in seconds
+    """
+    snapshot = ctx.to_dict()
+    client = await get_run_store_client()
+    if not client:
+        _local_runs[ctx.run_id] = copy.deepcopy(snapshot)
+    else:
+        await client.setex(_run_key(ctx.run_id), ttl, json.dumps(snapshot))
+    run_bus.publish(ctx.run_id, snapshot)
+
+
+async def cas_state(
+    run_id: str,
+    expected_state: WorkflowState,
+    ctx: WorkflowContext,
+    ttl: int = RUN_TTL_SECONDS,
+) -> bool:
+    """
+    Atomically store ctx only if the stored run is still in expected_state.
+    Guards state transitions (e.g. approval) against concurrent writers.
+    
+    Args:
+        run_id: Run ID
+        expected_state: State the stored run must currently be in
+        ctx: Workflow context to store
+        ttl: Time to live in seconds
+        
+    Returns:
+        True if ctx was stored, False if the run is missing or its state changed
+    """
+    snapshot = ctx.to_dict()
+    client = await get_run_store_client()
+    if not client:
+        current = _local_runs.get(run_id)
+        if current is None or current["state"] != _state_value(expected_state):
+            return False
+        _local_runs[run_id] = copy.deepcopy(snapshot)
+        run_bus.publish(run_id, snapshot)
+        return True
+    
+    stored = await client.eval(
+        _CAS_STATE_SCRIPT,
+        1,
+        _run_key(run_id),
+        _state_value(expected_state),
+        json.dumps(snapshot),
+        ttl,
+    )
+    if stored:
+        run_bus.publish(run_id, snapshot)
+    return bool(stored)
@@ -0,0 +1,120 @@
+"""
+Server-Sent Events response.
+Frames event dicts ({"event", "data", "id", "retry", "comment"}) into the SSE wire
+format as bytes, sends keep-alive comments while the source is idle, and sets the
+headers proxies need to stream instead of buffering. A source may yield a list of
+events to have them written as a single chunk (one send for related events).
+"""
+
+import asyncio
+import contextlib
+from typing import Any, AsyncIterable, Dict, List, Mapping, Optional, Union
+
+from starlette.responses import StreamingResponse
+
+DEFAULT_PING_INTERVAL = 15.0  # seconds
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Disable nginx response buffering
+}
+
+PING = b": ping\n\n"
+
+Event = Union[Dict[str, Any], str, bytes]
+
+
+def encode_event(event: Event) -> bytes:
+    """
+    Encode one event in the SSE wire format.
+
+    Args:
+        event: Dict with optional event/id/retry/comment fields and a data field;
+            a str or bytes is sent as the data field
+
+    Returns:
+        Encoded event, terminated by a blank line
+    """
+    if not isinstance(event, dict):
+        event = {"data": event}
+
+    lines = []
+    if event.get("comment") is not None:
+        lines.extend(f": {line}" for line in str(event["comment"]).splitlines())
+    if event.get("id") is not None:
+        lines.append(f"id: {event['id']}")
+    if event.get("event") is not None:
+        lines.append(f"event: {event['event']}")
+    if event.get("retry") is not None:
+        lines.append(f"retry: {int(event['retry'])}")
+    encoded = "".join(f"{line}\n" for line in lines).encode("utf-8")
+
+    # bytes data (e.g. from orjson.dumps) is framed without a decode/encode round-trip
+    data = event.get("data")
+    if data is not None:
+        if not isinstance(data, bytes):
+            data = str(data).encode("utf-8")
+        encoded += b"".join(b"data: " + line + b"\n" for line in data.split(b"\n"))
+
+    return encoded + b"\n"
+
+
+async def _frame(events: AsyncIterable[Union[Event, List[Event]]], ping_interval: float):
+    """Encode events from the source, interleaving pings while it is idle."""
+    iterator = events.__aiter__()
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=ping_interval)
+            if not done:
+                yield PING
+                continue
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                return
+            if isinstance(event, list):
+                yield b"".join(encode_event(e) for e in event)
+            else:
+                yield encode_event(event)
+            # Give the server a loop tick to flush this chunk before the next one is produced
+            await asyncio.sleep(0)
+            pending = asyncio.ensure_future(iterator.__anext__())
+    finally:
+        # Client went away (or the source ended): stop the source so its cleanup runs
+        if not pending.done():
+            pending.cancel()
+            with contextlib.suppress(BaseException):
+                await pending
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            with contextlib.suppress(Exception):
+                await aclose()
+
+
+class EventSourceResponse(StreamingResponse):
+    """
+    Stream events from an async iterable as text/event-stream.
+
+    Args:
+        content: Async iterable of event dicts (or pre-serialized data strings),
+            or lists of them to be written together
+        status_code: HTTP status code
+        headers: Extra response headers
+        ping_interval: Seconds of source inactivity before a keep-alive comment is sent
+    """
+
+    def __init__(
+        self,
+        content: AsyncIterable[Union[Event, List[Event]]],
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        ping_interval: float = DEFAULT_PING_INTERVAL,
+    ) -> None:
+        super().__init__(
+            _frame(content, ping_interval),
+            status_code=status_code,
+            headers={**SSE_HEADERS, **(headers or {})},
+            media_type="text/event-stream",
+        )
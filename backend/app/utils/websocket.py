@@ -0,0 +1,15 @@
+"""
+WebSocket JSON helpers.
+orjson in place of starlette's json-based send_json/receive_json. Messages still go
+out as text frames, so browser clients keep reading them with JSON.parse.
+"""
+
+from typing import Any
+
+import orjson
+from starlette.websockets import WebSocket
+
+
+async def send_json(websocket: WebSocket, data: Any) -> None:
+    """Send data as a JSON text frame (non-str dict keys allowed, as with json.dumps)."""
+    await websocket.send_text(orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode())
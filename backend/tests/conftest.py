@@ -2,11 +2,79 @@
 Pytest configuration and fixtures for ProLight AI tests
 """
 
+import os
+import tempfile
+
+# Throwaway SQLite database: app.db creates the tables on import
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/prolight-test.db")
+
 import pytest
 from fastapi.testclient import TestClient
+from app.core import cache
 from app.main import app
 
 
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio commands the app uses"""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+        self.zsets = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    async def setex(self, key, ttl, value):
+        self.values[key] = str(value)
+        self.ttls[key] = ttl
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        self.ttls[key] = ex
+        return True
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+        self.ttls.pop(key, None)
+
+    async def eval(self, script, numkeys, key, value, ttl):
+        # Only the rolling-max script (cache.set_generic_cache_max) is evaluated
+        current = self.values.get(key)
+        if current is not None and float(current) > float(value):
+            return 0
+        await self.setex(key, ttl, value)
+        return 1
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zrange(self, key, start, end):
+        zset = self.zsets.get(key, {})
+        return sorted(zset, key=zset.get)
+
+    async def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Generic cache backed by a FakeRedis"""
+    client = FakeRedis()
+
+    async def get_cache_client():
+        return client
+
+    monkeypatch.setattr(cache, "get_cache_client", get_cache_client)
+    return client
+
+
 @pytest.fixture
 def client():
     """Create test client"""
@@ -103,6 +103,18 @@ class TestPresetsEndpoints:
         for preset in data["presets"]:
             assert preset["category"] == "portrait"
     
+    def test_list_presets_pagination(self):
+        """Test paginating presets"""
+        response = client.get("/api/presets?page=1&page_size=2")
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["presets"]) == 2
+        assert data["total"] > 2
+        
+        response = client.get(f"/api/presets?page=2&page_size={data['total']}")
+        assert response.status_code == 200
+        assert response.json()["presets"] == []
+    
     def test_get_preset(self):
         """Test getting specific preset"""
         response = client.get("/api/presets/butterfly_classic")
@@ -0,0 +1,56 @@
+"""
+Tests for the Stripe customer cache
+"""
+
+import pytest
+
+from app.api import stripe_checkout
+from app.core import cache
+from app.services import customer_cache
+
+CUSTOMER = {"stripe_customer_id": "cus_1", "email": "buyer@example.com", "role": "user"}
+
+
+class TestCustomerCache:
+    """Per-email customer summary cache tests"""
+
+    @pytest.mark.asyncio
+    async def test_round_trip_ignores_email_case(self, fake_redis):
+        """Entries are keyed by the lower-cased email and expire"""
+        assert await customer_cache.set_cached_customer("Buyer@Example.com", CUSTOMER) is True
+
+        assert await customer_cache.get_cached_customer("buyer@EXAMPLE.com") == CUSTOMER
+        key = f"{customer_cache.CUSTOMER_CACHE_PREFIX}buyer@example.com"
+        assert fake_redis.ttls[key] == customer_cache.CUSTOMER_CACHE_TTL_SECONDS
+
+    @pytest.mark.asyncio
+    async def test_invalidate(self, fake_redis):
+        """Invalidation drops the entry; an empty email is ignored"""
+        await customer_cache.set_cached_customer("buyer@example.com", CUSTOMER)
+
+        assert await customer_cache.invalidate_cached_customer(None) is False
+        assert await customer_cache.invalidate_cached_customer("Buyer@example.com") is True
+        assert await customer_cache.get_cached_customer("buyer@example.com") is None
+
+    @pytest.mark.asyncio
+    async def test_miss_without_redis(self, monkeypatch):
+        """Without Redis every lookup is a miss"""
+        async def no_redis():
+            return None
+
+        monkeypatch.setattr(cache, "get_cache_client", no_redis)
+        assert await customer_cache.set_cached_customer("buyer@example.com", CUSTOMER) is False
+        assert await customer_cache.get_cached_customer("buyer@example.com") is None
+
+    @pytest.mark.asyncio
+    async def test_checkout_completed_invalidates(self, fake_redis):
+        """A completed checkout drops the buyer's cached summary"""
+        await customer_cache.set_cached_customer("buyer@example.com", CUSTOMER)
+
+        await stripe_checkout.handle_stripe_event({
+            "id": "evt_1",
+            "type": "checkout.session.completed",
+            "data": {"object": {"id": "cs_1", "customer_details": {"email": "Buyer@Example.com"}}},
+        })
+
+        assert await customer_cache.get_cached_customer("buyer@example.com") is None
@@ -0,0 +1,91 @@
+"""
+Tests for the prompt cache lookup
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base
+from app.models.image_generation import Artifact, PromptCache
+from app.services import prompt_cache
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Session on a private in-memory SQLite database; empty lookup memo"""
+    monkeypatch.setattr(prompt_cache, "_lookup_memo", {})
+    monkeypatch.setattr(prompt_cache, "_pending_hits", {})
+    monkeypatch.setattr(prompt_cache, "_next_hit_flush", 0.0)
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic clock for the memo"""
+    now = [1000.0]
+    monkeypatch.setattr(prompt_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _entry(db, expires_at=None):
+    artifact = Artifact(job_id=uuid.uuid4(), url="https://cdn/x.png", width=64, height=64)
+    db.add(artifact)
+    db.flush()
+    entry = PromptCache(
+        prompt_hash="h" * 64, model_version="v1", seed=7, width=64, height=64,
+        artifact_id=artifact.id, hit_count=0, expires_at=expires_at,
+    )
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+def _lookup(db):
+    return prompt_cache.lookup_cache(db, "h" * 64, "v1", seed=7, width=64, height=64)
+
+
+def _hit_count(db, entry):
+    db.expire_all()
+    return db.get(PromptCache, entry.id).hit_count
+
+
+class TestLookupMemo:
+    """In-process memo tests"""
+
+    def test_memo_hits_are_counted(self, db, clock):
+        """Hits served from the memo reach hit_count in a batched update"""
+        entry = _entry(db)
+        for _ in range(3):
+            assert _lookup(db) is not None
+        assert _hit_count(db, entry) == 1
+
+        clock[0] += prompt_cache.HIT_FLUSH_INTERVAL_SECONDS
+        _lookup(db)
+
+        assert _hit_count(db, entry) == 4
+
+    def test_memo_ends_at_expiry(self, db, clock):
+        """An entry expiring before the memo TTL is not served past expires_at"""
+        entry = _entry(db, expires_at=datetime.utcnow() + timedelta(seconds=5))
+        assert _lookup(db) is not None
+
+        memo_deadline = next(iter(prompt_cache._lookup_memo.values()))[0]
+        assert memo_deadline <= clock[0] + 5
+
+        # Past expires_at the database lookup runs again and misses
+        entry.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        clock[0] += 6
+        assert _lookup(db) is None
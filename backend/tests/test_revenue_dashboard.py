@@ -0,0 +1,232 @@
+"""
+Tests for the revenue dashboard API
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import revenue_dashboard
+from app.db import Base
+from app.models.billing import Invoice, StripePrice, Subscription
+from app.services import stripe_prices
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture
+def session_factory():
+    """Sessions on a private in-memory SQLite database"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def _subscription(n, status="active", price_id="price_month", created_days_ago=60, updated_days_ago=None):
+    return Subscription(
+        stripe_subscription_id=f"sub_{n}",
+        stripe_customer_id="cus_1",
+        status=status,
+        price_id=price_id,
+        created_at=NOW - timedelta(days=created_days_ago),
+        updated_at=NOW - timedelta(days=updated_days_ago) if updated_days_ago is not None else None,
+    )
+
+
+def _invoice(n, amount_paid, days_ago, status="paid"):
+    return Invoice(
+        stripe_invoice_id=f"in_{n}",
+        stripe_customer_id="cus_1",
+        status=status,
+        currency="usd",
+        amount_due=amount_paid,
+        amount_paid=amount_paid,
+        created_at=NOW - timedelta(days=days_ago),
+    )
+
+
+class TestRevenueDashboard:
+    """SQL aggregate tests"""
+
+    def test_metrics(self, db):
+        """MRR, churn and recent revenue come from the local tables"""
+        db.add_all([
+            StripePrice(price_id="price_month", unit_amount=3000, interval="month"),
+            StripePrice(price_id="price_year", unit_amount=24000, interval="year"),
+            _subscription(1),
+            _subscription(2),
+            # Created this month: counts as active but not for the churn base
+            _subscription(3, price_id="price_year", created_days_ago=1),
+            _subscription(4, status="canceled", created_days_ago=90, updated_days_ago=5),
+            _subscription(5, status="canceled", created_days_ago=90, updated_days_ago=45),
+            _invoice(1, 5000, days_ago=3),
+            _invoice(2, 7000, days_ago=40),
+            _invoice(3, 9000, days_ago=2, status="open"),
+        ])
+        db.commit()
+
+        metrics = revenue_dashboard.revenue_dashboard(db=db)
+
+        # 2 x $30/month + $240/year
+        assert metrics["mrr"] == 80.0
+        assert metrics["arr"] == 960.0
+        assert metrics["active_subscriptions"] == 3
+        assert metrics["total_subscriptions"] == 5
+        assert metrics["canceled_subscriptions"] == 2
+        # 1 canceled in the period / 2 active before it
+        assert metrics["churn_rate"] == 0.5
+        assert metrics["recent_revenue_30d"] == 50.0
+        assert metrics["arpu"] == 26.67
+
+    def test_empty(self, db):
+        """No subscriptions: all metrics are zero"""
+        metrics = revenue_dashboard.revenue_dashboard(db=db)
+
+        assert metrics["mrr"] == 0
+        assert metrics["churn_rate"] == 0
+        assert metrics["arpu"] == 0
+
+
+class TestUnsyncedPrices:
+    """Backfill of prices missing from the local table"""
+
+    @pytest.mark.asyncio
+    async def test_backfill_in_one_transaction(self, session_factory, monkeypatch):
+        """Missing prices are fetched, counted, and stored for the next request"""
+        async def get_prices_from_stripe(price_ids):
+            return {
+                "price_new": {"unit_amount": 1200, "recurring": {"interval": "month"}, "currency": "usd"},
+                "price_annual": {"unit_amount": 12000, "recurring": {"interval": "year"}, "currency": "eur"},
+            }
+
+        monkeypatch.setattr(revenue_dashboard, "get_prices_from_stripe", get_prices_from_stripe)
+        monkeypatch.setattr(revenue_dashboard, "_stripe_enabled", lambda: True)
+        monkeypatch.setattr(stripe_prices, "SessionLocal", session_factory)
+        session = session_factory()
+        session.add(StripePrice(price_id="price_annual", unit_amount=1, interval="month"))
+        session.commit()
+
+        unsynced = [
+            SimpleNamespace(price_id="price_new", interval="month", subs=2),
+            SimpleNamespace(price_id="price_annual", interval="year", subs=1),
+        ]
+        assert await revenue_dashboard._unsynced_mrr_cents(unsynced) == 2 * 1200 + 12000 / 12
+
+        session.expire_all()
+        stored = {price.price_id: price for price in session.query(StripePrice)}
+        session.close()
+        assert (stored["price_new"].unit_amount, stored["price_new"].interval) == (1200, "month")
+        # Existing rows are updated in place
+        assert (stored["price_annual"].unit_amount, stored["price_annual"].interval) == (12000, "year")
+        assert stored["price_annual"].currency == "eur"
+
+
+class FakeStripePrices:
+    """Stripe Price API stand-in; records retrieve and list calls"""
+
+    def __init__(self, active, archived=()):
+        self.active = [{"id": price_id, "unit_amount": 100, "currency": "usd"} for price_id in active]
+        self.archived = set(archived)
+        self.retrieved = []
+        self.list_calls = []
+
+    def retrieve(self, price_id):
+        self.retrieved.append(price_id)
+        if price_id not in self.archived and price_id not in {p["id"] for p in self.active}:
+            raise RuntimeError(f"No such price: {price_id}")
+        return {"id": price_id, "unit_amount": 100, "currency": "usd"}
+
+    def list(self, **kwargs):
+        self.list_calls.append(kwargs)
+        return SimpleNamespace(auto_paging_iter=lambda: iter(self.active))
+
+
+@pytest.fixture
+def stripe_api(monkeypatch):
+    """Live Stripe mode with a fake Price API; no cached prices"""
+    import stripe
+
+    def install(api):
+        monkeypatch.setattr(stripe.Price, "retrieve", api.retrieve)
+        monkeypatch.setattr(stripe.Price, "list", api.list)
+        return api
+
+    monkeypatch.setattr(revenue_dashboard, "_stripe_enabled", lambda: True)
+    return install
+
+
+class TestGetPricesFromStripe:
+    """Stripe price fetch tests"""
+
+    @pytest.mark.asyncio
+    async def test_few_missing_are_retrieved(self, stripe_api):
+        """A handful of prices is retrieved by id without listing the catalog"""
+        api = stripe_api(FakeStripePrices(active=["price_a", "price_b"]))
+
+        prices = await revenue_dashboard.get_prices_from_stripe({"price_a", "price_b", "price_gone"})
+
+        assert set(prices) == {"price_a", "price_b"}
+        assert sorted(api.retrieved) == ["price_a", "price_b", "price_gone"]
+        assert api.list_calls == []
+
+    @pytest.mark.asyncio
+    async def test_many_missing_use_active_list(self, stripe_api, monkeypatch):
+        """Larger misses list active prices only; archived ones are retrieved by id"""
+        monkeypatch.setattr(revenue_dashboard, "PRICE_RETRIEVE_MAX", 1)
+        api = stripe_api(FakeStripePrices(active=["price_a", "price_b", "price_other"], archived=["price_old"]))
+
+        prices = await revenue_dashboard.get_prices_from_stripe({"price_a", "price_b", "price_old"})
+
+        assert set(prices) == {"price_a", "price_b", "price_old"}
+        assert api.list_calls == [{"active": True, "limit": 100}]
+        assert api.retrieved == ["price_old"]
+
+
+class TestListSubscriptions:
+    """Keyset pagination tests"""
+
+    def test_pages_cover_every_row_once(self, db):
+        """Walking next_cursor/next_cursor_id returns each row once, newest first"""
+        # Two pairs share a created_at, so the id tie-breaker matters
+        days_ago = [1, 2, 2, 3, 4, 4, 5]
+        db.add_all([_subscription(n, created_days_ago=d) for n, d in enumerate(days_ago)])
+        db.commit()
+
+        seen = []
+        cursor = cursor_id = None
+        while True:
+            page = revenue_dashboard.list_subscriptions(
+                limit=2, status=None, cursor=cursor, cursor_id=cursor_id, db=db, user=None
+            )
+            seen += [sub["stripe_subscription_id"] for sub in page["subscriptions"]]
+            if page["next_cursor"] is None:
+                break
+            cursor, cursor_id = page["next_cursor"], page["next_cursor_id"]
+
+        assert seen == [f"sub_{n}" for n in (0, 2, 1, 3, 5, 4, 6)]
+
+    def test_status_filter(self, db):
+        """The status filter applies to every page"""
+        db.add_all([_subscription(1), _subscription(2, status="canceled"), _subscription(3)])
+        db.commit()
+
+        page = revenue_dashboard.list_subscriptions(
+            limit=10, status="canceled", cursor=None, cursor_id=None, db=db, user=None
+        )
+
+        assert [sub["stripe_subscription_id"] for sub in page["subscriptions"]] == ["sub_2"]
+        assert page["next_cursor"] is None
@@ -0,0 +1,78 @@
+"""
+Tests for the runs API and the run store
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import runs
+from app.orchestration.orchestrator import WorkflowContext, WorkflowState
+from app.storage import run_store
+
+
+@pytest.fixture
+def local_store(monkeypatch):
+    """In-memory run store, emptied for each test"""
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(run_store, "get_run_store_client", no_redis)
+    monkeypatch.setattr(run_store, "_local_runs", {})
+
+
+class TestLocalRunStore:
+    """In-memory run store tests"""
+
+    @pytest.mark.asyncio
+    async def test_loaded_run_is_a_copy(self, local_store):
+        """Mutating a loaded run does not change the stored one"""
+        await run_store.put_run(WorkflowContext(run_id="r1", state=WorkflowState.CRITIQUED))
+
+        ctx = await run_store.get_run("r1")
+        ctx.state = WorkflowState.APPROVED
+
+        assert (await run_store.get_run("r1")).state == WorkflowState.CRITIQUED
+
+    @pytest.mark.asyncio
+    async def test_cas_compares_stored_state(self, local_store):
+        """A write based on a state the run has left is rejected"""
+        await run_store.put_run(WorkflowContext(run_id="r1", state=WorkflowState.CRITIQUED))
+        first = await run_store.get_run("r1")
+        second = await run_store.get_run("r1")
+        first.state = second.state = WorkflowState.APPROVED
+
+        assert await run_store.cas_state("r1", WorkflowState.CRITIQUED, first) is True
+        assert await run_store.cas_state("r1", WorkflowState.CRITIQUED, second) is False
+        assert await run_store.cas_state("missing", WorkflowState.CRITIQUED, second) is False
+
+
+class TestApproveRun:
+    """Run approval tests"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_approvals(self, local_store, monkeypatch):
+        """Of two concurrent approvals exactly one is applied, the other gets 409"""
+        advance = runs.advance
+
+        async def interleaved_advance(ctx, **kwargs):
+            # Let the other request load the run before this one writes it
+            await asyncio.sleep(0)
+            return await advance(ctx, **kwargs)
+
+        monkeypatch.setattr(runs, "advance", interleaved_advance)
+        await run_store.put_run(WorkflowContext(run_id="r1", state=WorkflowState.CRITIQUED))
+
+        app = FastAPI()
+        app.include_router(runs.router)
+        url = f"{runs.router.prefix}/r1/approve"
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            responses = await asyncio.gather(
+                client.post(url, json={"approved": True}),
+                client.post(url, json={"approved": True}),
+            )
+
+        assert sorted(response.status_code for response in responses) == [200, 409]
+        assert (await run_store.get_run("r1")).state == WorkflowState.APPROVED
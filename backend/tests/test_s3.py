@@ -0,0 +1,76 @@
+"""
+Tests for the S3 presign API
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import s3
+
+
+@pytest.fixture
+def signed(monkeypatch):
+    """S3 configured; records presign_url calls and returns a distinct URL for each"""
+    calls = []
+
+    def presign_url(bucket, region, key, *args, **kwargs):
+        calls.append(key)
+        return f"https://{bucket}.s3.{region}.amazonaws.com/{key}?sig={len(calls)}"
+
+    monkeypatch.setattr(s3, "S3_BUCKET", "prolight-test")
+    monkeypatch.setattr(s3, "S3_REGION", "us-west-2")
+    monkeypatch.setattr(s3, "AWS_ACCESS_KEY_ID", "AKIDEXAMPLE")
+    monkeypatch.setattr(s3, "AWS_SECRET_ACCESS_KEY", "secret")
+    monkeypatch.setattr(s3, "s3", object())
+    monkeypatch.setattr(s3, "presign_url", presign_url)
+    monkeypatch.setattr(s3, "_get_url_cache", {})
+    return calls
+
+
+@pytest.fixture
+def s3_client():
+    app = FastAPI()
+    app.include_router(s3.router)
+    return TestClient(app)
+
+
+class TestPresignGet:
+    """Presigned GET URL cache tests"""
+
+    def test_reuses_url_for_same_key(self, signed, s3_client):
+        """A second request for the same object gets the cached URL"""
+        first = s3_client.get("/s3/presign-get", params={"key": "videos/a.mp4"}).json()
+        second = s3_client.get("/s3/presign-get", params={"key": "videos/a.mp4"}).json()
+        other = s3_client.get("/s3/presign-get", params={"key": "videos/b.mp4"}).json()
+
+        assert first == second == {"url": first["url"], "key": "videos/a.mp4"}
+        assert other["url"] != first["url"]
+        assert signed == ["videos/a.mp4", "videos/b.mp4"]
+
+    def test_resigns_once_margin_is_reached(self, signed, s3_client, monkeypatch):
+        """URLs are re-signed when less than the reuse margin of validity remains"""
+        clock = {"now": 1000.0}
+        monkeypatch.setattr(s3.time, "monotonic", lambda: clock["now"])
+        first = s3_client.get("/s3/presign-get", params={"key": "a"}).json()["url"]
+
+        reuse_window = s3.GET_URL_EXPIRES_SECONDS - s3.GET_URL_REUSE_MARGIN_SECONDS
+        clock["now"] += reuse_window - 1
+        assert s3_client.get("/s3/presign-get", params={"key": "a"}).json()["url"] == first
+
+        clock["now"] += 1
+        assert s3_client.get("/s3/presign-get", params={"key": "a"}).json()["url"] != first
+        assert signed == ["a", "a"]
+
+    def test_evicts_oldest_entry(self, signed, s3_client, monkeypatch):
+        """The cache is bounded; the oldest key is dropped first"""
+        monkeypatch.setattr(s3, "GET_URL_CACHE_MAXSIZE", 2)
+        for key in ("a", "b", "c"):
+            s3_client.get("/s3/presign-get", params={"key": key})
+
+        assert list(s3._get_url_cache) == ["b", "c"]
+
+    def test_key_required(self, signed, s3_client):
+        """A missing key is a client error"""
+        response = s3_client.get("/s3/presign-get")
+        assert response.status_code == 400
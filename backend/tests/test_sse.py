@@ -0,0 +1,78 @@
+"""
+Tests for the Server-Sent Events response
+"""
+
+import asyncio
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import sse
+from app.orchestration.orchestrator import WorkflowContext, WorkflowState
+from app.utils.sse import EventSourceResponse, encode_event
+
+
+class TestEncodeEvent:
+    """SSE wire format tests"""
+
+    def test_event_and_data(self):
+        """Event name and data are framed and terminated by a blank line"""
+        assert encode_event({"event": "message", "data": b'{"a":1}'}) == b'event: message\ndata: {"a":1}\n\n'
+
+    def test_multiline_data(self):
+        """Each data line gets its own data field"""
+        assert encode_event({"data": "one\ntwo"}) == b"data: one\ndata: two\n\n"
+
+
+class TestEventSourceResponse:
+    """Streaming behaviour tests"""
+
+    def test_headers_and_keepalive(self):
+        """Idle sources get ping comments; proxy buffering is disabled"""
+        app = FastAPI()
+
+        async def events():
+            yield {"event": "message", "data": "first"}
+            await asyncio.sleep(0.25)
+            yield [{"event": "message", "data": "a"}, {"event": "message", "data": "b"}]
+
+        @app.get("/stream")
+        async def stream():
+            return EventSourceResponse(events(), ping_interval=0.1)
+
+        response = TestClient(app).get("/stream")
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.headers["x-accel-buffering"] == "no"
+        assert response.headers["cache-control"] == "no-cache"
+        assert response.text.startswith("event: message\ndata: first\n\n: ping\n\n")
+        assert response.text.endswith("event: message\ndata: a\n\nevent: message\ndata: b\n\n")
+
+
+class TestEventGenerator:
+    """Run stream tests without Redis"""
+
+    @pytest.mark.asyncio
+    async def test_rereads_runs_written_elsewhere(self, monkeypatch):
+        """A write that never reaches this process's run bus is picked up by the re-read"""
+        stored = {"ctx": WorkflowContext(run_id="r1", state=WorkflowState.EXECUTING)}
+
+        async def get_run(run_id):
+            return stored["ctx"]
+
+        monkeypatch.setattr(sse, "REDIS_AVAILABLE", False)
+        monkeypatch.setattr(sse, "RUN_REPOLL_SECONDS", 0.01)
+        monkeypatch.setattr(sse, "get_run", get_run)
+
+        stream = sse.event_generator("r1")
+        first = await stream.__anext__()
+        assert orjson.loads(first[-1]["data"])["data"]["status"] == "executing"
+
+        # Another worker completes the run; nothing is published locally
+        stored["ctx"] = WorkflowContext(run_id="r1", state=WorkflowState.COMPLETED)
+        second = await asyncio.wait_for(stream.__anext__(), timeout=1)
+        assert orjson.loads(second[-2]["data"])["data"]["status"] == "completed"
+
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
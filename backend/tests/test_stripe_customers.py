@@ -0,0 +1,53 @@
+"""
+Tests for the Stripe customer API
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import stripe_router
+from app.services import customer_cache
+
+AUTH = {"Authorization": "Bearer testtoken_user"}
+
+
+@pytest.fixture
+def stripe_client():
+    """The shared /api/stripe router (mock Stripe mode)"""
+    app = FastAPI()
+    app.include_router(stripe_router.router)
+    return TestClient(app)
+
+
+class TestCustomerEndpoints:
+    """Customer creation and lookup tests"""
+
+    def test_create_customer_is_idempotent(self, stripe_client, fake_redis):
+        """A second call returns the customer created by the first"""
+        first = stripe_client.post("/api/stripe/create_customer", headers=AUTH)
+        second = stripe_client.post("/api/stripe/create_customer", headers=AUTH)
+
+        assert first.status_code == 200
+        assert first.json()["stripe_customer_id"].startswith("cus_mock_")
+        assert second.json() == first.json()
+
+    @pytest.mark.asyncio
+    async def test_get_customer_is_cached(self, stripe_client, fake_redis):
+        """The customer summary read from the database is cached for later requests"""
+        customer_id = stripe_client.post("/api/stripe/create_customer", headers=AUTH).json()["stripe_customer_id"]
+
+        response = stripe_client.get("/api/stripe/customer", headers=AUTH)
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "stripe_customer_id": customer_id,
+            "email": "user@example.com",
+            "role": "viewer",
+        }
+        assert await customer_cache.get_cached_customer("user@example.com") == response.json()
+
+    def test_requires_authorization(self, stripe_client):
+        """Requests without credentials are rejected"""
+        response = stripe_client.get("/api/stripe/customer")
+        assert response.status_code == 401
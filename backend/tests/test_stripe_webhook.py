@@ -0,0 +1,140 @@
+"""
+Tests for the Stripe checkout webhook
+"""
+
+import hashlib
+import hmac
+import time
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import stripe_checkout
+
+WEBHOOK_SECRET = "whsec_test"
+
+
+def _event(event_id="evt_1", event_type="checkout.session.completed", created=1700000000, obj=None):
+    return {
+        "id": event_id,
+        "object": "event",
+        "type": event_type,
+        "created": created,
+        "data": {"object": obj or {"id": "cs_1", "customer_email": "Buyer@Example.com"}},
+    }
+
+
+def _post(client, event):
+    """Post an event with a valid Stripe-Signature header"""
+    payload = orjson.dumps(event)
+    timestamp = int(time.time())
+    signature = hmac.new(
+        WEBHOOK_SECRET.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256
+    ).hexdigest()
+    return client.post(
+        "/webhook",
+        content=payload,
+        headers={"Stripe-Signature": f"t={timestamp},v1={signature}"},
+    )
+
+
+class HandledEvents(list):
+    """Ids of processed events; processing an id in failures raises"""
+
+    def __init__(self):
+        super().__init__()
+        self.failures = set()
+
+
+@pytest.fixture
+def handled(fake_redis, monkeypatch):
+    """Live webhook mode on a FakeRedis; records processed event ids"""
+    events = HandledEvents()
+
+    async def handle_stripe_event(event):
+        if event["id"] in events.failures:
+            raise RuntimeError("database unavailable")
+        events.append(event["id"])
+
+    monkeypatch.setattr(stripe_checkout.settings, "USE_MOCK_STRIPE", False)
+    monkeypatch.setattr(stripe_checkout, "_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    monkeypatch.setattr(stripe_checkout, "handle_stripe_event", handle_stripe_event)
+    return events
+
+
+@pytest.fixture
+def webhook_client():
+    app = FastAPI()
+    app.include_router(stripe_checkout.router)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+class TestWebhookDedup:
+    """At-least-once delivery tests"""
+
+    def test_duplicate_is_acknowledged_once(self, handled, webhook_client):
+        """A redelivered event is acknowledged without being processed again"""
+        assert _post(webhook_client, _event()).json() == {"status": "success"}
+        response = _post(webhook_client, _event())
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "duplicate"}
+        assert handled == ["evt_1"]
+
+    def test_failure_releases_claim(self, handled, webhook_client, fake_redis):
+        """A processing failure returns 500 and lets Stripe's retry through"""
+        handled.failures.add("evt_1")
+        response = _post(webhook_client, _event())
+        assert response.status_code == 500
+        assert f"{stripe_checkout.EVENT_DEDUP_PREFIX}evt_1" not in fake_redis.values
+
+        handled.failures.clear()
+        assert _post(webhook_client, _event()).json() == {"status": "success"}
+        assert handled == ["evt_1"]
+
+    def test_stale_snapshot_is_dropped(self, handled, webhook_client):
+        """An older subscription snapshot arriving after a newer one is skipped"""
+        subscription = {"id": "sub_1", "status": "active"}
+        newer = _event("evt_2", "customer.subscription.updated", 1700000200, subscription)
+        older = _event("evt_1", "customer.subscription.updated", 1700000100, subscription)
+
+        assert _post(webhook_client, newer).json() == {"status": "success"}
+        assert _post(webhook_client, older).json() == {"status": "stale"}
+        assert handled == ["evt_2"]
+
+    def test_invalid_signature(self, handled, webhook_client):
+        """Unsigned payloads are rejected before dedup"""
+        response = webhook_client.post(
+            "/webhook", content=orjson.dumps(_event()), headers={"Stripe-Signature": "t=1,v1=bad"}
+        )
+        assert response.status_code == 400
+        assert handled == []
+
+
+class TestWebhookBodyLimit:
+    """Request body size tests"""
+
+    def test_declared_length_too_large(self, handled, webhook_client, monkeypatch):
+        """A Content-Length over the limit is rejected without reading the body"""
+        monkeypatch.setattr(stripe_checkout, "MAX_WEBHOOK_BODY_BYTES", 64)
+        response = webhook_client.post("/webhook", content=b"x" * 65)
+        assert response.status_code == 413
+
+    def test_streamed_body_too_large(self, handled, webhook_client, monkeypatch):
+        """Chunked bodies are counted while streaming"""
+        monkeypatch.setattr(stripe_checkout, "MAX_WEBHOOK_BODY_BYTES", 64)
+
+        def chunks():
+            for _ in range(4):
+                yield b"x" * 32
+
+        response = webhook_client.post("/webhook", content=chunks())
+        assert response.status_code == 413
+
+    def test_invalid_content_length(self, handled, webhook_client):
+        """A non-numeric Content-Length is a bad request"""
+        response = webhook_client.post("/webhook", content=b"{}", headers={"Content-Length": "abc"})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid Content-Length"
@@ -0,0 +1,156 @@
+"""
+Tests for the text-to-image API
+"""
+
+import asyncio
+import uuid
+from urllib.parse import parse_qs, urlsplit
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import text_to_image
+from app.db import SessionLocal
+from app.models.image_generation import ImageJob
+from app.services import job_queue
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    """Text-to-image router with S3 configured"""
+    monkeypatch.setattr(text_to_image, "S3_BUCKET", "prolight-test")
+    monkeypatch.setattr(text_to_image, "S3_REGION", "us-west-2")
+    monkeypatch.setattr(text_to_image, "AWS_ACCESS_KEY_ID", "AKIDEXAMPLE")
+    monkeypatch.setattr(text_to_image, "AWS_SECRET_ACCESS_KEY", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY")
+    monkeypatch.setattr(text_to_image, "AWS_SESSION_TOKEN", None)
+    monkeypatch.setattr(text_to_image, "_PUBLIC_URL_BASE", "https://prolight-test.s3.us-west-2.amazonaws.com/")
+    monkeypatch.setattr(text_to_image, "s3", object())
+    app = FastAPI()
+    app.include_router(text_to_image.router)
+    return TestClient(app)
+
+
+class TestPresignUpload:
+    """Guidance image upload presign tests"""
+
+    def test_returns_signed_put_url(self, s3_client):
+        """The upload URL is a SigV4-signed PUT for a sanitized key"""
+        response = s3_client.post(
+            "/uploads/presign",
+            json={"filename": "my guide#1?.png", "content_type": "image/png"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["method"] == "PUT"
+        assert data["key"].startswith("prolight/guidance/")
+        assert data["key"].endswith("_my_guide_1_.png")
+        assert data["public_url"] == "https://prolight-test.s3.us-west-2.amazonaws.com/" + data["key"]
+
+        url = urlsplit(data["upload_url"])
+        assert url.netloc == "prolight-test.s3.us-west-2.amazonaws.com"
+        assert url.path == "/" + data["key"]
+        query = parse_qs(url.query)
+        assert query["X-Amz-Algorithm"] == ["AWS4-HMAC-SHA256"]
+        assert query["X-Amz-Expires"] == ["900"]
+        assert query["X-Amz-Credential"][0].startswith("AKIDEXAMPLE/")
+        assert query["X-Amz-SignedHeaders"] == ["content-type;host"]
+        assert len(query["X-Amz-Signature"][0]) == 64
+
+    def test_s3_not_configured(self, s3_client, monkeypatch):
+        """Without a bucket the endpoint reports a configuration error"""
+        monkeypatch.setattr(text_to_image, "S3_BUCKET", None)
+        response = s3_client.post("/uploads/presign", json={"filename": "a.png"})
+        assert response.status_code == 500
+        assert response.json()["detail"] == "S3 not configured"
+
+
+class TestStreamStatus:
+    """Job status stream tests"""
+
+    @pytest.mark.asyncio
+    async def test_rereads_job_while_feed_is_idle(self, monkeypatch):
+        """A status written without a published event still reaches the client"""
+        run_id = f"run_{uuid.uuid4().hex}"
+        with SessionLocal() as writer:
+            writer.add(ImageJob(
+                run_id=run_id, prompt_hash="0" * 64, model_version="test",
+                width=64, height=64, status="processing", sse_token="tok",
+            ))
+            writer.commit()
+
+        async def subscribe_job_events(run_id):
+            # Redis is up, but nothing publishes on the job's channel
+            return asyncio.Queue()
+
+        monkeypatch.setattr(text_to_image, "subscribe_job_events", subscribe_job_events)
+        monkeypatch.setattr(text_to_image, "JOB_REPOLL_SECONDS", 0.01)
+
+        db = SessionLocal()
+        try:
+            response = await text_to_image.stream_status(run_id, token="tok", db=db)
+            stream = response.body_iterator
+            first = await asyncio.wait_for(stream.__anext__(), timeout=1)
+            assert orjson.loads(first[len(b"data: "):])["step"] == "processing"
+
+            with SessionLocal() as writer:
+                writer.query(ImageJob).filter(ImageJob.run_id == run_id).update({"status": "failed"})
+                writer.commit()
+
+            final = None
+            while final is None or final["type"] != "final":
+                frame = await asyncio.wait_for(stream.__anext__(), timeout=1)
+                final = orjson.loads(frame[len(b"data: "):])
+            assert final["status"] == "failed"
+        finally:
+            db.close()
+
+
+class FakeQueue:
+    """Records BullMQ Queue.add calls"""
+
+    def __init__(self):
+        self.added = []
+
+    async def add(self, name, data, opts):
+        self.added.append((name, data, opts))
+
+
+class TestCreateJob:
+    """Job creation and enqueue tests"""
+
+    def _create(self, prompt="a lamp"):
+        app = FastAPI()
+        app.include_router(text_to_image.router)
+        return TestClient(app).post("/generate/text-to-image", json={"prompt": prompt})
+
+    def test_job_added_to_bullmq_queue(self, monkeypatch):
+        """The job goes on the image-gen queue with its run_id as BullMQ job id"""
+        queue = FakeQueue()
+        monkeypatch.setattr(job_queue, "_queue", queue)
+        monkeypatch.setattr(job_queue, "BULLMQ_AVAILABLE", True)
+
+        response = self._create()
+
+        assert response.status_code == 200
+        run_id = response.json()["run_id"]
+        assert queue.added == [(
+            "t2i",
+            {"run_id": run_id, "request_id": response.json()["request_id"]},
+            {**job_queue.IMAGE_JOB_OPTIONS, "jobId": run_id},
+        )]
+
+    def test_unqueued_job_is_failed(self, monkeypatch):
+        """Without a queue the job is failed and the client told to retry"""
+        monkeypatch.setattr(job_queue, "BULLMQ_AVAILABLE", False)
+
+        prompt = f"a lamp {uuid.uuid4().hex}"
+
+        response = self._create(prompt)
+
+        assert response.status_code == 503
+        with SessionLocal() as db:
+            job = db.query(ImageJob).filter(ImageJob.prompt_text == prompt).one()
+            assert job.status == "failed"
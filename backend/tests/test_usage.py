@@ -0,0 +1,87 @@
+"""
+Tests for the usage reporting API
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import usage
+from app.auth.role_middleware import get_current_db_user, get_db
+from app.db import Base
+from app.models.billing import UsageRecord
+
+
+@pytest.fixture
+def session_factory():
+    """Sessions on a private in-memory SQLite database"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def usage_client(session_factory):
+    """Usage router (mock Stripe mode) for database user 1"""
+    def get_test_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(usage.router)
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_current_db_user] = lambda: SimpleNamespace(id=1, stripe_customer_id=None)
+    return TestClient(app)
+
+
+def _report(client, quantity="2.5", key=None):
+    headers = {"Idempotency-Key": key} if key else {}
+    return client.post(
+        "/api/billing/report_usage",
+        json={"subscription_item_id": "si_1", "quantity": quantity},
+        headers=headers,
+    )
+
+
+def _records(session_factory):
+    with session_factory() as db:
+        return db.query(UsageRecord.id).count()
+
+
+class TestReportUsageIdempotency:
+    """Idempotency-Key tests"""
+
+    def test_retry_is_recorded_once(self, usage_client, session_factory):
+        """A retried call returns the first record and inserts nothing"""
+        first = _report(usage_client, key="key-1")
+        second = _report(usage_client, key="key-1")
+
+        assert first.status_code == 200
+        assert second.json() == first.json()
+        assert first.json()["stripe_report_id"] == f"ur_mock_{first.json()['usage_id']}"
+        assert _records(session_factory) == 1
+
+    def test_key_reused_for_other_usage(self, usage_client, session_factory):
+        """The same key with a different quantity is a conflict"""
+        _report(usage_client, key="key-1")
+        response = _report(usage_client, quantity="3", key="key-1")
+
+        assert response.status_code == 409
+        assert _records(session_factory) == 1
+
+    def test_calls_without_key_are_all_recorded(self, usage_client, session_factory):
+        """Without a key every call is a new record"""
+        assert _report(usage_client).status_code == 200
+        assert _report(usage_client).status_code == 200
+        assert _records(session_factory) == 2
@@ -0,0 +1,105 @@
+"""
+Tests for batched Stripe usage reporting
+"""
+
+import hashlib
+from decimal import Decimal
+
+import orjson
+import pytest
+import stripe
+
+from app.services import usage_reporter
+
+
+@pytest.fixture
+def redis(fake_redis, monkeypatch):
+    """Usage queue on a FakeRedis; the flusher never starts"""
+    async def get_cache_client():
+        return fake_redis
+
+    monkeypatch.setattr(usage_reporter, "get_cache_client", get_cache_client)
+    monkeypatch.setattr(usage_reporter, "_ensure_flusher", lambda: None)
+    return fake_redis
+
+
+@pytest.fixture
+def stripe_reports(monkeypatch):
+    """Records Stripe UsageRecord.create calls and _mark_reported stamps"""
+    calls = {"create": [], "marked": [], "fail_items": set()}
+
+    def create(**kwargs):
+        if kwargs["subscription_item"] in calls["fail_items"]:
+            raise stripe.error.APIConnectionError("unreachable")
+        calls["create"].append(kwargs)
+        return {"id": f"mbur_{len(calls['create'])}"}
+
+    monkeypatch.setattr(usage_reporter.stripe.UsageRecord, "create", create)
+    monkeypatch.setattr(
+        usage_reporter,
+        "_mark_reported",
+        lambda usage_ids, report_id: calls["marked"].append((usage_ids, report_id))
+    )
+    return calls
+
+
+def _pending(redis):
+    return [orjson.loads(member) for member in redis.zsets.get(usage_reporter.PENDING_USAGE_KEY, {})]
+
+
+class TestFlushPendingUsage:
+    """Batched report tests"""
+
+    @pytest.mark.asyncio
+    async def test_queued_quantity_is_a_decimal_string(self, redis):
+        """Quantities are queued without a float round-trip"""
+        assert await usage_reporter.queue_usage(1, "si_a", Decimal("0.1"), 100) is True
+        assert _pending(redis)[0]["quantity"] == "0.1"
+
+    @pytest.mark.asyncio
+    async def test_groups_by_subscription_item(self, redis, stripe_reports):
+        """One increment per item, each record truncated like a direct report"""
+        await usage_reporter.queue_usage(3, "si_a", Decimal("1.9"), 100)
+        await usage_reporter.queue_usage(1, "si_a", Decimal("2.5"), 300)
+        await usage_reporter.queue_usage(2, "si_b", Decimal("4"), 200)
+
+        assert await usage_reporter.flush_pending_usage() == 3
+
+        creates = {call["subscription_item"]: call for call in stripe_reports["create"]}
+        assert set(creates) == {"si_a", "si_b"}
+        # int(1.9) + int(2.5), as two direct reports would have sent
+        assert creates["si_a"]["quantity"] == 3
+        assert creates["si_a"]["timestamp"] == 300
+        assert creates["si_a"]["action"] == "increment"
+        assert creates["si_b"]["quantity"] == 4
+        # Items are reported in order of their oldest pending record
+        assert stripe_reports["marked"] == [([1, 3], "mbur_1"), ([2], "mbur_2")]
+        assert _pending(redis) == []
+
+    @pytest.mark.asyncio
+    async def test_idempotency_key_depends_on_records(self, redis, stripe_reports):
+        """The key is derived from the sorted usage ids, whatever the queue order"""
+        await usage_reporter.queue_usage(7, "si_a", Decimal("1"), 200)
+        await usage_reporter.queue_usage(5, "si_a", Decimal("1"), 100)
+
+        await usage_reporter.flush_pending_usage()
+
+        expected = "usage-" + hashlib.sha256(orjson.dumps([5, 7])).hexdigest()
+        assert stripe_reports["create"][0]["idempotency_key"] == expected
+
+    @pytest.mark.asyncio
+    async def test_failed_item_stays_pending(self, redis, stripe_reports):
+        """A failed report leaves that item's records queued; other items are reported"""
+        stripe_reports["fail_items"].add("si_b")
+        await usage_reporter.queue_usage(1, "si_a", Decimal("1"), 100)
+        await usage_reporter.queue_usage(2, "si_b", Decimal("2"), 100)
+
+        assert await usage_reporter.flush_pending_usage() == 1
+
+        assert [entry["usage_id"] for entry in _pending(redis)] == [2]
+        assert stripe_reports["marked"] == [([1], "mbur_1")]
+
+        # Next flush retries it
+        stripe_reports["fail_items"].clear()
+        assert await usage_reporter.flush_pending_usage() == 1
+        assert _pending(redis) == []
@@ -0,0 +1,59 @@
+"""
+Tests for the voice activity detection segmenter
+"""
+
+import pytest
+
+from app.services import voice_vad
+
+
+class FakeModel:
+    """Stands in for the Silero model; reset_states clears its recurrent state"""
+
+    def __init__(self):
+        self.state = "loaded"
+
+    def reset_states(self):
+        self.state = "fresh"
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Counts model loads from disk"""
+    calls = []
+
+    def load_silero_vad():
+        calls.append(1)
+        return FakeModel()
+
+    monkeypatch.setattr(voice_vad, "VAD_AVAILABLE", True)
+    monkeypatch.setattr(voice_vad, "load_silero_vad", load_silero_vad, raising=False)
+    monkeypatch.setattr(voice_vad, "_base_model", None)
+    return calls
+
+
+class TestCreateSegmenter:
+    """Model loading tests"""
+
+    @pytest.mark.asyncio
+    async def test_model_loaded_once_per_process(self, loads):
+        """Later streams reuse the loaded weights"""
+        await voice_vad.create_segmenter()
+        await voice_vad.create_segmenter()
+        assert loads == [1]
+
+    @pytest.mark.asyncio
+    async def test_each_stream_has_its_own_state(self, loads):
+        """Segmenters get separate model copies with fresh state"""
+        first = await voice_vad.create_segmenter()
+        second = await voice_vad.create_segmenter()
+
+        assert first._model is not second._model
+        assert first._model is not voice_vad._base_model
+        assert first._model.state == second._model.state == "fresh"
+
+    @pytest.mark.asyncio
+    async def test_unavailable(self, monkeypatch):
+        """Without silero-vad there is no segmenter"""
+        monkeypatch.setattr(voice_vad, "VAD_AVAILABLE", False)
+        assert await voice_vad.create_segmenter() is None
@@ -0,0 +1,67 @@
+"""
+Tests for the run WebSocket broadcast
+"""
+
+import asyncio
+
+import orjson
+import pytest
+
+from app.api import ws
+
+
+class FakeWebSocket:
+    """Records sent frames; optionally waits on an event or fails"""
+
+    def __init__(self, wait_for=None, error=None):
+        self.sent = []
+        self.started = asyncio.Event()
+        self.wait_for = wait_for
+        self.error = error
+
+    async def send_text(self, text):
+        self.started.set()
+        if self.wait_for is not None:
+            await self.wait_for.wait()
+        if self.error is not None:
+            raise self.error
+        self.sent.append(text)
+
+
+class TestBroadcastRunUpdate:
+    """Broadcast fan-out tests"""
+
+    @pytest.mark.asyncio
+    async def test_sends_concurrently(self, monkeypatch):
+        """Each socket's send starts before the others finish"""
+        first = FakeWebSocket()
+        second = FakeWebSocket()
+        # Each send blocks until the other has started: only a concurrent fan-out completes
+        first.wait_for = second.started
+        second.wait_for = first.started
+        monkeypatch.setattr(ws, "_connections", {"r1": {first, second}})
+
+        await asyncio.wait_for(ws.broadcast_run_update("r1", {"state": "EXECUTING", 1: "x"}), timeout=1)
+
+        assert first.sent == second.sent == [orjson.dumps({"state": "EXECUTING", "1": "x"}).decode()]
+
+    @pytest.mark.asyncio
+    async def test_failed_sockets_are_dropped(self, monkeypatch):
+        """A failing socket is removed; the others still get the update"""
+        live = FakeWebSocket()
+        dead = FakeWebSocket(error=RuntimeError("closed"))
+        monkeypatch.setattr(ws, "_connections", {"r1": {live, dead}})
+
+        await ws.broadcast_run_update("r1", {"state": "COMPLETED"})
+
+        assert live.sent == ['{"state":"COMPLETED"}']
+        assert ws._connections == {"r1": {live}}
+
+    @pytest.mark.asyncio
+    async def test_run_entry_removed_when_empty(self, monkeypatch):
+        """The run's entry is dropped once no socket is left"""
+        monkeypatch.setattr(ws, "_connections", {"r1": {FakeWebSocket(error=RuntimeError("closed"))}})
+
+        await ws.broadcast_run_update("r1", {"state": "FAILED"})
+
+        assert ws._connections == {}